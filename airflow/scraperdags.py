@@ -1,72 +1,223 @@
 from __future__ import annotations
 
-import json
+import io
+import os
 import pendulum
-import re
+import struct
+import sys
 import time
 
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 from airflow.models.dag import DAG
 from airflow.operators.python import PythonOperator
 from airflow.providers.google.cloud.hooks.gcs import GCSHook
 
+# 봇과 공유하는 모듈(segments 등)은 저장소 루트에 있음
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import dealcodec  # noqa: E402
+from clusters import ClusterState, ClusterStore, item_minute  # noqa: E402
+from dealfields import selenium_extract_rows, selenium_row_count  # noqa: E402
+from dedupe import DEAL_KEY_SIZE, deal_key  # noqa: E402
+from httpscraper import ListParseError, iter_list_pages, make_session  # noqa: E402
+from metrics import DAG_METRICS_NAME, Registry  # noqa: E402
+from ndjson import iter_records  # noqa: E402
+from normalize import normalize_rows  # noqa: E402
+from segments import LocalBackend, SegmentStore  # noqa: E402
+
 try:
     from selenium import webdriver
-    from selenium.webdriver.common.by import By
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.support.ui import WebDriverWait
 except ImportError:
     print("Selenium dependencies not found. Please ensure selenium and its webdriver are installed.")
     print("This DAG requires a compatible Chrome browser and ChromeDriver on the Airflow worker.")
 
 
-def parse_timestamp(timestamp_str):
-    """주어진 타임스탬프 문자열을 파싱하여 datetime 객체를 반환합니다."""
-    now = datetime.now()
-    timestamp_str = timestamp_str.replace(" ", "")  # 공백 제거
-    if "방금" in timestamp_str:
-        return now
-    elif "분전" in timestamp_str:
-        minutes = int(re.search(r'(\d+)분전', timestamp_str).group(1))
-        return now - timedelta(minutes=minutes)
-    elif "시간전" in timestamp_str:
-        hours = int(re.search(r'(\d+)시간전', timestamp_str).group(1))
-        return now - timedelta(hours=hours)
-    elif "일전" in timestamp_str:
-        days = int(re.search(r'(\d+)일전', timestamp_str).group(1))
-        return now - timedelta(days=days)
-    elif "주전" in timestamp_str:
-        weeks = int(re.search(r'(\d+)주전', timestamp_str).group(1))
-        return now - timedelta(weeks=weeks)
-    elif "개월전" in timestamp_str:
-        months = int(re.search(r'(\d+)개월전', timestamp_str).group(1))
-        # 정확한 월 계산은 복잡하므로 대략적인 일수로 계산 (30일/월)
-        return now - timedelta(days=months * 30)
-    else:
-        return None
+SITE_URL = 'https://www.algumon.com'
+# 'http'(기본값): 브라우저 없이 HTML을 받아 파싱하고 실패 시 브라우저 사용, 'selenium': 항상 브라우저 사용
+SCRAPER_BACKEND_ENV = 'HOTDEAL_SCRAPER'
 
-def scrape_and_process_data(**kwargs):
-    bucket_name = 'moastorage'
-    blob_name = 'data/hotdeal.json'
-    
-    gcs_hook = GCSHook(gcp_conn_id='google_cloud_default') # Airflow Connection ID
+# 증분 크롤링: 새 행이 나타날 때까지만 기다리고, 이미 저장된 항목에 도달하면 스크롤을 멈춤
+MAX_SCROLLS = 30
+ROW_WAIT_TIMEOUT = 15 # 스크롤 후 새 행을 기다리는 최대 시간(초)
+ROW_POLL_INTERVAL = 0.25
+# 이미 저장된 항목이 연속으로 이만큼 나오면 이전 실행의 지점(watermark)에 도달한 것으로 봄
+# (끌어올려진 예전 글 하나 때문에 일찍 멈추지 않도록 하나만으로는 판단하지 않음)
+WATERMARK_CONFIRM_ROWS = 3
+
+# 이 환경 변수에 경로를 지정하면 GCS 대신 로컬 디렉터리에 세그먼트를 저장 (GCS 없이 파이프라인 실행/테스트용)
+LOCAL_STORAGE_ENV = 'HOTDEAL_LOCAL_STORAGE'
+BUCKET_NAME = 'moastorage'
+SEGMENT_PREFIX = 'data/'
+
+
+class GCSHookBackend:
+    """segments.SegmentStore가 Airflow GCSHook을 통해 버킷에 접근하도록 하는 백엔드."""
+
+    def __init__(self, gcs_hook, bucket_name, prefix=''):
+        self.gcs_hook = gcs_hook
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+
+    def version(self, name):
+        object_name = self.prefix + name
+        if not self.gcs_hook.exists(bucket_name=self.bucket_name, object_name=object_name):
+            return None
+        updated = self.gcs_hook.get_blob_update_time(bucket_name=self.bucket_name, object_name=object_name)
+        return int(updated.timestamp() * 1_000_000)
+
+    def read(self, name):
+        object_name = self.prefix + name
+        if not self.gcs_hook.exists(bucket_name=self.bucket_name, object_name=object_name):
+            return None
+        return self.gcs_hook.download(bucket_name=self.bucket_name, object_name=object_name)
+
+    def open(self, name):
+        return io.BytesIO(self.gcs_hook.download(bucket_name=self.bucket_name, object_name=self.prefix + name))
+
+    def write(self, name, data, content_type='application/octet-stream'):
+        self.gcs_hook.upload(
+            bucket_name=self.bucket_name,
+            object_name=self.prefix + name,
+            data=data,
+            mime_type=content_type
+        )
+
+
+# 중복 확인용 키 색인: 헤더(색인을 만든 항목 수) + (title, link) 16바이트 digest 목록
+KEY_INDEX_HEADER = struct.Struct("<Q")
+KEY_DIGEST_SIZE = DEAL_KEY_SIZE
+
+
+def build_key_index(items):
+    return {deal_key(item.get('title'), item.get('link')) for item in items}
 
-    existing_data = []
-    # GCS에서 기존 데이터 로드 시도
+
+def load_key_index(backend, index_name, item_count, load_items):
+    """
+    데이터셋 옆에 저장된 키 색인을 불러옵니다.
+
+    색인이 없거나 기록된 항목 수가 현재 데이터(item_count)와 다르면 load_items()의 항목으로 다시 만듭니다.
+    """
     try:
-        # object_exists 메서드를 사용하여 blob 존재 여부 확인
-        if gcs_hook.exists(bucket_name=bucket_name, object_name=blob_name):
-            #data_str = gcs_hook.download_as_string(bucket_name=bucket_name, object_name=blob_name).decode('utf-8')
-            data_str = gcs_hook.download(bucket_name=bucket_name, object_name=blob_name).decode('utf-8')
-            existing_data = json.loads(data_str)
-            print(f"Loaded {len(existing_data)} existing items from GCS.")
-        else:
-            print(f"Blob {blob_name} does not exist in bucket {bucket_name}. Starting with empty data.")
+        data = backend.read(index_name)
+        if data is not None:
+            body = data[KEY_INDEX_HEADER.size:]
+            if len(data) >= KEY_INDEX_HEADER.size and len(body) % KEY_DIGEST_SIZE == 0:
+                (indexed_count,) = KEY_INDEX_HEADER.unpack_from(data)
+                if indexed_count == item_count:
+                    keys = {body[i:i + KEY_DIGEST_SIZE] for i in range(0, len(body), KEY_DIGEST_SIZE)}
+                    print(f"Loaded {len(keys)} dedupe keys from {index_name}.")
+                    return keys
+            print(f"Dedupe key index is stale or corrupted. Rebuilding from {item_count} items.")
     except Exception as e:
-        print(f"Error loading existing data from GCS: {e}. Starting with empty data.")
-        existing_data = []
+        print(f"Error loading dedupe key index: {e}. Rebuilding from existing data.")
+    return build_key_index(load_items())
 
-    new_scraped_data = []
-    
+
+def save_key_index(backend, index_name, keys, item_count):
+    try:
+        backend.write(index_name, KEY_INDEX_HEADER.pack(item_count) + b"".join(keys))
+    except Exception as e:
+        # 색인은 다음 실행에서 데이터로부터 다시 만들 수 있으므로 실패해도 계속 진행
+        print(f"Error uploading dedupe key index: {e}")
+
+
+def save_run_metrics(backend, metrics):
+    """실행 지표를 Prometheus 텍스트로 저장합니다. (봇의 /metrics 엔드포인트와 /지표 명령어에서 표시)"""
+    try:
+        backend.write(DAG_METRICS_NAME, metrics.render().encode('utf-8'), 'text/plain')
+    except Exception as e:
+        # 지표는 다음 실행에서 다시 기록되므로 실패해도 계속 진행
+        print(f"Error uploading run metrics: {e}")
+
+
+def iter_legacy_data(gcs_hook, bucket_name, blob_name):
+    """
+    세그먼트 저장소로 옮기기 전의 단일 hotdeal.json 항목을 하나씩 반환합니다. 파일이 없으면 아무것도 반환하지 않습니다.
+
+    전체 항목 목록을 만들지 않으므로 이력 크기와 상관없이 세그먼트 하나 분량의 항목만 메모리에 있습니다.
+    """
+    if not gcs_hook.exists(bucket_name=bucket_name, object_name=blob_name):
+        return
+    data = gcs_hook.download(bucket_name=bucket_name, object_name=blob_name)
+    if dealcodec.is_encoded(data):
+        yield from dealcodec.decode(data)
+    else:
+        yield from iter_records(io.BytesIO(data))
+
+
+class CrawlState:
+    """한 번의 실행에서 읽은 행을 중복 확인하여 새 항목을 모으고, watermark 도달 여부를 기록합니다."""
+
+    def __init__(self, existing_keys):
+        self.existing_keys = existing_keys
+        self.new_keys = set()
+        self.new_items = []
+        self.backend = None
+        self.scroll_count = 0
+        self.scraped_count = 0
+        self.duplicate_existing_count = 0
+        self.duplicate_in_run_count = 0
+        self.consecutive_known = 0
+        # 처음 실행(저장된 항목 없음)이면 watermark가 없으므로 최대 스크롤까지 진행
+        self.reached_watermark = False
+
+    def add_rows(self, rows):
+        """dealfields 형식의 행을 처리하고, watermark에 도달했으면 True를 반환합니다."""
+        # 한 번에 읽은 행은 같은 기준 시각으로 등록 시간/가격을 정규화
+        for product_info in normalize_rows(rows):
+            # 기존 데이터 및 이번에 스크래핑한 데이터 내에서 중복 확인
+            self.scraped_count += 1
+            key = deal_key(product_info['title'], product_info['link'])
+            if key in self.existing_keys:
+                self.duplicate_existing_count += 1
+                self.consecutive_known += 1
+                if self.consecutive_known >= WATERMARK_CONFIRM_ROWS:
+                    self.reached_watermark = True
+                continue
+            self.consecutive_known = 0
+            if key in self.new_keys:
+                self.duplicate_in_run_count += 1
+            else:
+                self.new_keys.add(key)
+                self.new_items.append(product_info)
+        return self.reached_watermark
+
+
+def crawl_with_http(state):
+    """
+    브라우저 없이 목록 페이지를 HTTP로 읽습니다.
+
+    httpscraper.PAGE_URL_TEMPLATE이 없으면 첫 페이지만 읽을 수 있으므로, 새 항목이 한 페이지보다 많은 실행은
+    watermark에 도달하지 못합니다. 이때도 읽은 행은 state에 남기고 브라우저 경로가 이어서 읽습니다.
+
+    Returns:
+        bool: watermark까지 읽었으면 True. False이면 브라우저 경로로 이어서 읽어야 합니다.
+    """
+    if not state.existing_keys:
+        # 처음 실행은 깊이 스크롤해야 하므로 브라우저 사용
+        return False
+    state.backend = 'http'
+    try:
+        with make_session() as session:
+            for rows in iter_list_pages(session, MAX_SCROLLS + 1, SITE_URL):
+                if state.add_rows(rows):
+                    print(f"Reached already stored items after {state.scroll_count + 1} pages over HTTP.")
+                    return True
+                state.scroll_count += 1
+    except (ImportError, ListParseError) as e:
+        print(f"HTTP scraping failed after {state.scraped_count} rows, falling back to the browser: {e}")
+        return False
+    print(f"HTTP scraping read {state.scraped_count} rows without reaching already stored items. "
+          f"Continuing with the browser.")
+    return False
+
+
+def crawl_with_selenium(state):
+    """headless Chrome으로 목록을 스크롤하며 watermark에 도달할 때까지 읽습니다."""
+    state.backend = 'selenium'
     options = webdriver.ChromeOptions()
     options.add_experimental_option("excludeSwitches", ["enable-logging"])
     options.add_argument("headless")
@@ -76,53 +227,32 @@ def scrape_and_process_data(**kwargs):
     try:
         browser = webdriver.Chrome(options=options)
 
-        url = 'https://www.algumon.com'
-        browser.get(url)
+        browser.get(SITE_URL)
 
-        titleselector = "/html/body/div[6]/div[2]/ul/li/div[1]/div[2]/div/p[2]/span/a"
-        priceselector = "/html/body/div[6]/div[2]/ul/li/div[1]/div[2]/p[1]"
-        linkselector = "/html/body/div[6]/div[2]/ul/li/div[1]/div[2]/div/p[2]/span/a"
-        timestampselector = "/html/body/div[6]/div[2]/ul/li/div[1]/div[2]/p[2]/small"
-        
         last_count = 0
 
-        for _ in range(2):
-            time.sleep(5) # 페이지 로딩 대기
-
-            current_titles = browser.find_elements(By.XPATH, titleselector)
-            current_prices = browser.find_elements(By.XPATH, priceselector)
-            current_links = browser.find_elements(By.XPATH, linkselector)
-            current_timestamps = browser.find_elements(By.XPATH, timestampselector)
-
-            for i in range(last_count, len(current_titles)):
-                timestamp_text = current_timestamps[i].text
-                parsed_datetime = parse_timestamp(timestamp_text)
-
-                if parsed_datetime:
-                    formatted_timestamp = parsed_datetime.strftime("%Y/%m/%d-%H:%M")
-                else:
-                    formatted_timestamp = timestamp_text  # 파싱 실패 시 원래 텍스트 유지
-
-                product_info = {
-                    'title': current_titles[i].text,
-                    'price': current_prices[i].text,
-                    'link': current_links[i].get_attribute("href"),
-                    'timestamp': formatted_timestamp
-                }
-                
-                if not any(item['title'] == product_info['title'] and item['link'] == product_info['link'] for item in existing_data + new_scraped_data):
-                    new_scraped_data.append(product_info)
-                # 기존 데이터 및 이번에 스크래핑한 데이터 내에서 중복 확인
-#                for item in existing_data + new_scraped_data:
-#                    if item['title'] == product_info['title'] and item['link'] == product_info['link']:
-#                        is_duplicate = True
-#                        continue
-#                
-#                    if not is_duplicate:
-#                        new_scraped_data.append(product_info)
-            
-            last_count = len(current_titles)
+        while state.scroll_count < MAX_SCROLLS:
+            # 고정 시간 대기 대신 행 수가 늘어날 때까지만 기다림
+            try:
+                WebDriverWait(browser, ROW_WAIT_TIMEOUT, poll_frequency=ROW_POLL_INTERVAL).until(
+                    lambda driver: selenium_row_count(driver) > last_count
+                )
+            except TimeoutException:
+                print(f"No new rows appeared within {ROW_WAIT_TIMEOUT}s after {state.scroll_count} scrolls. Stopping.")
+                break
+
+            # 새로 나타난 행 전체를 스크립트 한 번으로 읽음 (항목마다 WebDriver를 호출하지 않음)
+            row_count, rows = selenium_extract_rows(browser, last_count)
+            last_count = row_count
+            if state.add_rows(rows):
+                print(f"Reached already stored items after {state.scroll_count} scrolls. Stopping.")
+                break
+            # watermark에 도달하지 못했으면 그 사이에 올라온 항목이 더 있으므로 계속 스크롤
             browser.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            state.scroll_count += 1
+        else:
+            if state.existing_keys:
+                print(f"Warning: watermark not reached within {MAX_SCROLLS} scrolls. Some items may be missing.")
 
     except Exception as e:
         print(f"Error during web scraping: {e}")
@@ -130,24 +260,174 @@ def scrape_and_process_data(**kwargs):
         if 'browser' in locals() and browser:
             browser.quit()
 
-    # 기존 데이터와 새로 스크래핑한 데이터 병합
-    combined_data = existing_data + new_scraped_data
-    
-    # 'no' 필드 재정렬 및 번호 부여
-    for i, item in enumerate(combined_data):
-        item['no'] = i + 1
 
-    # 업데이트된 데이터를 JSON 형식으로 GCS에 업로드
+def make_backend(bucket_name, segment_prefix):
+    """HOTDEAL_LOCAL_STORAGE가 지정되면 로컬 디렉터리, 아니면 GCS를 사용합니다. (백엔드, GCSHook 또는 None)"""
+    local_storage = os.environ.get(LOCAL_STORAGE_ENV)
+    if local_storage:
+        return LocalBackend(local_storage), None
+    gcs_hook = GCSHook(gcp_conn_id='google_cloud_default') # Airflow Connection ID
+    return GCSHookBackend(gcs_hook, bucket_name, segment_prefix), gcs_hook
+
+
+def scrape_and_process_data(**kwargs):
+    bucket_name = BUCKET_NAME
+    legacy_blob_name = 'data/hotdeal.json'
+    index_name = 'hotdeal.keys'
+
+    run_start = time.perf_counter()
+    # 실행마다 새로 기록하여 저장소의 지표 파일을 덮어씀
+    metrics = Registry()
+    stage_seconds = metrics.gauge('hotdeal_dag_stage_seconds', 'Duration of each scrape stage in the last run.',
+                                  labels=('stage',))
+    row_counts = metrics.gauge('hotdeal_dag_rows', 'Rows scraped in the last run by dedupe result.',
+                               labels=('result',))
+
+    backend, gcs_hook = make_backend(bucket_name, SEGMENT_PREFIX)
+    segment_store = SegmentStore(backend)
+
+    # 기존 데이터 전체 대신 작은 manifest만 내려받음
+    with stage_seconds.time(stage='load_manifest'):
+        manifest = segment_store.load_manifest()
+        if not manifest.segments and gcs_hook is not None:
+            # 처음 실행 시 기존 hotdeal.json을 MAX_SEGMENT_ITEMS개씩 나누어 세그먼트로 옮김
+            # (no는 기존과 같이 1부터 다시 부여됨). 옮기다 실패하면 manifest 없이 이력이 빠진 저장소가 만들어지지
+            # 않도록 작업을 실패시키고 다음 실행에서 다시 옮김
+            try:
+                manifest = segment_store.append_stream(
+                    iter_legacy_data(gcs_hook, bucket_name, legacy_blob_name), manifest)
+            except Exception as e:
+                print(f"Error migrating legacy data from gs://{bucket_name}/{legacy_blob_name}: {e}")
+                raise
+            if manifest.segments:
+                print(f"Migrated {manifest.max_no} legacy items into {len(manifest.segments)} segments.")
+    print(f"Manifest has {len(manifest.segments)} segments, max no {manifest.max_no}.")
+
+    # 기존 데이터의 (title, link) 키를 한 번만 불러와 항목별 중복 확인을 O(1)로 처리
+    with stage_seconds.time(stage='load_key_index'):
+        existing_keys = load_key_index(backend, index_name, manifest.max_no,
+                                       lambda: segment_store.iter_items(manifest))
+
+    # 기본은 브라우저 없이 HTTP로 읽고, 파싱에 실패하거나 watermark에 도달하지 못하면 브라우저로 이어서 읽음.
+    # HTTP로 읽은 행은 버리지 않으므로 브라우저가 실패해도 그만큼은 저장되고, 다시 읽은 행은 중복으로 걸러짐
+    with stage_seconds.time(stage='crawl'):
+        state = CrawlState(existing_keys)
+        reached = False
+        if os.environ.get(SCRAPER_BACKEND_ENV, 'http') == 'http':
+            reached = crawl_with_http(state)
+        if not reached:
+            state.scroll_count = 0
+            crawl_with_selenium(state)
+
+    new_keys = state.new_keys
+    new_scraped_data = state.new_items
+    scraped_count = state.scraped_count
+    duplicate_existing_count = state.duplicate_existing_count
+    duplicate_in_run_count = state.duplicate_in_run_count
+
+    duplicate_count = duplicate_existing_count + duplicate_in_run_count
+    duplicate_rate = duplicate_count / scraped_count if scraped_count else 0.0
+    print(f"Scraped {scraped_count} items: {len(new_scraped_data)} new, "
+          f"{duplicate_existing_count} already stored, {duplicate_in_run_count} repeated within this run "
+          f"(duplicate rate {duplicate_rate:.1%}).")
+
+    # 새 항목만 하나의 세그먼트로 추가 (기존 세그먼트는 다시 쓰지 않음, no는 manifest의 최대 no 다음부터 부여)
+    if new_scraped_data:
+        try:
+            with stage_seconds.time(stage='append_segment'):
+                manifest = segment_store.append(new_scraped_data, manifest)
+            print(f"Successfully appended {len(new_scraped_data)} items as {manifest.segments[-1]['name']} "
+                  f"(max no {manifest.max_no})")
+            # 세그먼트 추가가 성공한 경우에만 색인을 갱신해 색인과 데이터의 항목 수를 맞춤
+            with stage_seconds.time(stage='save_key_index'):
+                save_key_index(backend, index_name, existing_keys | new_keys, manifest.max_no)
+        except Exception as e:
+            print(f"Error uploading new segment: {e}")
+    else:
+        print("No new items. Skipping segment upload.")
+
+    row_counts.set(len(new_scraped_data), result='new')
+    row_counts.set(duplicate_existing_count, result='duplicate_existing')
+    row_counts.set(duplicate_in_run_count, result='duplicate_in_run')
+    metrics.gauge('hotdeal_dag_scrolls', 'Scrolls or pages read in the last run.').set(state.scroll_count)
+    metrics.gauge('hotdeal_dag_reached_watermark', 'Whether the last run reached already stored items.').set(
+        int(state.reached_watermark))
+    stage_seconds.set(time.perf_counter() - run_start, stage='total')
+    metrics.gauge('hotdeal_dag_last_run_timestamp_seconds', 'Unix time when the last run finished.').set(
+        int(time.time()))
+    save_run_metrics(backend, metrics)
+
+    # 스크롤 횟수 조정에 참고할 수 있도록 실행별 중복률과 단계별 처리 시간을 XCom으로 남김
+    return {
+        'scraped': scraped_count,
+        'new': len(new_scraped_data),
+        'duplicate_existing': duplicate_existing_count,
+        'duplicate_in_run': duplicate_in_run_count,
+        'duplicate_rate': duplicate_rate,
+        'backend': state.backend,
+        'scrolls': state.scroll_count,
+        'reached_watermark': state.reached_watermark,
+        'stage_seconds': {stage: stage_seconds.value(stage=stage) for (stage,) in stage_seconds.label_values()},
+    }
+
+
+def cluster_new_items(**kwargs):
+    """
+    스크래핑 단계에서 추가된 항목을 기존 유사 핫딜 클러스터에 배정하고 클러스터 파일을 갱신합니다.
+
+    클러스터 파일에 기록된 항목 수 이후의 항목만 처리하므로, 실패하거나 건너뛴 실행의 항목은
+    다음 실행에서 함께 처리됩니다. 이전 항목의 클러스터 id는 마지막 part만 불러오고 다시 씁니다.
+    """
+    backend, _ = make_backend(BUCKET_NAME, SEGMENT_PREFIX)
+    segment_store = SegmentStore(backend)
+    cluster_store = ClusterStore(backend)
+    manifest = segment_store.load_manifest()
+
+    state = ClusterState()
     try:
-        gcs_hook.upload(
-            bucket_name=bucket_name,
-            object_name=blob_name,
-            data=json.dumps(combined_data, ensure_ascii=False, indent=4),
-            mime_type='application/json'
-        )
-        print(f"Successfully uploaded {len(combined_data)} items to gs://{bucket_name}/{blob_name}")
+        loaded = cluster_store.load_state()
+        if loaded is not None:
+            state = loaded
+            print(f"Loaded clusters for {state.item_count} items ({len(state.reps)} active clusters, "
+                  f"{len(state.assignments)} assignments in the last part).")
     except Exception as e:
-        print(f"Error uploading data to GCS: {e}")
+        print(f"Error loading clusters: {e}. Re-clustering from the first item.")
+    if state.item_count > manifest.max_no:
+        print(f"Clusters cover {state.item_count} items but manifest max no is {manifest.max_no}. "
+              f"Re-clustering from the first item.")
+        state = ClusterState()
+
+    # 이미 배정된 항목만 담은 세그먼트는 내려받지 않음
+    start = next((i for i, segment in enumerate(manifest.segments) if segment['last_no'] > state.item_count),
+                 len(manifest.segments))
+    clustered = 0
+    new_clusters = 0
+    latest_minute = None
+    for item in segment_store.iter_items(manifest, start=start):
+        no = item.get('no')
+        if not no or no <= state.item_count:
+            continue
+        minute = item_minute(item)
+        if state.assign(no, item.get('title'), minute) == no:
+            new_clusters += 1
+        clustered += 1
+        if minute is not None and (latest_minute is None or minute > latest_minute):
+            latest_minute = minute
+
+    if not clustered:
+        print("No new items to cluster.")
+        return {'clustered': 0, 'new_clusters': 0, 'active_clusters': len(state.reps), 'pruned': 0}
+
+    pruned = state.prune(latest_minute) if latest_minute is not None else 0
+    cluster_store.save(state)
+    print(f"Clustered {clustered} items: {new_clusters} new clusters, {len(state.reps)} active, "
+          f"{pruned} expired from matching.")
+    return {
+        'clustered': clustered,
+        'new_clusters': new_clusters,
+        'active_clusters': len(state.reps),
+        'pruned': pruned,
+    }
 
 
 with DAG(
@@ -155,9 +435,16 @@ with DAG(
     start_date=pendulum.datetime(2023, 1, 1, tz="UTC"),
     schedule=timedelta(minutes=20), # 예: 매시간 실행
     catchup=False,
+    max_active_runs=1, # manifest는 한 번에 한 실행만 갱신
     tags=['web_scraping', 'gcs'],
 ) as dag:
     scrape_task = PythonOperator(
         task_id='scrape_and_upload_hotdeal_data',
         python_callable=scrape_and_process_data,
-    )
\ No newline at end of file
+    )
+    # 유사 핫딜 판정은 봇의 알림마다 하지 않고 여기서 새 항목마다 한 번만 수행
+    cluster_task = PythonOperator(
+        task_id='cluster_hotdeal_data',
+        python_callable=cluster_new_items,
+    )
+    scrape_task >> cluster_task
\ No newline at end of file
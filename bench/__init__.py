@@ -0,0 +1 @@
+"""모아요정 성능 측정 스크립트 모음. 저장소 최상위에서 `python -m bench.<모듈>`로 실행합니다."""
@@ -0,0 +1,76 @@
+"""
+스냅샷 형식별 인코딩/디코딩 시간과 크기 비교.
+
+기존 방식(json.dumps(indent=4) / json.loads)과 들여쓰기 없는 JSON, dealcodec 바이너리 형식을
+같은 데이터로 측정합니다. 적재는 봇이 세그먼트를 DealStore로 옮기는 시간입니다.
+(JSON은 dict 목록을 만든 뒤 extend, dealcodec은 decode_columns 후 extend_columns)
+
+    python -m bench.codec --count 100000 --count 1000000
+"""
+import argparse
+import json
+import time
+
+import dealcodec
+from bench.generator import iter_items
+from dealstore import DealStore
+
+
+def load_json(data: bytes) -> DealStore:
+    store = DealStore()
+    store.extend(json.loads(data))
+    return store
+
+
+def load_dealcodec(data: bytes) -> DealStore:
+    store = DealStore()
+    store.extend_columns(*dealcodec.decode_columns(data))
+    return store
+
+
+FORMATS = {
+    "json indent=4": (
+        lambda items: json.dumps(items, ensure_ascii=False, indent=4).encode("utf-8"),
+        lambda data: json.loads(data),
+        load_json,
+    ),
+    "json compact": (
+        lambda items: json.dumps(items, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+        lambda data: json.loads(data),
+        load_json,
+    ),
+    "dealcodec": (dealcodec.encode, dealcodec.decode, load_dealcodec),
+}
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, action="append",
+                        help="항목 수 (여러 번 지정 가능, 기본값: 100000, 1000000)")
+    args = parser.parse_args()
+
+    for count in args.count or [100_000, 1_000_000]:
+        # 적재 단계에서 정규화된 항목 (DAG가 저장하는 형식)
+        items = list(iter_items(count))
+        print(f"항목 수: {count}")
+        print(f"{'형식':<16}{'크기(MB)':>10}{'인코딩(s)':>12}{'디코딩(s)':>12}{'적재(s)':>10}")
+        for name, (encode, decode, load) in FORMATS.items():
+            data, encode_seconds = timed(encode, items)
+            decoded, decode_seconds = timed(decode, data)
+            if decoded != items:
+                raise AssertionError(f"{name}: 디코딩 결과가 원본과 다릅니다.")
+            del decoded
+            _, load_seconds = timed(load, data)
+            print(f"{name:<16}{len(data) / 1e6:>10.1f}{encode_seconds:>12.2f}{decode_seconds:>12.2f}"
+                  f"{load_seconds:>10.2f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+로컬 디렉터리를 사용하는 google.cloud.storage / Airflow GCSHook 대역.
+
+`<root>/<버킷>/<객체 이름>` 파일을 객체로 사용하며, 파일 수정 시각(ns)을 generation으로 씁니다.
+봇(GCSBlobSource, segments.GCSBackend)과 DAG(GCSHookBackend)가 실제로 호출하는 메서드만 구현하므로
+GCS 없이 같은 코드 경로를 측정할 수 있습니다. 클라이언트를 직접 넘기지 않는 코드를 위해
+install()은 google.cloud.storage.Client를 이 대역으로 바꿉니다. (google 라이브러리가 없어도 동작)
+"""
+import datetime
+import os
+import sys
+import tempfile
+import types
+
+try:
+    from google.api_core.exceptions import NotFound
+except ImportError:
+    class NotFound(Exception):
+        """google.api_core.exceptions.NotFound 대역."""
+
+
+def _write_atomic(path: str, data: bytes):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class FakeBlob:
+    def __init__(self, bucket: "FakeBucket", name: str, generation: int | None = None):
+        self.bucket = bucket
+        self.name = name
+        self.generation = generation
+        self.updated = None
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.bucket.path, *self.name.split("/"))
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def reload(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            raise NotFound(f"{self.bucket.name}/{self.name}")
+        self.generation = stat.st_mtime_ns
+        self.updated = datetime.datetime.fromtimestamp(stat.st_mtime, datetime.timezone.utc)
+
+    def download_as_bytes(self) -> bytes:
+        try:
+            with open(self.path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise NotFound(f"{self.bucket.name}/{self.name}")
+
+    def open(self, mode: str = "rb", chunk_size: int | None = None):
+        if mode != "rb":
+            raise ValueError("FakeBlob.open은 'rb'만 지원합니다.")
+        try:
+            return open(self.path, "rb")
+        except FileNotFoundError:
+            raise NotFound(f"{self.bucket.name}/{self.name}")
+
+    def upload_from_string(self, data, content_type: str | None = None):
+        _write_atomic(self.path, data.encode("utf-8") if isinstance(data, str) else data)
+
+    def delete(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            raise NotFound(f"{self.bucket.name}/{self.name}")
+
+
+class FakeBucket:
+    def __init__(self, client: "FakeStorageClient", name: str):
+        self.client = client
+        self.name = name
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.client.root, self.name)
+
+    def blob(self, name: str, generation: int | None = None) -> FakeBlob:
+        return FakeBlob(self, name, generation)
+
+
+class FakeStorageClient:
+    """google.cloud.storage.Client 대역."""
+
+    def __init__(self, root: str, *args, **kwargs):
+        self.root = root
+
+    def bucket(self, name: str) -> FakeBucket:
+        return FakeBucket(self, name)
+
+
+class FakeGCSHook:
+    """airflow.providers.google.cloud.hooks.gcs.GCSHook 대역."""
+
+    def __init__(self, root: str, gcp_conn_id: str | None = None):
+        self.client = FakeStorageClient(root)
+
+    def _blob(self, bucket_name: str, object_name: str) -> FakeBlob:
+        return self.client.bucket(bucket_name).blob(object_name)
+
+    def exists(self, bucket_name: str, object_name: str) -> bool:
+        return self._blob(bucket_name, object_name).exists()
+
+    def get_blob_update_time(self, bucket_name: str, object_name: str) -> datetime.datetime:
+        blob = self._blob(bucket_name, object_name)
+        blob.reload()
+        return blob.updated
+
+    def download(self, bucket_name: str, object_name: str) -> bytes:
+        return self._blob(bucket_name, object_name).download_as_bytes()
+
+    def upload(self, bucket_name: str, object_name: str, data=None, mime_type: str | None = None, **kwargs):
+        self._blob(bucket_name, object_name).upload_from_string(data, content_type=mime_type)
+
+
+def install(root: str):
+    """이후 만들어지는 google.cloud.storage.Client가 root 아래의 대역을 사용하도록 합니다."""
+    try:
+        from google.cloud import storage
+    except ImportError:
+        google = sys.modules.setdefault("google", types.ModuleType("google"))
+        cloud = sys.modules.setdefault("google.cloud", types.ModuleType("google.cloud"))
+        storage = sys.modules.setdefault("google.cloud.storage", types.ModuleType("google.cloud.storage"))
+        google.cloud = cloud
+        cloud.storage = storage
+        api_core = sys.modules.setdefault("google.api_core", types.ModuleType("google.api_core"))
+        exceptions = sys.modules.setdefault("google.api_core.exceptions",
+                                            types.ModuleType("google.api_core.exceptions"))
+        exceptions.NotFound = NotFound
+        google.api_core = api_core
+        api_core.exceptions = exceptions
+    storage.Client = lambda *args, **kwargs: FakeStorageClient(root)
@@ -0,0 +1,148 @@
+"""
+합성 핫딜 데이터 생성기.
+
+실제 알구몬 목록과 비슷한 한국어 제목(쇼핑몰 태그, 브랜드/상품명, 옵션, 가격 표기)을 만들고,
+같은 상품이 가격을 바꿔 여러 번 올라오도록 하여 검색/유사 핫딜/가격 이력 측정이 실제 분포에 가깝도록 합니다.
+항목은 적재 단계와 같은 형식(normalize.normalize_row 결과 + no)이며 seed가 같으면 항상 같은 데이터를 만듭니다.
+항목을 하나씩 만들어 바로 기록하므로 500만 개도 메모리에 모두 올리지 않습니다.
+
+    python -m bench.generator --count 1000000 -o hotdeal.ndjson
+    python -m bench.generator --count 100000 --format json -o hotdeal.json
+"""
+import argparse
+import datetime
+import json
+import random
+
+from ndjson import NDJSONWriter
+from normalize import KST, TIMESTAMP_FORMAT
+
+SHOPS = ["쿠팡", "G마켓", "11번가", "옥션", "SSG", "네이버", "롯데ON", "위메프", "티몬", "하이마트"]
+EXTRAS = ["무료배송", "카드할인", "와우회원", "최저가", "한정수량", "타임딜", "쿠폰적용"]
+
+# (상품명, 옵션 목록, 가격 범위)
+PRODUCTS = [
+    ("농심 신라면", ["120g 20개", "5개입", "40개"], (4000, 30000)),
+    ("오뚜기 진라면 매운맛", ["120g 20개", "5개입"], (4000, 25000)),
+    ("삼양 불닭볶음면", ["140g 10개", "5개입"], (4000, 20000)),
+    ("CJ 햇반", ["210g 24개", "210g 36개", "130g 24개"], (15000, 45000)),
+    ("삼다수", ["2L 12병", "500ml 40병"], (8000, 25000)),
+    ("맥심 모카골드 믹스", ["180T", "250T"], (18000, 40000)),
+    ("삼성 갤럭시 S24 울트라", ["256GB 자급제", "512GB 자급제"], (900000, 1800000)),
+    ("애플 아이폰 15 프로", ["128GB", "256GB"], (1000000, 1900000)),
+    ("애플 에어팟 프로 2세대", ["USB-C", "MagSafe"], (190000, 360000)),
+    ("삼성 갤럭시 버즈2 프로", ["블랙", "화이트"], (90000, 230000)),
+    ("소니 WH-1000XM5", ["블랙", "실버"], (300000, 480000)),
+    ("LG 27인치 4K 모니터", ["27UP850", "27UL550"], (250000, 600000)),
+    ("삼성 오디세이 G5 32인치", ["QHD 165Hz"], (300000, 500000)),
+    ("LG 그램 16", ["i5 16GB", "i7 32GB"], (1200000, 2200000)),
+    ("애플 맥북 에어 M3", ["13인치 8GB", "15인치 16GB"], (1300000, 2400000)),
+    ("로지텍 MX Keys", ["미니", "풀사이즈"], (100000, 180000)),
+    ("로지텍 MX Master 3S", ["그래파이트", "페일그레이"], (90000, 150000)),
+    ("다우니 섬유유연제", ["3.1L 2개", "4L"], (15000, 35000)),
+    ("피죤 세탁세제", ["3L 3개", "리필 2.1L 4개"], (12000, 30000)),
+    ("닌텐도 스위치 OLED", ["화이트", "네온"], (330000, 420000)),
+]
+
+# 상품명에 나오는 단어 (스캔/검색 키워드 후보)
+KEYWORDS = sorted({word for name, _, _ in PRODUCTS for word in name.split() if len(word) > 1})
+
+
+def _variants(count: int, rng: random.Random) -> list[tuple[str, int, float]]:
+    """상품 변형(모델) 목록. 한 변형이 평균 20번 정도 다시 올라오도록 항목 수에 비례해 만듭니다."""
+    variants = []
+    for i in range(max(len(PRODUCTS), count // 20)):
+        name, options, (low, high) = PRODUCTS[i % len(PRODUCTS)]
+        model = f"{rng.choice('ABCDEFGHJKLMNPRSTUVWXYZ')}{rng.randrange(100, 10000)}"
+        title = f"{name} {rng.choice(options)} {model}"
+        base_price = rng.randrange(low, high)
+        # 인기 상품일수록 자주 올라옴 (Zipf 분포에 가까운 가중치)
+        variants.append((title, base_price, 1.0 / (i // len(PRODUCTS) + 1)))
+    return variants
+
+
+def iter_items(count: int, seed: int = 0, start: datetime.datetime | None = None, first_no: int = 1):
+    """
+    합성 핫딜 항목을 하나씩 반환합니다.
+
+    Args:
+        count (int): 항목 수.
+        seed (int): 같은 seed는 같은 데이터를 만듭니다.
+        start (datetime | None): 첫 항목의 등록 시각 (KST). 기본값은 2025-01-01.
+        first_no (int): 첫 항목의 no.
+    """
+    rng = random.Random(seed)
+    variants = _variants(count, rng)
+    weights = [weight for _, _, weight in variants]
+    minute = int((start or datetime.datetime(2025, 1, 1, tzinfo=KST)).timestamp()) // 60
+    batch = []
+    for i in range(count):
+        if not batch:
+            batch = rng.choices(variants, weights, k=1024)
+        title, base_price, _ = batch.pop()
+        # 같은 상품도 올라올 때마다 가격이 조금씩 다름
+        price = int(base_price * rng.uniform(0.85, 1.1)) // 10 * 10
+        minute += rng.randrange(0, 3)
+        extra = rng.choice(EXTRAS)
+        yield {
+            'title': f"[{rng.choice(SHOPS)}] {title} ({price:,}원/{extra})",
+            'price': f"{price:,}원",
+            'link': f"https://www.algumon.com/l/d/{seed}-{first_no + i}",
+            'timestamp': datetime.datetime.fromtimestamp(minute * 60, KST).strftime(TIMESTAMP_FORMAT),
+            'timestamp_epoch': minute * 60,
+            'price_value': float(price),
+            'no': first_no + i,
+        }
+
+
+def make_keywords(count: int, seed: int = 0) -> list[str]:
+    """스캔/검색 키워드 count개. 상품명 단어를 먼저 쓰고, 모자라면 드물게 일치하는 모델명을 섞습니다."""
+    rng = random.Random(seed)
+    keywords = list(KEYWORDS)
+    rng.shuffle(keywords)
+    while len(keywords) < count:
+        keywords.append(f"{rng.choice('ABCDEFGHJKLMNPRSTUVWXYZ')}{rng.randrange(100, 10000)}")
+    return keywords[:count]
+
+
+def make_subscriptions(users: int, keywords: list[str], per_user: int = 3, seed: int = 0):
+    """(user_id, keyword) 목록. 사용자마다 per_user개의 키워드를 구독합니다."""
+    rng = random.Random(seed)
+    return [(1_000_000 + user, keyword)
+            for user in range(users)
+            for keyword in rng.sample(keywords, min(per_user, len(keywords)))]
+
+
+def write_json_array(path: str, items):
+    """hotdeal.json과 같은 JSON 배열을 항목 하나씩 씁니다."""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for item in items:
+            f.write(",\n" if count else "\n")
+            f.write(json.dumps(item, ensure_ascii=False))
+            count += 1
+        f.write("\n]\n")
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=["ndjson", "json"], default="ndjson")
+    parser.add_argument("-o", "--output", required=True)
+    args = parser.parse_args()
+
+    items = iter_items(args.count, args.seed)
+    if args.format == "json":
+        count = write_json_array(args.output, items)
+    else:
+        with NDJSONWriter(args.output) as writer:
+            writer.write_all(items)
+        count = writer.count
+    print(f"{count}개 항목을 '{args.output}'에 저장했습니다.")
+
+
+if __name__ == "__main__":
+    main()
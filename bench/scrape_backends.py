@@ -0,0 +1,124 @@
+"""
+HTTP(lxml) 스크래퍼와 Selenium 스크래퍼의 실행 시간과 메모리 비교.
+
+알구몬 목록과 같은 구조의 HTML을 만들어 로컬 HTTP 서버로 제공하고, 각 경로를 별도 프로세스로
+실행해 걸린 시간과 최대 RSS(자식 프로세스 중 가장 큰 값)를 측정합니다. 두 경로가 모두 실행되면
+읽은 행이 같은지도 확인합니다. Selenium 경로는 selenium과 Chrome이 설치된 경우에만 측정합니다.
+
+    python -m bench.scrape_backends --rows 40
+"""
+import argparse
+import functools
+import html
+import http.server
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from bench.store_memory import make_items
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def make_fixture_html(count: int, seed: int = 0) -> str:
+    """dealfields.FIELDS의 XPath와 같은 구조의 목록 페이지를 만듭니다."""
+    rng = random.Random(seed)
+    rows = []
+    for item in make_items(count, seed):
+        minutes = rng.randint(1, 59)
+        rows.append(
+            "<li><div><div class='thumb'></div><div>"
+            f"<p class='price'>{html.escape(item['price'])}</p>"
+            f"<p><small>{minutes}분 전</small></p>"
+            "<div><p>쇼핑몰</p><p><span>"
+            f"<a href='/l/d/{item['no']}'> {html.escape(item['title'])} </a>"
+            "</span></p></div></div></div></li>"
+        )
+    filler = "".join(f"<div id='filler{i}'></div>" for i in range(5))
+    return (f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>fixture</title></head><body>"
+            f"{filler}<div><div></div><div><ul>{''.join(rows)}</ul></div></div></body></html>")
+
+
+def run_backend(backend: str, url: str):
+    """자식 프로세스에서 실행됩니다. 읽은 행을 JSON으로 출력합니다."""
+    if backend == "http":
+        from httpscraper import iter_list_pages, make_session
+        with make_session() as session:
+            rows = next(iter_list_pages(session, 1, url))
+    else:
+        from selenium import webdriver
+        from dealfields import selenium_extract_rows
+        options = webdriver.ChromeOptions()
+        options.add_argument("headless")
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        browser = webdriver.Chrome(options=options)
+        try:
+            browser.get(url)
+            _, rows = selenium_extract_rows(browser)
+        finally:
+            browser.quit()
+    json.dump(rows, sys.stdout, ensure_ascii=False)
+
+
+def measure(backend: str, url: str):
+    before = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-m", "bench.scrape_backends", "--run", backend, "--url", url],
+                            capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    if result.returncode != 0:
+        return None, elapsed, peak_kb, result.stderr.strip().splitlines()[-1:]
+    # ru_maxrss는 지금까지 종료된 자식 중 최댓값이므로, 이전보다 작으면 정확한 값이 아님
+    return json.loads(result.stdout), elapsed, peak_kb if peak_kb > before else None, []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=40)
+    parser.add_argument("--run", choices=["http", "selenium"], help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_backend(args.run, args.url)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "index.html"), "w", encoding="utf-8") as f:
+            f.write(make_fixture_html(args.rows))
+        handler = functools.partial(_QuietHandler, directory=directory)
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+        # 메모리가 작은 HTTP 경로를 먼저 측정해야 ru_maxrss 최댓값이 섞이지 않음
+        results = {}
+        print(f"행 수: {args.rows}")
+        for backend in ("http", "selenium"):
+            rows, elapsed, peak_kb, error = measure(backend, url)
+            results[backend] = rows
+            if rows is None:
+                print(f"{backend:<9} 실행 실패: {' '.join(error)}")
+                continue
+            memory = f"{peak_kb / 1024:.1f} MB" if peak_kb else "측정 불가"
+            print(f"{backend:<9} {elapsed:6.2f} s  최대 RSS {memory}  {len(rows)}행")
+        server.shutdown()
+
+    if results["http"] is not None and results["selenium"] is not None:
+        print("두 경로의 결과가 같습니다." if results["http"] == results["selenium"]
+              else "경고: 두 경로의 결과가 다릅니다.")
+
+
+if __name__ == "__main__":
+    main()
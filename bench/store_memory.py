@@ -0,0 +1,74 @@
+"""
+핫딜 항목당 메모리 사용량 비교.
+
+기존 방식(list of dict + parsed_timestamp datetime)과 DealStore를 같은 데이터로 만들어
+tracemalloc으로 측정한 항목당 바이트 수를 출력합니다.
+
+    python -m bench.store_memory --count 100000
+"""
+import argparse
+import datetime
+import json
+import random
+import tracemalloc
+
+from dealstore import KST, TIMESTAMP_FORMAT, DealStore
+
+_WORDS = ["삼성", "갤럭시", "버즈", "애플", "에어팟", "프로", "무선", "충전기", "라면", "햇반",
+          "[쿠팡]", "[G마켓]", "[11번가]", "무료배송", "TV", "모니터", "27인치", "키보드", "마우스"]
+
+
+def make_items(count: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    start = datetime.datetime(2025, 1, 1)
+    items = []
+    for i in range(count):
+        price = rng.randrange(1000, 500000, 10)
+        items.append({
+            "title": " ".join(rng.choice(_WORDS) for _ in range(rng.randint(3, 8))) + f" ({price:,}원)",
+            "price": f"{price:,}원",
+            "link": f"https://www.algumon.com/l/d/{rng.randrange(10**7)}",
+            "timestamp": (start + datetime.timedelta(minutes=i * 3)).strftime(TIMESTAMP_FORMAT),
+            "no": i + 1,
+        })
+    return items
+
+
+def measure(build) -> int:
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def build_dicts(payload: bytes):
+    data = json.loads(payload)
+    for item in data:
+        naive_dt = datetime.datetime.strptime(item["timestamp"], TIMESTAMP_FORMAT)
+        item["parsed_timestamp"] = KST.localize(naive_dt)
+    return data
+
+
+def build_store(payload: bytes):
+    store = DealStore()
+    store.extend(json.loads(payload))
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100_000)
+    args = parser.parse_args()
+
+    payload = json.dumps(make_items(args.count), ensure_ascii=False).encode("utf-8")
+    before = measure(lambda: build_dicts(payload))
+    after = measure(lambda: build_store(payload))
+    print(f"항목 수: {args.count}")
+    print(f"list of dict + datetime: {before / args.count:.1f} bytes/deal")
+    print(f"DealStore              : {after / args.count:.1f} bytes/deal")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,512 @@
+"""
+봇/DAG 주요 경로의 재현 가능한 성능 측정.
+
+bench.generator로 만든 데이터를 bench.fakes의 로컬 Storage 대역에 세그먼트 저장소로 저장하고
+(클러스터 파일 포함), 측정마다 별도 프로세스를 실행해 지연 시간(p50/p95/p99/최대), 처리량,
+최대 RSS를 JSON으로 기록합니다. 규모와 seed가 같으면 같은 데이터로 측정하므로 커밋 간 결과를
+--compare로 비교할 수 있습니다. 측정 중 추가한 세그먼트는 끝나면 되돌립니다.
+
+봇 명령(검색, 스캔 주기, 유사 핫딜)은 moabot4의 함수를 그대로 호출하므로 discord/pytz를 불러올 수 있을 때만
+측정하고, DAG 병합(dag_merge)은 airflow를 불러올 수 있을 때만 실제 DAG 함수를 GCSHook 대역으로 실행합니다.
+불러올 수 없으면 건너뛴 것으로 기록합니다.
+
+    python -m bench.suite --count 100000 --users 1000 -o before.json
+    python -m bench.suite --count 100000 --users 1000 -o after.json
+    python -m bench.suite --compare before.json after.json
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import importlib.util
+import json
+import os
+import platform
+import resource
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.fakes import FakeGCSHook, FakeStorageClient, NotFound, install
+from bench.generator import KEYWORDS, iter_items, make_keywords, make_subscriptions
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# DAG/봇과 같은 버킷, prefix, 색인 이름
+BUCKET_NAME = "moastorage"
+SEGMENT_PREFIX = "data/"
+KEY_INDEX_NAME = "hotdeal.keys"
+
+DATASET_META = "bench-dataset.json"
+SEGMENT_SIZE = 10_000
+NEW_ITEMS_PER_RUN = 40  # DAG 실행 한 번에 추가되는 항목 수 정도
+BENCHMARKS = ["snapshot_load", "snapshot_refresh", "search_keyword", "periodic_scan", "find_similar_deals",
+              "dag_merge"]
+
+
+def make_store(root: str):
+    from segments import GCSBackend, SegmentStore
+    # GCSBackend가 google.api_core의 NotFound를 사용하므로 라이브러리가 없으면 대역을 등록
+    install(root)
+    return SegmentStore(GCSBackend(BUCKET_NAME, SEGMENT_PREFIX, client=FakeStorageClient(root)))
+
+
+def prepare_dataset(root: str, count: int, seed: int, segment_size: int = SEGMENT_SIZE) -> bool:
+    """
+    root 아래에 데이터셋을 만듭니다. 같은 설정으로 만든 데이터셋이 이미 있으면 다시 쓰고 False를 반환합니다.
+
+    클러스터는 DAG처럼 세그먼트마다 배정하고 기간이 지난 클러스터를 정리합니다.
+    """
+    from clusters import ClusterState, ClusterStore, item_minute
+
+    meta = {"count": count, "seed": seed, "segment_size": segment_size}
+    meta_path = os.path.join(root, DATASET_META)
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            if json.load(f) == meta:
+                return False
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+
+    import shutil
+    shutil.rmtree(os.path.join(root, BUCKET_NAME), ignore_errors=True)
+    store = make_store(root)
+    manifest = store.load_manifest()
+    clusters = ClusterState()
+    batch = []
+
+    def flush():
+        nonlocal manifest
+        created_at = datetime.datetime.fromtimestamp(batch[0]['timestamp_epoch'], datetime.timezone.utc)
+        manifest = store.append(batch, manifest, created_at)
+        minutes = [item_minute(item) for item in batch]
+        for item, minute in zip(batch, minutes):
+            clusters.assign(item['no'], item['title'], minute)
+        clusters.prune(max(minutes))
+        batch.clear()
+
+    for item in iter_items(count, seed):
+        batch.append(item)
+        if len(batch) >= segment_size:
+            flush()
+    if batch:
+        flush()
+    ClusterStore(store.backend).save(clusters)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    return True
+
+
+@contextlib.contextmanager
+def preserved(root: str, store):
+    """측정 중 추가한 세그먼트와 바뀐 manifest/색인을 되돌려 다음 측정이 같은 데이터를 보도록 합니다."""
+    from clusters import CLUSTERS_NAME
+    from metrics import DAG_METRICS_NAME
+    from segments import MANIFEST_NAME
+
+    bucket = FakeStorageClient(root).bucket(BUCKET_NAME)
+    saved = {name: store.backend.read(name)
+             for name in (MANIFEST_NAME, CLUSTERS_NAME, KEY_INDEX_NAME, DAG_METRICS_NAME)}
+    before = set(store.load_manifest().segment_names)
+    try:
+        yield
+    finally:
+        added = [name for name in store.load_manifest().segment_names if name not in before]
+        for name, data in saved.items():
+            blob = bucket.blob(SEGMENT_PREFIX + name)
+            if data is not None:
+                blob.upload_from_string(data)
+            elif blob.exists():
+                blob.delete()
+        for name in added:
+            with contextlib.suppress(NotFound):
+                bucket.blob(SEGMENT_PREFIX + name).delete()
+
+
+def new_items(snapshot, seed: int, run: int) -> list[dict]:
+    """스냅샷의 마지막 항목 이후 시각으로 DAG 한 번 실행분의 새 항목을 만듭니다."""
+    last_minute = snapshot.items[len(snapshot) - 1].minute
+    start = datetime.datetime.fromtimestamp((last_minute + 1) * 60, datetime.timezone.utc)
+    return list(iter_items(NEW_ITEMS_PER_RUN, seed + 1 + run, start=start, first_no=snapshot.max_no + 1))
+
+
+def load_snapshot(store, previous=None):
+    from dealcache import SegmentSource
+    source = SegmentSource(store)
+    return source.build_snapshot(source.current_generation(), previous)
+
+
+def latency_summary(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, round(p / 100 * (len(ordered) - 1)))] * 1000
+
+    return {"p50": percentile(50), "p95": percentile(95), "p99": percentile(99),
+            "max": ordered[-1] * 1000, "mean": statistics.fmean(ordered) * 1000}
+
+
+def make_result(name: str, samples: list[float], operations: int, unit: str, **extra) -> dict:
+    total = sum(samples)
+    return {
+        "name": name,
+        "iterations": len(samples),
+        "latency_ms": latency_summary(samples),
+        "throughput": {"value": operations / total if total else None, "unit": unit},
+        **extra,
+    }
+
+
+def bench_snapshot_load(args, root):
+    """세그먼트 전체를 읽어 스냅샷(저장소, 검색/유사도 색인, 가격 이력, 클러스터)을 만듭니다. (봇 시작)"""
+    start = time.perf_counter()
+    snapshot = load_snapshot(make_store(root))
+    elapsed = time.perf_counter() - start
+    return [make_result("snapshot_load", [elapsed], len(snapshot), "items/s", items=len(snapshot))]
+
+
+def bench_snapshot_refresh(args, root):
+    """새 세그먼트 하나가 추가된 뒤 이전 스냅샷에 덧붙여 새 스냅샷을 만듭니다. (DAG 실행 후 첫 조회)"""
+    store = make_store(root)
+    snapshot = load_snapshot(store)
+    samples = []
+    with preserved(root, store):
+        for run in range(args.iterations):
+            store.append(new_items(snapshot, args.seed, run))
+            start = time.perf_counter()
+            snapshot = load_snapshot(store, snapshot)
+            samples.append(time.perf_counter() - start)
+    return [make_result("snapshot_refresh", samples, len(samples) * NEW_ITEMS_PER_RUN, "items/s")]
+
+
+def _load_bot_module():
+    """moabot4를 불러옵니다. (import만으로는 봇, 지표 서버, 구독 DB를 시작하지 않음)"""
+    import moabot4
+    return moabot4
+
+
+def latest_time(snapshot) -> datetime.datetime:
+    """스냅샷의 마지막 항목 시각. 합성 데이터의 유사 핫딜 조회 기간을 현재 시각 대신 이 시각 기준으로 잡습니다."""
+    from normalize import KST
+    return datetime.datetime.fromtimestamp(snapshot.items[len(snapshot) - 1].minute * 60, KST)
+
+
+def bench_search_keyword(args, root):
+    """/검색: moabot4.search_result_ids로 최근 MAX_RESULTS_PER_VIEW개를 찾고 첫 페이지 항목을 읽습니다."""
+    try:
+        bot = _load_bot_module()
+    except ImportError as e:
+        return [{"name": "search_keyword", "skipped": f"moabot4를 불러올 수 없습니다: {e}"}]
+
+    snapshot = load_snapshot(make_store(root))
+    keywords = make_keywords(args.keywords, args.seed)
+    samples = []
+    hits = 0
+    for _ in range(args.iterations):
+        for keyword in keywords:
+            start = time.perf_counter()
+            result_ids = bot.search_result_ids(snapshot, keyword)
+            for item_id in result_ids[:bot.ITEMS_PER_PAGE]:
+                item = snapshot.items[item_id]
+                item.get('title'), item.get('price'), item.get('link'), item.get('timestamp')
+            samples.append(time.perf_counter() - start)
+            hits += len(result_ids)
+    return [make_result("search_keyword", samples, len(samples), "queries/s",
+                        mean_results=hits / len(samples))]
+
+
+def _create_subscriptions(path: str, args, watermark: int):
+    """구독 DB를 한 트랜잭션으로 만듭니다. (SubscriptionStore.add는 구독마다 커밋하므로 대량 생성에는 느림)"""
+    from subscriptions import _SCHEMA
+
+    start_time = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc).isoformat()
+    keywords = make_keywords(args.keywords, args.seed)
+    rows = [(user_id, keyword, start_time, watermark, b"")
+            for user_id, keyword in make_subscriptions(args.users, keywords, args.per_user, args.seed)]
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute(_SCHEMA)
+        conn.executemany("INSERT OR REPLACE INTO subscriptions (user_id, keyword, start_time, watermark, seen) "
+                         "VALUES (?, ?, ?, ?, ?)", rows)
+    conn.close()
+
+
+def bench_periodic_scan(args, root):
+    """
+    moabot4.scan_cycle 한 주기: 새 항목 매칭, 구독자 분배, 알림/유사 핫딜 임베드 생성, 진행 상태 저장.
+
+    임베드는 발송 대기열에만 넣고 Discord로 보내지 않습니다.
+    """
+    try:
+        bot = _load_bot_module()
+    except ImportError as e:
+        return [{"name": "periodic_scan", "skipped": f"moabot4를 불러올 수 없습니다: {e}"}]
+    from subscriptions import SubscriptionStore
+
+    store = make_store(root)
+    snapshot = load_snapshot(store)
+    samples = []
+    notified = 0
+    with tempfile.TemporaryDirectory() as directory, preserved(root, store):
+        db_path = os.path.join(directory, "subscriptions.db")
+        _create_subscriptions(db_path, args, snapshot.max_no)
+        bot.subscription_store = SubscriptionStore(db_path)
+
+        async def run():
+            nonlocal snapshot, notified
+            for run_index in range(args.iterations):
+                store.append(new_items(snapshot, args.seed, run_index))
+                snapshot = load_snapshot(store, snapshot)
+
+                start = time.perf_counter()
+                _, matches = await bot.scan_cycle(snapshot, latest_time(snapshot))
+                samples.append(time.perf_counter() - start)
+                notified += matches
+
+        asyncio.run(run())
+        bot.subscription_store.close()
+    return [make_result("periodic_scan", samples, len(samples), "scans/s",
+                        subscriptions=args.users * args.per_user, mean_notified=notified / len(samples))]
+
+
+def bench_find_similar_deals(args, root):
+    """
+    최근 항목을 새 핫딜로 보고 moabot4.find_similar_deals로 유사 핫딜을 찾습니다.
+
+    [index]는 클러스터가 없을 때의 경로(검색 색인 + 유사도 색인), [clusters]는 DAG가 계산한 클러스터 조회 경로입니다.
+    """
+    try:
+        bot = _load_bot_module()
+    except ImportError as e:
+        return [{"name": "find_similar_deals", "skipped": f"moabot4를 불러올 수 없습니다: {e}"}]
+    from matcher import KeywordMatcher
+
+    snapshot = load_snapshot(make_store(root))
+    matcher = KeywordMatcher(KEYWORDS)
+    size = len(snapshot)
+    now = latest_time(snapshot)
+    targets = []
+    for pos in range(size - 1, max(-1, size - 1 - args.similar_samples), -1):
+        item = snapshot.items[pos]
+        found = matcher.match(item.title)
+        if found:
+            targets.append((item.no, item.title, min(found)))
+
+    def measure(use_clusters):
+        samples = []
+        results = 0
+
+        async def run():
+            nonlocal results
+            for no, title, keyword in targets:
+                start = time.perf_counter()
+                similar = await bot.find_similar_deals(keyword, title, snapshot, {title},
+                                                       bot.SIMILAR_DEAL_LOOKBACK_MONTHS, now,
+                                                       no if use_clusters else None)
+                samples.append(time.perf_counter() - start)
+                results += len(similar)
+
+        asyncio.run(run())
+        return samples, results
+
+    samples, results = measure(use_clusters=False)
+    output = [make_result("find_similar_deals[index]", samples, len(samples), "deals/s",
+                          mean_results=results / len(samples))]
+    if snapshot.clusters is None:
+        return output + [{"name": "find_similar_deals[clusters]", "skipped": "클러스터 파일이 없습니다."}]
+    samples, results = measure(use_clusters=True)
+    return output + [make_result("find_similar_deals[clusters]", samples, len(samples), "deals/s",
+                                 mean_results=results / len(samples))]
+
+
+def _load_dag_module():
+    spec = importlib.util.spec_from_file_location("scraperdags", os.path.join(REPO_ROOT, "airflow", "scraperdags.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def bench_dag_merge(args, root):
+    """
+    DAG 한 번 실행: manifest/중복 키 색인 로드, 새 행 중복 확인, 세그먼트 추가, 색인 저장(dag_merge)과
+    클러스터 배정(dag_cluster). 첫 실행은 키 색인이 없어 전체 항목으로 다시 만들므로 따로 기록합니다.
+    """
+    try:
+        dags = _load_dag_module()
+    except ImportError as e:
+        return [{"name": "dag_merge", "skipped": f"DAG를 불러올 수 없습니다: {e}"}]
+
+    store = make_store(root)
+    snapshot = load_snapshot(store)
+    known_rows = [{'title': item.title, 'price': item.price, 'link': item.link, 'timestamp': "1분 전"}
+                  for item in snapshot.items[len(snapshot) - dags.WATERMARK_CONFIRM_ROWS:]]
+    pages = []
+
+    def crawl_with_http(state):
+        # 목록 첫 페이지에 새 행과 이미 저장된 행이 함께 있는 경우
+        state.backend = 'http'
+        return state.add_rows(pages.pop())
+
+    os.environ.pop(dags.LOCAL_STORAGE_ENV, None)
+    dags.GCSHook = lambda **kwargs: FakeGCSHook(root)
+    dags.crawl_with_http = crawl_with_http
+
+    def run(run_index):
+        rows = [{'title': item['title'], 'price': item['price'], 'link': item['link'], 'timestamp': "방금 전"}
+                for item in new_items(snapshot, args.seed, run_index)]
+        pages.append(rows + known_rows)
+        with contextlib.redirect_stdout(None):
+            start = time.perf_counter()
+            dags.scrape_and_process_data()
+            merged = time.perf_counter()
+            dags.cluster_new_items()
+            return merged - start, time.perf_counter() - merged
+
+    merge_samples = []
+    cluster_samples = []
+    with preserved(root, store):
+        cold_merge, _ = run(0)
+        for run_index in range(1, args.iterations + 1):
+            merge, cluster = run(run_index)
+            merge_samples.append(merge)
+            cluster_samples.append(cluster)
+    return [
+        make_result("dag_merge[rebuild_keys]", [cold_merge], len(snapshot), "items/s"),
+        make_result("dag_merge", merge_samples, len(merge_samples), "runs/s"),
+        make_result("dag_cluster", cluster_samples, len(cluster_samples) * NEW_ITEMS_PER_RUN, "items/s"),
+    ]
+
+
+def run_child(args):
+    """자식 프로세스에서 측정 하나를 실행하고 결과(최대 RSS 포함)를 --result 파일에 씁니다."""
+    results = globals()[f"bench_{args.run}"](args, args.data_dir)
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    for result in results:
+        if "skipped" not in result:
+            result["peak_rss_mb"] = peak_rss_mb
+    with open(args.result, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False)
+
+
+def measure(name: str, args, root: str) -> list[dict]:
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        result_path = f.name
+    try:
+        command = [sys.executable, "-m", "bench.suite", "--run", name, "--data-dir", root, "--result", result_path,
+                   "--seed", str(args.seed), "--users", str(args.users), "--keywords", str(args.keywords),
+                   "--per-user", str(args.per_user), "--iterations", str(args.iterations),
+                   "--similar-samples", str(args.similar_samples)]
+        process = subprocess.run(command, cwd=REPO_ROOT, capture_output=True, text=True)
+        if process.returncode != 0:
+            return [{"name": name, "error": " ".join(process.stderr.strip().splitlines()[-1:])}]
+        with open(result_path, encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        os.unlink(result_path)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_result(result: dict) -> str:
+    name = result["name"]
+    if "skipped" in result:
+        return f"{name:<30} 건너뜀: {result['skipped']}"
+    if "error" in result:
+        return f"{name:<30} 실패: {result['error']}"
+    latency = result["latency_ms"]
+    throughput = result["throughput"]
+    return (f"{name:<30} p50 {latency['p50']:10.3f} ms  p95 {latency['p95']:10.3f} ms  "
+            f"{throughput['value'] or 0:12.1f} {throughput['unit']:<10} RSS {result['peak_rss_mb']:8.1f} MB")
+
+
+def compare(old_path: str, new_path: str, threshold: float) -> int:
+    """두 결과 파일을 비교해 출력하고, 기준보다 느려진 측정 수를 반환합니다."""
+    with open(old_path, encoding="utf-8") as f:
+        old = {result["name"]: result for result in json.load(f)["results"]}
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)["results"]
+
+    regressions = 0
+    print(f"{'측정':<30} {'p50 변화':>10} {'처리량 변화':>12} {'RSS 변화':>10}")
+    for result in new:
+        before = old.get(result["name"])
+        if before is None or "latency_ms" not in result or "latency_ms" not in before:
+            continue
+        p50 = result["latency_ms"]["p50"] / before["latency_ms"]["p50"] - 1
+        throughput = (result["throughput"]["value"] or 0) / (before["throughput"]["value"] or 1) - 1
+        rss = result["peak_rss_mb"] / before["peak_rss_mb"] - 1
+        regressed = p50 > threshold or throughput < -threshold
+        regressions += regressed
+        print(f"{result['name']:<30} {p50:+10.1%} {throughput:+12.1%} {rss:+10.1%}{'  느려짐' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100_000, help="데이터셋 항목 수")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--keywords", type=int, default=200, help="검색/구독 키워드 수")
+    parser.add_argument("--per-user", type=int, default=3, help="사용자당 구독 키워드 수")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--similar-samples", type=int, default=500, help="유사 핫딜을 찾을 최근 항목 수")
+    parser.add_argument("--segment-size", type=int, default=SEGMENT_SIZE)
+    parser.add_argument("--data-dir", help="데이터셋 디렉터리 (지정하면 다음 실행에서 다시 사용)")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="일부 측정만 실행")
+    parser.add_argument("-o", "--output", help="결과 JSON 파일")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="두 결과 파일 비교")
+    parser.add_argument("--threshold", type=float, default=0.1, help="--compare에서 느려짐으로 볼 변화율")
+    parser.add_argument("--run", choices=BENCHMARKS, help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+    if args.run:
+        run_child(args)
+        return
+
+    with contextlib.ExitStack() as stack:
+        root = args.data_dir or stack.enter_context(tempfile.TemporaryDirectory())
+        os.makedirs(root, exist_ok=True)
+        start = time.perf_counter()
+        if prepare_dataset(root, args.count, args.seed, args.segment_size):
+            print(f"데이터셋 생성: {args.count}개 항목, {time.perf_counter() - start:.1f} s")
+        else:
+            print(f"'{root}'의 데이터셋을 다시 사용합니다.")
+
+        results = []
+        for name in args.only or BENCHMARKS:
+            for result in measure(name, args, root):
+                print(format_result(result))
+                results.append(result)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "params": {key: getattr(args, key) for key in ("count", "seed", "users", "keywords", "per_user",
+                                                           "iterations", "similar_samples", "segment_size")},
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"결과를 '{args.output}'에 저장했습니다.")
+
+
+if __name__ == "__main__":
+    main()
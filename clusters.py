@@ -0,0 +1,401 @@
+"""
+유사 핫딜 클러스터.
+
+DAG의 클러스터링 단계가 새 항목마다 한 번 기존 클러스터에 배정하고, 항목별 클러스터 id를
+데이터셋 옆(hotdeal.clusters)에 저장합니다. 봇은 이 파일을 읽어 유사 핫딜을 알림마다 계산하지 않고
+같은 클러스터의 항목 조회로 찾습니다.
+
+새 항목은 클러스터 대표 제목(클러스터를 만든 첫 항목)과 비교하며, 유사 판정 기준은 봇과 같습니다
+(similarity.is_similar: Jaccard 유사도 또는 Levenshtein 거리). 모든 대표와 비교하는 대신 prefix filtering으로
+후보를 찾습니다. 토큰/문자 2-gram을 빈도가 낮은 순서로 정렬했을 때 앞부분(prefix)을 하나도 공유하지 않는
+두 제목은 기준을 만족할 수 없으므로, prefix만 색인해 두면 놓치는 후보 없이 비교 대상을 줄일 수 있습니다.
+- Jaccard >= t: 토큰 집합 x의 앞 |x| - ceil(t|x|) + 1개
+- Levenshtein <= k: 위치별 2-gram의 앞 2k + 1개 (둘 다 짧은 제목이면 길이로 묶어 비교)
+최근 window_minutes 동안 새 항목이 배정되지 않은 클러스터는 더 이상 후보로 쓰지 않습니다.
+
+항목별 클러스터 id는 PART_ITEMS개씩 part(clusters/<epoch>/<첫 no>.bin, zlib(클러스터 id 배열))로 나누어 저장하고,
+클러스터 파일에는 part 목록과 대표 목록만 둡니다. part에는 항목이 뒤에 덧붙기만 하므로 DAG는 실행마다
+마지막 part(PART_ITEMS개 이하)와 클러스터 파일만 다시 쓰고, 봇은 이전에 읽은 뒤로 늘어난 part만 내려받아
+조회에 덧붙입니다. 처음부터 다시 배정하면 epoch가 바뀌어 이전 part를 쓰지 않습니다.
+
+파일 형식: 헤더(MAGIC, 형식 버전, 항목 수, 각 구역 길이) + part 목록 JSON + zlib(대표 목록 JSON).
+봇은 두 번째 구역을 읽지 않습니다. (형식 버전 1은 첫 구역이 zlib(전체 클러스터 id 배열)인 이전 형식)
+"""
+import json
+import math
+import struct
+import zlib
+from array import array
+from collections import Counter
+from datetime import datetime, timezone
+
+from normalize import KST, TIMESTAMP_FORMAT
+from similarity import JACCARD_THRESHOLD, LEVENSHTEIN_THRESHOLD, is_similar, jaccard, normalize_tokens
+
+CLUSTERS_NAME = "hotdeal.clusters"
+CLUSTER_DIR = "clusters"
+MAGIC = b"MOAC"
+FORMAT_VERSION = 2
+LEGACY_FORMAT_VERSION = 1
+# part 하나에 담는 최대 항목 수. DAG가 실행마다 다시 쓰는 양(마지막 part)의 상한
+PART_ITEMS = 50_000
+_HEADER = struct.Struct("<4sBQII")
+NO_CLUSTER = 0
+WINDOW_MINUTES = 6 * 30 * 24 * 60  # 6개월 (30일/월)
+
+_GRAM_SIZE = 2
+_EDIT_PREFIX = LEVENSHTEIN_THRESHOLD * _GRAM_SIZE + 1
+# 두 제목이 모두 이 길이 이하이면 2-gram을 하나도 공유하지 않아도 Levenshtein 기준을 만족할 수 있음
+_SHORT_TITLE = LEVENSHTEIN_THRESHOLD * _GRAM_SIZE + _GRAM_SIZE - 1
+
+
+class ClusterFormatError(ValueError):
+    """클러스터 파일을 해석할 수 없는 경우."""
+
+
+def item_minute(item: dict) -> int | None:
+    """항목의 등록 시각(epoch 분). 적재 단계에서 기록한 timestamp_epoch가 없으면 문자열을 해석합니다."""
+    epoch = item.get("timestamp_epoch")
+    if epoch is not None:
+        return int(epoch) // 60
+    try:
+        parsed = datetime.strptime(item.get("timestamp") or "", TIMESTAMP_FORMAT).replace(tzinfo=KST)
+    except ValueError:
+        return None
+    return int(parsed.timestamp()) // 60
+
+
+def _positional_grams(text: str) -> list[tuple[str, int]]:
+    """같은 2-gram이 여러 번 나오면 (gram, 몇 번째) 로 구분한 목록."""
+    seen = Counter()
+    grams = []
+    for i in range(len(text) - _GRAM_SIZE + 1):
+        gram = text[i:i + _GRAM_SIZE]
+        grams.append((gram, seen[gram]))
+        seen[gram] += 1
+    return grams
+
+
+def new_epoch() -> str:
+    """처음부터 다시 배정할 때마다 바뀌는 part 디렉터리 이름."""
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+
+
+def part_name(epoch: str, first_no: int) -> str:
+    return f"{CLUSTER_DIR}/{epoch}/{first_no:09d}.bin"
+
+
+def _split_sections(data: bytes) -> tuple[int, int, bytes, bytes]:
+    if len(data) < _HEADER.size:
+        raise ClusterFormatError("클러스터 파일이 너무 짧습니다.")
+    magic, version, item_count, first_length, reps_length = _HEADER.unpack_from(data)
+    if magic != MAGIC or version not in (FORMAT_VERSION, LEGACY_FORMAT_VERSION):
+        raise ClusterFormatError(f"지원하지 않는 클러스터 파일입니다: {magic!r} v{version}")
+    first_end = _HEADER.size + first_length
+    if len(data) != first_end + reps_length:
+        raise ClusterFormatError("클러스터 파일의 길이가 헤더와 다릅니다.")
+    return version, item_count, data[_HEADER.size:first_end], data[first_end:]
+
+
+def _decode_assignments(section: bytes, item_count: int) -> array:
+    assignments = array('I')
+    assignments.frombytes(zlib.decompress(section))
+    if len(assignments) < item_count:
+        raise ClusterFormatError("클러스터 id 수가 헤더의 항목 수보다 적습니다.")
+    # part는 클러스터 파일보다 먼저 쓰므로 클러스터 파일이 아는 것보다 길 수 있음
+    del assignments[item_count:]
+    return assignments
+
+
+def _decode_reps(section: bytes) -> dict[int, list]:
+    return {cluster_id: [title, last_minute]
+            for cluster_id, last_minute, title in json.loads(zlib.decompress(section))}
+
+
+class ClusterHead:
+    """
+    클러스터 파일의 내용.
+
+    Attributes:
+        item_count (int): 클러스터가 배정된 마지막 no.
+        epoch (str | None): part 디렉터리 이름. 이전 형식이면 None.
+        parts (list[dict]): {"name", "first_no", "last_no"} 목록 (no 순서).
+        legacy_assignments (array | None): 이전 형식 파일에 들어 있던 전체 클러스터 id.
+        reps_section (bytes): 압축된 대표 목록. (DAG만 사용)
+    """
+
+    __slots__ = ("item_count", "epoch", "parts", "legacy_assignments", "reps_section")
+
+    def __init__(self, item_count: int, epoch: str | None, parts: list[dict],
+                 legacy_assignments: array | None = None, reps_section: bytes = b""):
+        self.item_count = item_count
+        self.epoch = epoch
+        self.parts = parts
+        self.legacy_assignments = legacy_assignments
+        self.reps_section = reps_section
+
+    def to_bytes(self) -> bytes:
+        parts = json.dumps({"epoch": self.epoch, "parts": self.parts}, ensure_ascii=False).encode("utf-8")
+        return (_HEADER.pack(MAGIC, FORMAT_VERSION, self.item_count, len(parts), len(self.reps_section))
+                + parts + self.reps_section)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ClusterHead":
+        version, item_count, first, reps = _split_sections(data)
+        if version == LEGACY_FORMAT_VERSION:
+            return cls(item_count, None, [], _decode_assignments(first, item_count), reps)
+        try:
+            parts = json.loads(first)
+        except ValueError as e:
+            raise ClusterFormatError(f"part 목록을 해석할 수 없습니다: {e}")
+        return cls(item_count, parts["epoch"], parts["parts"], reps_section=reps)
+
+
+class ClusterState:
+    """
+    클러스터링 단계(DAG)의 상태: 항목별 클러스터 id와 아직 후보로 쓰는 클러스터의 대표 제목.
+
+    클러스터 id는 대표 항목의 no입니다. (제목 없는 항목은 NO_CLUSTER)
+    다 채워진 part의 클러스터 id는 다시 쓰지 않으므로 불러오지 않고, 마지막 part부터의 id만
+    assignments[no - first_no]에 둡니다.
+    """
+
+    def __init__(self, window_minutes: int = WINDOW_MINUTES, epoch: str | None = None):
+        self.window_minutes = window_minutes
+        self.epoch = epoch or new_epoch()
+        # 다 채워진 part 목록 (저장 시 그대로 유지)
+        self.parts: list[dict] = []
+        self.first_no = 1
+        self.assignments = array('I')
+        # 클러스터 id -> [대표 제목, 마지막으로 항목이 배정된 시각(epoch 분)]
+        self.reps: dict[int, list] = {}
+        self._index = None
+
+    @property
+    def item_count(self) -> int:
+        return self.first_no - 1 + len(self.assignments)
+
+    def reps_section(self) -> bytes:
+        return zlib.compress(json.dumps([[cluster_id, rep[1], rep[0]] for cluster_id, rep in self.reps.items()],
+                                        ensure_ascii=False).encode("utf-8"))
+
+    def _build_index(self):
+        """대표 제목의 토큰/2-gram 빈도로 순서를 정하고 prefix를 색인합니다. (실행마다 한 번)"""
+        token_freq = Counter()
+        gram_freq = Counter()
+        prepared = {}
+        for cluster_id, (title, _) in self.reps.items():
+            title_lower = title.lower()
+            tokens = normalize_tokens(title)
+            token_freq.update(tokens)
+            gram_freq.update(gram for gram, _ in _positional_grams(title_lower))
+            prepared[cluster_id] = (title_lower, tokens)
+        self._token_freq = token_freq
+        self._gram_freq = gram_freq
+        self._prepared = prepared
+        self._index = {}
+        for cluster_id, (title_lower, tokens) in prepared.items():
+            for key in self._prefix_keys(title_lower, tokens):
+                self._index.setdefault(key, []).append(cluster_id)
+
+    def _prefix_keys(self, title_lower: str, tokens: frozenset) -> set:
+        token_freq, gram_freq = self._token_freq, self._gram_freq
+        ordered_tokens = sorted(tokens, key=lambda token: (token_freq[token], token))
+        token_prefix = len(ordered_tokens) - math.ceil(JACCARD_THRESHOLD * len(ordered_tokens) - 1e-9) + 1
+        keys = {("t", token) for token in ordered_tokens[:token_prefix]}
+        if not tokens:
+            # 토큰이 없는 제목끼리는 Jaccard 유사도가 1
+            keys.add(("t", ""))
+        grams = sorted(_positional_grams(title_lower), key=lambda gram: (gram_freq[gram[0]], gram))
+        keys.update(("g",) + gram for gram in grams[:_EDIT_PREFIX])
+        if len(title_lower) <= _SHORT_TITLE:
+            keys.add(("s", len(title_lower)))
+        return keys
+
+    def _short_keys(self, title_lower: str) -> set:
+        # 짧은 제목은 길이 차이가 k 이하인 짧은 대표와 모두 비교
+        return {("s", length) for length in range(max(0, len(title_lower) - LEVENSHTEIN_THRESHOLD),
+                                                  min(_SHORT_TITLE, len(title_lower) + LEVENSHTEIN_THRESHOLD) + 1)}
+
+    def assign(self, no: int, title: str | None, minute: int | None) -> int:
+        """
+        no 항목을 가장 유사한 클러스터에 배정하고 클러스터 id를 반환합니다. 없으면 새 클러스터를 만듭니다.
+
+        항목은 no 순서대로 배정해야 합니다.
+        """
+        if no <= self.item_count:
+            raise ValueError(f"이미 배정된 항목입니다: no={no}")
+        while self.item_count < no - 1:
+            self.assignments.append(NO_CLUSTER)
+        if not title:
+            self.assignments.append(NO_CLUSTER)
+            return NO_CLUSTER
+        if self._index is None:
+            self._build_index()
+
+        title_lower = title.lower()
+        tokens = normalize_tokens(title)
+        keys = self._prefix_keys(title_lower, tokens)
+        probe = set(keys)
+        if len(title_lower) <= _SHORT_TITLE:
+            probe |= self._short_keys(title_lower)
+        candidates = set()
+        for key in probe:
+            candidates.update(self._index.get(key, ()))
+
+        best = None
+        best_score = None
+        for cluster_id in candidates:
+            if cluster_id not in self.reps:
+                continue  # 기간이 지나 제외된 클러스터
+            other_lower, other_tokens = self._prepared[cluster_id]
+            if not is_similar(title_lower, tokens, other_lower, other_tokens):
+                continue
+            score = (jaccard(tokens, other_tokens), self.reps[cluster_id][1])
+            if best_score is None or score > best_score:
+                best, best_score = cluster_id, score
+
+        minute = -1 if minute is None else minute
+        if best is None:
+            best = no
+            self.reps[best] = [title, minute]
+            self._prepared[best] = (title_lower, tokens)
+            for key in keys:
+                self._index.setdefault(key, []).append(best)
+        elif minute > self.reps[best][1]:
+            self.reps[best][1] = minute
+        self.assignments.append(best)
+        return best
+
+    def prune(self, latest_minute: int) -> int:
+        """latest_minute 기준 기간 안에 배정된 항목이 없는 클러스터를 후보에서 제외하고, 제외한 수를 반환합니다."""
+        cutoff = latest_minute - self.window_minutes
+        expired = [cluster_id for cluster_id, rep in self.reps.items() if rep[1] < cutoff]
+        for cluster_id in expired:
+            del self.reps[cluster_id]
+        return len(expired)
+
+
+class ClusterStore:
+    """
+    클러스터 파일과 part를 읽고 쓰는 저장소.
+
+    쓰기는 DAG 한 곳에서만 한다고 가정합니다. part를 먼저 쓰고 클러스터 파일을 마지막에 교체하므로
+    클러스터 파일이 곧 커밋 지점입니다. (다시 쓰는 마지막 part는 뒤에 덧붙기만 하므로 읽는 쪽은
+    클러스터 파일의 last_no까지만 사용)
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def load_head(self) -> ClusterHead | None:
+        data = self.backend.read(CLUSTERS_NAME)
+        return None if data is None else ClusterHead.from_bytes(data)
+
+    def read_part(self, part: dict) -> array:
+        data = self.backend.read(part["name"])
+        if data is None:
+            raise ClusterFormatError(f"클러스터 파일에 있는 part를 찾을 수 없습니다: {part['name']}")
+        return _decode_assignments(data, part["last_no"] - part["first_no"] + 1)
+
+    def load_state(self, window_minutes: int = WINDOW_MINUTES) -> ClusterState | None:
+        """DAG가 이어서 배정할 상태를 불러옵니다. 클러스터 파일이 없으면 None."""
+        head = self.load_head()
+        if head is None:
+            return None
+        state = ClusterState(window_minutes, head.epoch)
+        state.reps = _decode_reps(head.reps_section)
+        if head.legacy_assignments is not None:
+            # 이전 형식은 새 epoch로 모든 id를 part에 옮겨 씀
+            state.assignments = head.legacy_assignments
+            return state
+        state.parts = list(head.parts)
+        state.first_no = head.item_count + 1
+        if state.parts and state.parts[-1]["last_no"] - state.parts[-1]["first_no"] + 1 < PART_ITEMS:
+            tail = state.parts.pop()
+            state.first_no = tail["first_no"]
+            state.assignments = self.read_part(tail)
+        return state
+
+    def save(self, state: ClusterState) -> ClusterHead:
+        """마지막 part부터 새로 배정된 id를 part로 쓰고 클러스터 파일을 교체합니다."""
+        parts = list(state.parts)
+        for start in range(0, len(state.assignments), PART_ITEMS):
+            chunk = state.assignments[start:start + PART_ITEMS]
+            first_no = state.first_no + start
+            name = part_name(state.epoch, first_no)
+            self.backend.write(name, zlib.compress(chunk.tobytes()))
+            parts.append({"name": name, "first_no": first_no, "last_no": first_no + len(chunk) - 1})
+        head = ClusterHead(state.item_count, state.epoch, parts, reps_section=state.reps_section())
+        self.backend.write(CLUSTERS_NAME, head.to_bytes())
+        return head
+
+
+class ClusterMembership:
+    """
+    봇이 사용하는 읽기 전용 클러스터 조회. (대표 목록은 읽지 않음)
+
+    갱신할 때는 이전 조회에 새로 배정된 id만 덧붙이므로, 클러스터별 항목 목록을 다시 만들지 않습니다.
+    """
+
+    def __init__(self, epoch: str | None = None):
+        self.epoch = epoch
+        self.assignments = array('I')
+        self._members: dict[int, list[int]] = {}
+
+    def extend(self, assignments):
+        """다음 no부터의 클러스터 id를 덧붙입니다."""
+        no = len(self.assignments)
+        members = self._members
+        for cluster_id in assignments:
+            no += 1
+            if cluster_id != NO_CLUSTER:
+                members.setdefault(cluster_id, []).append(no)
+        # 목록을 먼저 채운 뒤 늘려야 다른 스레드가 cluster_of로 찾은 클러스터의 목록이 완성되어 있음
+        self.assignments.extend(assignments)
+
+    @classmethod
+    def load(cls, backend, previous: "ClusterMembership | None" = None) -> "ClusterMembership | None":
+        """
+        세그먼트 저장소 백엔드에서 클러스터 파일을 읽습니다. 없거나 읽을 수 없으면 None.
+
+        previous가 같은 epoch의 이전 조회이면 그 뒤로 늘어난 part만 내려받아 previous에 덧붙여 반환합니다.
+        """
+        store = ClusterStore(backend)
+        try:
+            head = store.load_head()
+            if head is None:
+                return None
+            if head.legacy_assignments is not None:
+                membership = cls()
+                membership.extend(head.legacy_assignments)
+                return membership
+            if previous is not None and previous.epoch == head.epoch and previous.item_count <= head.item_count:
+                membership = previous
+            else:
+                membership = cls(head.epoch)
+            for part in head.parts:
+                if part["last_no"] <= membership.item_count:
+                    continue
+                assignments = store.read_part(part)
+                membership.extend(assignments[membership.item_count - part["first_no"] + 1:])
+            return membership
+        except (ClusterFormatError, zlib.error) as e:
+            print(f"클러스터 파일을 읽지 못했습니다: {e}")
+            return None
+
+    @property
+    def item_count(self) -> int:
+        """클러스터가 배정된 마지막 no."""
+        return len(self.assignments)
+
+    def cluster_of(self, no: int) -> int | None:
+        """no 항목의 클러스터 id. 아직 배정되지 않았거나 제목이 없는 항목이면 None."""
+        if not 0 < no <= len(self.assignments):
+            return None
+        cluster_id = self.assignments[no - 1]
+        return None if cluster_id == NO_CLUSTER else cluster_id
+
+    def members(self, cluster_id: int) -> list[int]:
+        """클러스터에 속한 항목의 no 목록 (오름차순)."""
+        return self._members.get(cluster_id, [])
@@ -1,92 +1,192 @@
+"""
+핫딜 데이터 파일의 no 정렬/재부여 도구.
+
+입력 파일(JSON 배열, NDJSON, 배열을 이어 붙인 파일)을 한 항목씩 읽으므로 메모리보다 큰 파일도 처리합니다.
+정렬은 --chunk-records개씩 메모리에서 정렬해 임시 파일(run)로 쓴 뒤 병합하는 외부 정렬로 수행하고,
+no 변환(역순/시작 번호/재부여)은 결과를 쓰는 같은 단계에서 적용합니다. 역순과 시작 번호에 필요한
+최솟값/최댓값은 고정값 대신 데이터에서 계산합니다. 결과는 NDJSONWriter로 .part 파일에 쓴 뒤 교체하므로
+중간에 실패해도 기존 파일이 손상되지 않습니다. (출력 경로가 입력과 같아도 됩니다)
+
+    # no 역순으로 바꾼 뒤 오름차순 정렬 (이전 reverse_json_no + sort_json_by_no_ascending)
+    python convert.py history.ndjson --reverse --sort -o history.ndjson
+    # 가장 작은 no가 1이 되도록 이동 (이전 addnum)
+    python convert.py add.json --start 1 -o add.ndjson
+    # 과거 데이터 뒤에 운영 데이터를 이어 붙이고 1부터 다시 번호 부여
+    python convert.py history.ndjson hotdeal.json --renumber -o merged.ndjson
+    # 운영 데이터의 마지막 no 다음 번호부터 이어지도록 이동
+    python convert.py backfill.ndjson --sort --after hotdeal.json -o backfill-shifted.ndjson
+"""
+import argparse
+import heapq
 import json
+import os
+import tempfile
+
+from ndjson import NDJSONWriter, read_path, read_paths
+
+CHUNK_RECORDS = 200_000  # run 하나에 담을 항목 수 (메모리에서 한 번에 정렬하는 양)
+
+
+class NoStats:
+    """입력 항목의 개수와 no 최솟값/최댓값."""
+
+    def __init__(self):
+        self.count = 0
+        self.min_no = None
+        self.max_no = None
+
+    def add(self, item: dict):
+        self.count += 1
+        no = item.get('no')
+        if isinstance(no, int):
+            if self.min_no is None or no < self.min_no:
+                self.min_no = no
+            if self.max_no is None or no > self.max_no:
+                self.max_no = no
 
-def addnum(file_path):
+
+def sort_no(item: dict) -> int:
+    """정렬에 쓰는 no. no가 없거나 정수가 아니면(null, 문자열 등) NoStats와 같이 0으로 취급합니다."""
+    no = item.get('no')
+    return no if isinstance(no, int) else 0
+
+
+def scan(paths) -> NoStats:
+    """no 통계만 구합니다. (정렬하지 않을 때 변환에 필요한 값)"""
+    stats = NoStats()
+    for item in read_paths(paths):
+        stats.add(item)
+    return stats
+
+
+def _write_run(directory: str, index: int, chunk: list) -> str:
+    path = os.path.join(directory, f"run-{index:05d}.ndjson")
+    with open(path, "w", encoding="utf-8") as f:
+        for _, _, item in chunk:
+            f.write(json.dumps(item, ensure_ascii=False))
+            f.write("\n")
+    return path
+
+
+def external_sort(paths, directory: str, descending: bool = False, chunk_records: int = CHUNK_RECORDS):
     """
-    JSON 파일의 데이터를 'no' 필드 값을 기준으로 내림차순으로 정렬합니다.
+    no 기준으로 정렬합니다. (no가 없거나 정수가 아닌 항목은 0으로 취급, 같은 no는 입력 순서 유지)
 
-    Args:
-        file_path (str): JSON 파일의 경로.
+    입력을 모두 읽어 run 파일로 나눠 쓴 뒤에 반환하므로, 반환된 통계는 완성된 값입니다.
+
+    Returns:
+        tuple[iterator, NoStats]: (정렬된 항목을 하나씩 반환하는 iterator, 입력 통계)
     """
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-    except FileNotFoundError:
-        print(f"Error: 파일을 찾을 수 없습니다: {file_path}")
-        return
-    except json.JSONDecodeError:
-        print(f"Error: JSON 디코딩 오류: {file_path}")
-        return
-
-    for item in data:
-        if 'no' in item:
-            item['no'] = item['no'] - 104460
+    stats = NoStats()
+    sign = -1 if descending else 1
+    runs = []
+    chunk = []
+    for sequence, item in enumerate(read_paths(paths)):
+        stats.add(item)
+        chunk.append((sign * sort_no(item), sequence, item))
+        if len(chunk) >= chunk_records:
+            chunk.sort(key=lambda entry: entry[:2])
+            runs.append(_write_run(directory, len(runs), chunk))
+            chunk = []
 
-    try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-        print(f"'{file_path}' 10만더하기 성공")
-    except IOError:
-        print(f"Error: 파일 쓰기 오류: {file_path}")
+    if not runs:
+        # 한 run에 다 들어가면 임시 파일 없이 메모리에서 정렬
+        chunk.sort(key=lambda entry: entry[:2])
+        return (item for _, _, item in chunk), stats
+
+    if chunk:
+        chunk.sort(key=lambda entry: entry[:2])
+        runs.append(_write_run(directory, len(runs), chunk))
+        chunk = []
+    # run은 입력 순서대로 만들어졌으므로 (no, run 번호)로 병합하면 같은 no의 입력 순서가 유지됨
+    merged = heapq.merge(*(((sign * sort_no(item), index, item) for item in read_path(run))
+                           for index, run in enumerate(runs)),
+                         key=lambda entry: entry[:2])
+    return (item for _, _, item in merged), stats
 
-def reverse_json_no(file_path):
+
+def make_transform(stats: NoStats, reverse: bool = False, start: int | None = None, renumber: bool = False):
     """
-    JSON 파일에서 'no' 필드의 값을 역순으로 변경합니다.
+    결과를 쓰기 직전에 항목마다 적용할 no 변환을 만듭니다.
 
     Args:
-        file_path (str): JSON 파일의 경로.
+        reverse (bool): no를 뒤집습니다. (최솟값 <-> 최댓값)
+        start (int | None): 가장 작은 no(재부여 시 첫 번호)가 이 값이 되도록 합니다.
+        renumber (bool): 출력 순서대로 no를 새로 부여합니다.
     """
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-    except FileNotFoundError:
-        print(f"Error: 파일을 찾을 수 없습니다: {file_path}")
-        return
-    except json.JSONDecodeError:
-        print(f"Error: JSON 디코딩 오류: {file_path}")
-        return
+    if renumber:
+        first = 1 if start is None else start
+        def assign(index, item):
+            item['no'] = first + index
+            return item
+        return assign
 
-    max_no = 105860  # 알려주신 'no' 필드의 최댓값
+    if stats.min_no is None or (not reverse and start is None):
+        return lambda index, item: item
 
-    for item in data:
-        if 'no' in item:
-            item['no'] = max_no - item['no'] + 1
+    offset = 0 if start is None else start - stats.min_no
+    def shift(index, item):
+        no = item.get('no')
+        if isinstance(no, int):
+            if reverse:
+                no = stats.max_no + stats.min_no - no
+            item['no'] = no + offset
+        return item
+    return shift
 
-    try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-        print(f"'{file_path}' 파일의 'no' 필드 값을 역순으로 변경했습니다.")
-    except IOError:
-        print(f"Error: 파일 쓰기 오류: {file_path}")
 
-def sort_json_by_no_ascending(file_path):
+def convert(paths, output_path, sort=False, reverse=False, start=None, renumber=False,
+            chunk_records=CHUNK_RECORDS, tmp_dir=None) -> int:
     """
-    JSON 파일의 데이터를 'no' 필드 값을 기준으로 오름차순으로 정렬합니다.
+    입력 파일들을 차례로 읽어 정렬/변환한 결과를 output_path에 NDJSON으로 씁니다.
 
-    Args:
-        file_path (str): JSON 파일의 경로.
+    Returns:
+        int: 기록한 항목 수.
     """
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-    except FileNotFoundError:
-        print(f"Error: 파일을 찾을 수 없습니다: {file_path}")
-        return
-    except json.JSONDecodeError:
-        print(f"Error: JSON 디코딩 오류: {file_path}")
-        return
-
-    # 'no' 필드 값을 기준으로 오름차순 정렬 (reverse=False 또는 생략)
-    sorted_data = sorted(data, key=lambda item: item.get('no', 0))
+    with tempfile.TemporaryDirectory(prefix="convert-", dir=tmp_dir) as directory:
+        if sort:
+            # 역순으로 바꾸면 순서가 뒤집히므로, 원래 no의 내림차순으로 정렬하면 결과는 오름차순
+            records, stats = external_sort(paths, directory, descending=reverse, chunk_records=chunk_records)
+        else:
+            stats = scan(paths) if (reverse or start is not None) and not renumber else NoStats()
+            records = read_paths(paths)
+
+        transform = make_transform(stats, reverse, start, renumber)
+        with NDJSONWriter(output_path) as writer:
+            for index, item in enumerate(records):
+                writer.write(transform(index, item))
+    return writer.count
+
+
+def max_no_of(path: str) -> int:
+    stats = scan([path])
+    return 0 if stats.max_no is None else stats.max_no
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="입력 파일 (여러 개면 주어진 순서대로 이어 붙임)")
+    parser.add_argument("-o", "--output", required=True)
+    parser.add_argument("--sort", action="store_true", help="no 오름차순으로 정렬")
+    parser.add_argument("--reverse", action="store_true", help="no를 역순으로 변경")
+    parser.add_argument("--renumber", action="store_true", help="출력 순서대로 no를 새로 부여")
+    numbering = parser.add_mutually_exclusive_group()
+    numbering.add_argument("--start", type=int, help="가장 작은 no(재부여 시 첫 번호)")
+    numbering.add_argument("--after", metavar="FILE", help="이 파일의 가장 큰 no 다음 번호부터 시작")
+    parser.add_argument("--chunk-records", type=int, default=CHUNK_RECORDS)
+    parser.add_argument("--tmp-dir", help="정렬용 임시 파일 위치 (기본: 시스템 임시 디렉터리)")
+    args = parser.parse_args()
 
     try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(sorted_data, f, indent=4, ensure_ascii=False)
-        print(f"'{file_path}' 파일의 데이터를 'no' 필드 기준으로 오름차순 정렬했습니다.")
-    except IOError:
-        print(f"Error: 파일 쓰기 오류: {file_path}")
-
-# 사용할 JSON 파일 경로를 여기에 입력하세요.
-file_path = 'add.json'
-#reverse_json_no(file_path)
-#sort_json_by_no_ascending(file_path)
-addnum(file_path)
\ No newline at end of file
+        start = max_no_of(args.after) + 1 if args.after else args.start
+        count = convert(args.inputs, args.output, args.sort, args.reverse, start, args.renumber,
+                        args.chunk_records, args.tmp_dir)
+    except FileNotFoundError as e:
+        raise SystemExit(f"Error: 파일을 찾을 수 없습니다: {e.filename}")
+    except ValueError as e:
+        raise SystemExit(f"Error: JSON 디코딩 오류: {e}")
+    print(f"{count}개 항목을 '{args.output}'에 저장했습니다.")
+
+
+if __name__ == "__main__":
+    main()
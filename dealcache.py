@@ -0,0 +1,330 @@
+"""
+hotdeal.json 스냅샷 캐시.
+
+/검색, /스캔시작, 주기적 스캔이 각자 Storage에서 전체 파일을 내려받아 파싱하던 것을
+하나의 공유 스냅샷으로 대체합니다. blob의 generation이 바뀐 경우에만 다시 내려받습니다.
+세그먼트 저장소(segments.py)를 원본으로 쓰면 아직 읽지 않은 세그먼트만 내려받습니다.
+"""
+import asyncio
+import bisect
+import datetime
+import os
+import time
+
+import pytz
+
+from clusters import CLUSTERS_NAME, ClusterMembership
+import dealcodec
+from dealstore import DealSequence, DealStore, DealView
+from jsonstream import CHUNK_SIZE
+from metrics import REGISTRY, STAGE_SECONDS
+from ndjson import iter_records
+from pricehistory import PriceHistory
+from searchindex import SearchIndex
+from segments import SegmentStore
+from similarity import SimilarityIndex
+
+KST = pytz.timezone('Asia/Seoul')
+
+SNAPSHOT_ITEMS = REGISTRY.gauge("moabot_snapshot_items", "현재 스냅샷의 항목 수")
+SNAPSHOT_REFRESHES = REGISTRY.counter("moabot_snapshot_refreshes_total", "스냅샷 새로고침 횟수", labels=("result",))
+
+
+class DealSnapshot:
+    """
+    특정 generation 시점의 파싱된 핫딜 데이터셋. 생성 이후 변경하지 않습니다.
+
+    search_index, similarity_index, price_history는 이후 스냅샷과 공유될 수 있으므로
+    조회 시 항상 len(items)로 범위를 제한합니다. (price_history는 가장 최근 스냅샷 기준의 집계)
+    """
+
+    __slots__ = ("items", "generation", "loaded_at", "search_index", "similarity_index", "price_history",
+                 "max_no", "ordered", "segments", "clusters")
+
+    def __init__(self, items: DealSequence, generation: tuple | int | None, loaded_at: datetime.datetime,
+                 search_index: SearchIndex, similarity_index: SimilarityIndex, price_history: PriceHistory,
+                 segments: tuple | None = None, clusters: ClusterMembership | None = None):
+        self.items = items
+        self.generation = generation
+        self.loaded_at = loaded_at
+        self.search_index = search_index
+        self.similarity_index = similarity_index
+        self.price_history = price_history
+        # 세그먼트 저장소에서 만든 경우 읽어 들인 세그먼트 이름 목록
+        self.segments = segments
+        # DAG가 계산한 유사 핫딜 클러스터 (세그먼트 저장소에 클러스터 파일이 있는 경우)
+        self.clusters = clusters
+        nos = items.store.nos[items.start:items.stop]
+        self.max_no = max(nos, default=0)
+        # DAG는 파일 순서대로 no를 부여하므로 보통 True
+        self.ordered = all(a <= b for a, b in zip(nos, nos[1:]))
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def store(self) -> DealStore:
+        return self.items.store
+
+    def items_after(self, watermark: int):
+        """no가 watermark보다 큰 항목만 반환합니다. (정렬된 경우 이진 탐색)"""
+        if watermark <= 0:
+            return self.items
+        nos = self.store.nos
+        if self.ordered:
+            return self.items[bisect.bisect_right(nos, watermark, 0, len(self.items)):]
+        return [item for item in self.items if nos[item.index] > watermark]
+
+    def position_of(self, no: int) -> int | None:
+        """no 항목의 스냅샷 위치. (정렬된 경우 이진 탐색, 아니면 None)"""
+        if not self.ordered:
+            return None
+        nos = self.store.nos
+        pos = bisect.bisect_left(nos, no, 0, len(self.items))
+        if pos < len(self.items) and nos[pos] == no:
+            return pos
+        return None
+
+    def search(self, keyword: str) -> list[DealView]:
+        """키워드를 제목에 포함하는 항목을 no 내림차순으로 반환합니다."""
+        return [self.items[i] for i in self.search_index.search(keyword, size=len(self.items))]
+
+
+class GCSBlobSource:
+    """Google Cloud Storage의 단일 blob을 스냅샷 원본으로 사용합니다."""
+
+    def __init__(self, bucket_name: str, blob_name: str, client=None):
+        self.bucket_name = bucket_name
+        self.blob_name = blob_name
+        self._client = client
+
+    def current_generation(self) -> int | None:
+        """메타데이터만 조회하여 현재 generation을 반환합니다. (본문은 내려받지 않음)"""
+        blob = self._client_bucket().blob(self.blob_name)
+        blob.reload()
+        return blob.generation
+
+    def open(self, generation: tuple | int | None):
+        """
+        조회한 generation의 본문을 스트림으로 엽니다. (전체를 메모리에 올리지 않음)
+
+        SegmentSource의 fallback으로 쓰일 때는 (manifest 버전, 클러스터 파일 버전) tuple이 전달될 수 있으며,
+        이 경우 blob의 최신 본문을 엽니다.
+        """
+        generation = generation if isinstance(generation, int) else None
+        blob = self._client_bucket().blob(self.blob_name, generation=generation)
+        return blob.open("rb", chunk_size=CHUNK_SIZE)
+
+    def build_snapshot(self, generation: tuple | int | None, previous: DealSnapshot | None = None) -> DealSnapshot:
+        return build_snapshot(self, generation, previous)
+
+    def _client_bucket(self):
+        if self._client is None:
+            from google.cloud import storage
+            self._client = storage.Client()
+        return self._client.bucket(self.bucket_name)
+
+
+class LocalFileSource:
+    """로컬 JSON 파일을 blob 대신 사용합니다. (오프라인 테스트/개발용)"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def current_generation(self) -> int | None:
+        """파일 수정 시각(ns)을 generation으로 사용합니다."""
+        return os.stat(self.path).st_mtime_ns
+
+    def open(self, generation: tuple | int | None):
+        return open(self.path, "rb")
+
+    def build_snapshot(self, generation: tuple | int | None, previous: DealSnapshot | None = None) -> DealSnapshot:
+        return build_snapshot(self, generation, previous)
+
+
+class SegmentSource:
+    """
+    세그먼트 저장소를 스냅샷 원본으로 사용합니다.
+
+    (manifest 버전, 클러스터 파일 버전)을 generation으로 사용하고, 이전 스냅샷 이후에 추가된 세그먼트만 읽습니다.
+    클러스터 파일만 바뀐 경우에는 세그먼트를 읽지 않고 클러스터만 다시 읽습니다.
+    manifest가 아직 없으면 (이전 형식에서 옮기는 중) fallback 원본을 대신 사용합니다.
+    """
+
+    def __init__(self, store: SegmentStore, fallback=None):
+        self.store = store
+        self.fallback = fallback
+
+    def current_generation(self) -> tuple | int | None:
+        generation = self.store.manifest_version()
+        if generation is None:
+            return self.fallback.current_generation() if self.fallback is not None else None
+        return generation, self.store.backend.version(CLUSTERS_NAME)
+
+    def build_snapshot(self, generation: tuple | int | None, previous: DealSnapshot | None = None) -> DealSnapshot:
+        manifest = self.store.load_manifest()
+        if not manifest.segments and self.fallback is not None:
+            return self.fallback.build_snapshot(generation, previous)
+
+        names = tuple(manifest.segment_names)
+        loaded = previous.segments if previous is not None else None
+        if loaded is not None and names[:len(loaded)] == loaded and len(previous.store) == len(previous):
+            # 이미 읽은 세그먼트는 변경되지 않으므로 뒤에 추가된 세그먼트만 저장소에 덧붙임
+            store = previous.store
+            self._load_segments(store, names[len(loaded):])
+            items = DealSequence(store)
+            with STAGE_SECONDS.time(stage="index"):
+                search_index = previous.search_index
+                search_index.extend(items)
+                similarity_index = previous.similarity_index
+                similarity_index.extend(items)
+                price_history = previous.price_history
+                price_history.extend(items)
+        else:
+            store = DealStore()
+            self._load_segments(store, names)
+            items = DealSequence(store)
+            with STAGE_SECONDS.time(stage="index"):
+                search_index = SearchIndex.build(items)
+                similarity_index = SimilarityIndex.build(items)
+                price_history = PriceHistory.build(items)
+        with STAGE_SECONDS.time(stage="clusters"):
+            clusters = ClusterMembership.load(self.store.backend, previous.clusters if previous is not None else None)
+        return DealSnapshot(items, generation, datetime.datetime.now(KST), search_index, similarity_index,
+                            price_history, segments=names, clusters=clusters)
+
+    def _load_segments(self, store: DealStore, names):
+        """세그먼트를 하나씩 내려받고(download) 해석해(parse) 저장소에 넣습니다(preprocess)."""
+        for name in names:
+            with STAGE_SECONDS.time(stage="download"):
+                data = self.store.read_segment(name)
+            if not dealcodec.is_encoded(data):
+                # 이전에 저장된 NDJSON 세그먼트는 항목을 하나씩 옮김
+                with STAGE_SECONDS.time(stage="preprocess"):
+                    store.extend(dealcodec.iter_decode(data))
+                continue
+            # 바이너리 세그먼트는 항목 dict를 만들지 않고 열 단위로 옮김
+            with STAGE_SECONDS.time(stage="parse"):
+                count, columns = dealcodec.decode_columns(data)
+            with STAGE_SECONDS.time(stage="preprocess"):
+                store.extend_columns(count, columns)
+
+
+def _stream_into(store: DealStore, stream, skip_at_or_below: int | None = None, expected_skips: int = 0) -> bool:
+    """
+    스트림의 항목을 하나씩 저장소에 넣습니다. (JSON 배열과 NDJSON 모두 가능)
+
+    skip_at_or_below 이하의 항목은 dict로 만들지 않고 건너뛰며, 건너뛴 수가
+    expected_skips와 다르면 (데이터가 재생성된 경우) 아무것도 넣지 않고 False를 반환합니다.
+    """
+    skipped = [0]
+    checked = skip_at_or_below is None
+    for item in iter_records(stream, skip_at_or_below=skip_at_or_below, skipped=skipped):
+        if not checked:
+            # DAG는 항상 뒤에 덧붙이므로 건너뛴 항목은 모두 앞부분에 있음
+            if skipped[0] != expected_skips:
+                return False
+            checked = True
+        store.append(item)
+    return checked or skipped[0] == expected_skips
+
+
+def build_snapshot(source, generation: tuple | int | None,
+                   previous: DealSnapshot | None = None) -> DealSnapshot:
+    """
+    원본 스트림으로 새 스냅샷을 만듭니다.
+
+    이전 스냅샷이 있으면 그 watermark(최대 no) 이하의 항목은 파싱하지 않고 건너뛰어
+    새로 추가된 항목만 저장/색인합니다. 항목은 스트림에서 하나씩 저장소로 옮겨지므로
+    전체 응답이나 dict 목록을 한꺼번에 들고 있지 않습니다. (그래서 내려받기/해석/전처리 시간은
+    stage="stream" 하나로 기록됩니다.)
+    """
+    if previous is not None and previous.ordered and len(previous.store) == len(previous):
+        store = previous.store
+        with STAGE_SECONDS.time(stage="stream"), source.open(generation) as stream:
+            appended = _stream_into(store, stream, previous.max_no, len(previous))
+        if appended:
+            items = DealSequence(store)
+            with STAGE_SECONDS.time(stage="index"):
+                search_index = previous.search_index
+                search_index.extend(items)
+                similarity_index = previous.similarity_index
+                similarity_index.extend(items)
+                price_history = previous.price_history
+                price_history.extend(items)
+            return DealSnapshot(items, generation, datetime.datetime.now(KST), search_index, similarity_index,
+                                price_history)
+        print("이전 스냅샷과 데이터가 이어지지 않아 전체를 다시 불러옵니다.")
+
+    store = DealStore()
+    with STAGE_SECONDS.time(stage="stream"), source.open(generation) as stream:
+        _stream_into(store, stream)
+    items = DealSequence(store)
+    with STAGE_SECONDS.time(stage="index"):
+        search_index = SearchIndex.build(items)
+        similarity_index = SimilarityIndex.build(items)
+        price_history = PriceHistory.build(items)
+    return DealSnapshot(items, generation, datetime.datetime.now(KST), search_index, similarity_index,
+                        price_history)
+
+
+class DealSnapshotManager:
+    """
+    모든 명령어가 공유하는 스냅샷 관리자.
+
+    메타데이터 조회는 min_check_interval초에 한 번으로 제한하고,
+    generation이 바뀐 경우에만 본문을 내려받아 새 스냅샷으로 교체합니다.
+    새로고침에 실패하면 직전 스냅샷을 그대로 돌려줍니다.
+    """
+
+    def __init__(self, source, min_check_interval: float = 30.0):
+        self.source = source
+        self.min_check_interval = min_check_interval
+        self._snapshot: DealSnapshot | None = None
+        self._last_check = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def snapshot(self) -> DealSnapshot | None:
+        return self._snapshot
+
+    async def get(self, force_check: bool = False) -> DealSnapshot:
+        """
+        최신 스냅샷을 반환합니다.
+
+        Args:
+            force_check (bool): True이면 확인 주기와 상관없이 generation을 조회합니다.
+        """
+        if not force_check and self._snapshot is not None and \
+           time.monotonic() - self._last_check < self.min_check_interval:
+            return self._snapshot
+
+        async with self._lock:
+            # 락을 기다리는 동안 다른 코루틴이 이미 새로고침했을 수 있음
+            if not force_check and self._snapshot is not None and \
+               time.monotonic() - self._last_check < self.min_check_interval:
+                return self._snapshot
+            try:
+                await self._refresh()
+            except Exception as e:
+                if self._snapshot is None:
+                    raise
+                print(f"스냅샷 새로고침 실패, 이전 스냅샷을 사용합니다: {e}")
+            return self._snapshot
+
+    async def _refresh(self):
+        with STAGE_SECONDS.time(stage="snapshot_check"):
+            generation = await asyncio.to_thread(self.source.current_generation)
+        self._last_check = time.monotonic()
+        if self._snapshot is not None and generation is not None and \
+           generation == self._snapshot.generation:
+            return
+
+        try:
+            self._snapshot = await asyncio.to_thread(self.source.build_snapshot, generation, self._snapshot)
+        except Exception:
+            SNAPSHOT_REFRESHES.inc(result="failed")
+            raise
+        SNAPSHOT_REFRESHES.inc(result="loaded")
+        SNAPSHOT_ITEMS.set(len(self._snapshot))
+        print(f"새 스냅샷 로드 완료: generation={generation}, {len(self._snapshot)}개 항목")
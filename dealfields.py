@@ -0,0 +1,101 @@
+"""
+알구몬 목록 페이지의 필드 정의와 일괄 추출 스크립트.
+
+항목(li)마다 WebDriver/Playwright 호출을 여러 번 하는 대신, 페이지 안에서 실행되는
+스크립트 한 번으로 새로 나타난 모든 행을 구조화된 데이터로 받아옵니다.
+Selenium(DAG)과 Playwright(historyscraper) 모두 같은 필드 정의를 사용합니다.
+"""
+
+# 목록의 각 행(li)
+LIST_ITEM_XPATH = "/html/body/div[6]/div[2]/ul/li"
+
+# (필드 이름, 행 기준 상대 XPath, 값 종류)
+#   text: 화면에 보이는 텍스트, href: 절대 URL로 변환된 링크
+FIELDS = (
+    ("title", "div[1]/div[2]/div/p[2]/span/a", "text"),
+    ("price", "div[1]/div[2]/p[1]", "text"),
+    ("link", "div[1]/div[2]/div/p[2]/span/a", "href"),
+    ("timestamp", "div[1]/div[2]/p[2]/small", "text"),
+)
+
+# start번째 행부터 모든 행을 읽어 {count: 전체 행 수, rows: [{필드: 값 또는 null}, ...]}를 반환
+EXTRACT_ROWS_JS = """
+(args) => {
+    const [listXPath, fields, start] = args;
+    const rows = document.evaluate(listXPath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    const result = [];
+    for (let i = start; i < rows.snapshotLength; i++) {
+        const row = rows.snapshotItem(i);
+        const record = {};
+        for (const [name, path, kind] of fields) {
+            const el = document.evaluate(path, row, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+            if (el === null) {
+                record[name] = null;
+            } else if (kind === "href") {
+                record[name] = el.href;
+            } else {
+                record[name] = el.innerText.trim();
+            }
+        }
+        result.push(record);
+    }
+    return {count: rows.snapshotLength, rows: result};
+}
+"""
+
+_ARGS = [LIST_ITEM_XPATH, [list(field) for field in FIELDS]]
+_SELENIUM_SCRIPT = f"return ({EXTRACT_ROWS_JS})(arguments[0]);"
+
+
+def _products(result: dict) -> tuple[int, list[dict]]:
+    # 제목이 없는 행(광고 등)은 상품이 아니므로 제외
+    return result["count"], [row for row in result["rows"] if row.get("title")]
+
+
+def selenium_extract_rows(driver, start: int = 0) -> tuple[int, list[dict]]:
+    """
+    Selenium WebDriver로 start번째 행부터의 항목을 한 번의 호출로 읽습니다.
+
+    Returns:
+        tuple[int, list[dict]]: (현재 페이지의 전체 행 수, 새 항목 목록)
+    """
+    return _products(driver.execute_script(_SELENIUM_SCRIPT, _ARGS + [start]))
+
+
+def playwright_extract_rows(page, start: int = 0) -> tuple[int, list[dict]]:
+    """Playwright 페이지로 start번째 행부터의 항목을 한 번의 호출로 읽습니다."""
+    return _products(page.evaluate(EXTRACT_ROWS_JS, _ARGS + [start]))
+
+
+
+# 현재 목록의 행 수 (새 행이 나타났는지 확인하는 용도)
+ROW_COUNT_JS = f"""
+() => document.evaluate("count({LIST_ITEM_XPATH})", document, null, XPathResult.NUMBER_TYPE, null).numberValue
+"""
+_SELENIUM_COUNT_SCRIPT = f"return ({ROW_COUNT_JS})();"
+
+
+def selenium_row_count(driver) -> int:
+    return int(driver.execute_script(_SELENIUM_COUNT_SCRIPT))
+
+
+def playwright_row_count(page) -> int:
+    return int(page.evaluate(ROW_COUNT_JS))
+
+
+def playwright_wait_for_rows(page, more_than: int, timeout: float) -> bool:
+    """
+    행 수가 more_than보다 많아질 때까지 기다립니다.
+
+    Args:
+        timeout (float): 최대 대기 시간(초).
+
+    Returns:
+        bool: 시간 안에 새 행이 나타났으면 True.
+    """
+    from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+    try:
+        page.wait_for_function(f"({ROW_COUNT_JS})() > {int(more_than)}", timeout=timeout * 1000)
+        return True
+    except PlaywrightTimeoutError:
+        return False
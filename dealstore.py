@@ -0,0 +1,291 @@
+"""
+배열 기반의 압축 핫딜 저장소.
+
+항목마다 dict와 tz-aware datetime을 들고 있는 대신, 숫자 필드는 array 열(column)에,
+문자열 필드는 하나의 UTF-8 버퍼에 이어 붙이고 시작 위치(offset)만 보관합니다.
+추가만 가능(append-only)하므로 이미 만들어진 DealSequence는 이후 추가와 무관하게 그대로 유지됩니다.
+"""
+import datetime
+import itertools
+import math
+from array import array
+
+import pytz
+
+from dealcodec import MISSING
+from normalize import extract_numeric_price
+
+KST = pytz.timezone('Asia/Seoul')
+TIMESTAMP_FORMAT = "%Y/%m/%d-%H:%M"
+NO_TIMESTAMP = -1
+
+
+def _price_or_nan(price_value: float | None) -> float:
+    return math.nan if price_value is None else price_value
+
+
+def _minute_of(timestamp_str: str | None, timestamp_epoch) -> int:
+    """정규화된 epoch가 있으면 그대로 쓰고, 없으면 원본 문자열을 파싱합니다. 실패하면 NO_TIMESTAMP."""
+    if timestamp_epoch is not None:
+        return int(timestamp_epoch) // 60
+    if timestamp_str:
+        try:
+            naive_dt = datetime.datetime.strptime(timestamp_str, TIMESTAMP_FORMAT)
+            return int(KST.localize(naive_dt).timestamp()) // 60
+        except ValueError as e:
+            print(f"데이터 전처리 중 시간 변환 오류: '{timestamp_str}' - {e}")
+    return NO_TIMESTAMP
+
+
+class _PackedStrings:
+    """offset으로 구분된 UTF-8 문자열 열."""
+
+    __slots__ = ("_data", "_offsets")
+
+    def __init__(self):
+        self._data = bytearray()
+        self._offsets = array('Q', [0])
+
+    def append(self, text: str):
+        self._data += text.encode("utf-8")
+        self._offsets.append(len(self._data))
+
+    def extend(self, texts):
+        encoded = list(map(str.encode, texts))
+        self._offsets.extend(itertools.islice(itertools.accumulate(map(len, encoded), initial=len(self._data)), 1, None))
+        self._data += b"".join(encoded)
+
+    def __getitem__(self, index: int) -> str:
+        return self._data[self._offsets[index]:self._offsets[index + 1]].decode("utf-8")
+
+    def nbytes(self) -> int:
+        return len(self._data) + self._offsets.itemsize * len(self._offsets)
+
+
+class DealStore:
+    """
+    no, 등록 시각(epoch 분), 숫자 가격은 array 열로, 제목/링크/가격 문자열은 packed 버퍼로 저장합니다.
+
+    원본 timestamp 문자열은 TIMESTAMP_FORMAT으로 다시 만들 수 있으므로 저장하지 않고,
+    파싱에 실패한(또는 없는) 항목의 원본 값만 따로 보관합니다.
+    """
+
+    def __init__(self):
+        self.nos = array('q')
+        self.minutes = array('q')
+        self.prices = array('d')
+        self.titles = _PackedStrings()
+        self.links = _PackedStrings()
+        self.price_texts = _PackedStrings()
+        self._raw_timestamps: dict[int, str | None] = {}
+        self._missing: dict[int, frozenset] = {}
+
+    def __len__(self):
+        return len(self.nos)
+
+    def append(self, item: dict):
+        """원본 dict 항목 하나를 저장소에 추가합니다."""
+        index = len(self.nos)
+        missing = frozenset(key for key in ("no", "title", "link", "price") if item.get(key) is None)
+        if missing:
+            self._missing[index] = missing
+
+        self.nos.append(int(item.get("no") or 0))
+        self.titles.append(item.get("title") or "")
+        self.links.append(item.get("link") or "")
+        price_text = item.get("price") or ""
+        self.price_texts.append(price_text)
+        # 적재 단계에서 정규화된 항목은 숫자 필드를 그대로 사용하고, 이전 항목만 문자열을 파싱
+        if "price_value" in item:
+            price_value = item["price_value"]
+        else:
+            price_value = extract_numeric_price(price_text)
+        self.prices.append(_price_or_nan(price_value))
+
+        minute = _minute_of(item.get("timestamp"), item.get("timestamp_epoch"))
+        if minute == NO_TIMESTAMP:
+            self._raw_timestamps[index] = item.get("timestamp")
+        self.minutes.append(minute)
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def extend_columns(self, count: int, columns: dict[str, list]):
+        """
+        dealcodec.decode_columns의 결과(필드 -> 값 목록, 값이 없는 자리는 MISSING)를 열 단위로 추가합니다.
+
+        항목마다 dict를 만들지 않으며, 결과는 같은 항목을 하나씩 append한 것과 같습니다.
+        """
+        start = len(self.nos)
+
+        def column(name):
+            values = columns.get(name)
+            return [MISSING] * count if values is None else values
+
+        nos, titles, links, price_texts = (column(key) for key in ("no", "title", "link", "price"))
+        for key, values in (("no", nos), ("title", titles), ("link", links), ("price", price_texts)):
+            if None in values or MISSING in values:
+                for offset, value in enumerate(values):
+                    if value is None or value is MISSING:
+                        index = start + offset
+                        self._missing[index] = self._missing.get(index, frozenset()) | {key}
+
+        def texts(values):
+            if None in values or MISSING in values:
+                return ["" if value is MISSING else value or "" for value in values]
+            return values
+
+        try:
+            self.nos.extend(array('q', nos))
+        except TypeError:
+            self.nos.extend(array('q', (0 if value is MISSING else int(value or 0) for value in nos)))
+        self.titles.extend(texts(titles))
+        self.links.extend(texts(links))
+        price_texts = texts(price_texts)
+        self.price_texts.extend(price_texts)
+
+        price_values = columns.get("price_value")
+        if price_values is None:
+            self.prices.extend(array('d', (_price_or_nan(extract_numeric_price(text)) for text in price_texts)))
+        elif None not in price_values and MISSING not in price_values:
+            self.prices.extend(array('d', price_values))
+        else:
+            self.prices.extend(array('d', (
+                _price_or_nan(extract_numeric_price(text) if value is MISSING else value)
+                for text, value in zip(price_texts, price_values)
+            )))
+
+        timestamps = column("timestamp")
+        epochs = column("timestamp_epoch")
+        if None not in epochs and MISSING not in epochs:
+            # 적재 단계에서 정규화된 세그먼트는 모든 항목에 epoch가 있음
+            self.minutes.extend(array('q', [int(timestamp_epoch) // 60 for timestamp_epoch in epochs]))
+            return
+        minutes = array('q')
+        for offset, (timestamp_str, timestamp_epoch) in enumerate(zip(timestamps, epochs)):
+            if timestamp_epoch is not None and timestamp_epoch is not MISSING:
+                minutes.append(int(timestamp_epoch) // 60)
+                continue
+            timestamp_str = None if timestamp_str is MISSING else timestamp_str
+            minute = _minute_of(timestamp_str, None)
+            if minute == NO_TIMESTAMP:
+                self._raw_timestamps[start + offset] = timestamp_str
+            minutes.append(minute)
+        self.minutes.extend(minutes)
+
+    def has(self, index: int, key: str) -> bool:
+        missing = self._missing.get(index)
+        return not missing or key not in missing
+
+    def timestamp_text(self, index: int) -> str | None:
+        if index in self._raw_timestamps:
+            return self._raw_timestamps[index]
+        return self.parsed_timestamp(index).strftime(TIMESTAMP_FORMAT)
+
+    def parsed_timestamp(self, index: int) -> datetime.datetime | None:
+        minute = self.minutes[index]
+        if minute == NO_TIMESTAMP:
+            return None
+        return datetime.datetime.fromtimestamp(minute * 60, KST)
+
+    def price_value(self, index: int) -> float | None:
+        value = self.prices[index]
+        return None if math.isnan(value) else value
+
+    def nbytes(self) -> int:
+        """열과 버퍼가 차지하는 대략적인 바이트 수."""
+        arrays = sum(a.itemsize * len(a) for a in (self.nos, self.minutes, self.prices))
+        strings = self.titles.nbytes() + self.links.nbytes() + self.price_texts.nbytes()
+        return arrays + strings
+
+
+_FIELDS = frozenset(("no", "title", "link", "price", "timestamp", "parsed_timestamp", "price_value", "minute"))
+
+
+class DealView:
+    """
+    저장소의 한 항목을 가리키는 가벼운 뷰.
+
+    기존 dict 항목과 같은 방식으로 `item.get("title", 기본값)`을 쓸 수 있습니다.
+    """
+
+    __slots__ = ("store", "index")
+
+    def __init__(self, store: DealStore, index: int):
+        self.store = store
+        self.index = index
+
+    @property
+    def no(self) -> int:
+        return self.store.nos[self.index]
+
+    @property
+    def title(self) -> str:
+        return self.store.titles[self.index]
+
+    @property
+    def link(self) -> str:
+        return self.store.links[self.index]
+
+    @property
+    def price(self) -> str:
+        return self.store.price_texts[self.index]
+
+    @property
+    def price_value(self) -> float | None:
+        return self.store.price_value(self.index)
+
+    @property
+    def minute(self) -> int:
+        return self.store.minutes[self.index]
+
+    @property
+    def timestamp(self) -> str | None:
+        return self.store.timestamp_text(self.index)
+
+    @property
+    def parsed_timestamp(self) -> datetime.datetime | None:
+        return self.store.parsed_timestamp(self.index)
+
+    def get(self, key: str, default=None):
+        if key not in _FIELDS or not self.store.has(self.index, key):
+            return default
+        value = getattr(self, key)
+        if key == "timestamp" and value is None:
+            return default
+        return value
+
+    def __repr__(self):
+        return f"DealView(no={self.no}, title={self.title!r})"
+
+
+class DealSequence:
+    """저장소 앞부분 [start, stop) 구간에 대한 읽기 전용 시퀀스."""
+
+    __slots__ = ("store", "start", "stop")
+
+    def __init__(self, store: DealStore, start: int = 0, stop: int | None = None):
+        self.store = store
+        self.start = start
+        self.stop = len(store) if stop is None else stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("DealSequence는 step 슬라이스를 지원하지 않습니다.")
+            return DealSequence(self.store, self.start + start, self.start + max(start, stop))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return DealView(self.store, self.start + index)
+
+    def __iter__(self):
+        store = self.store
+        for index in range(self.start, self.stop):
+            yield DealView(store, index)
@@ -0,0 +1,84 @@
+"""
+구독별 중복 알림 방지용 크기 제한 집합.
+
+제목 전체를 보관하지 않고 8바이트 해시만 시간 창(window) 동안 보관합니다.
+창이 지나거나 최대 개수를 넘으면 오래된 것부터 제거되므로 구독당 메모리가 일정합니다.
+"""
+import hashlib
+import struct
+import time
+from collections import OrderedDict
+
+SEEN_WINDOW_SECONDS = 7 * 24 * 60 * 60
+SEEN_WINDOW_MAX_SIZE = 2000
+_ENTRY = struct.Struct("<Qd")
+
+
+DEAL_KEY_SIZE = 16
+
+
+def deal_key(title, link) -> bytes:
+    """(title, link) 쌍의 고정 길이 digest. DAG의 중복 색인과 과거 데이터 병합에서 같은 키를 사용합니다."""
+    return hashlib.blake2b(f"{title}\x1f{link}".encode("utf-8"), digest_size=DEAL_KEY_SIZE).digest()
+
+
+def title_hash(title: str) -> int:
+    """프로세스 재시작과 무관하게 같은 값을 내는 제목 해시."""
+    return int.from_bytes(hashlib.blake2b(title.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class SeenWindow:
+    """
+    시간 창 기반 해시 집합.
+
+    `title in window`, `window.add(title)`로 기존 set과 같은 방식으로 사용합니다.
+    """
+
+    __slots__ = ("window_seconds", "max_size", "_entries")
+
+    def __init__(self, window_seconds: float = SEEN_WINDOW_SECONDS, max_size: int = SEEN_WINDOW_MAX_SIZE):
+        self.window_seconds = window_seconds
+        self.max_size = max_size
+        self._entries: OrderedDict[int, float] = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, title: str) -> bool:
+        self._evict(time.time())
+        return title_hash(title) in self._entries
+
+    def add(self, title: str, seen_at: float | None = None):
+        seen_at = time.time() if seen_at is None else seen_at
+        key = title_hash(title)
+        self._entries[key] = seen_at
+        self._entries.move_to_end(key)
+        self._evict(seen_at)
+
+    def update(self, titles):
+        now = time.time()
+        for title in titles:
+            self.add(title, now)
+
+    def _evict(self, now: float):
+        entries = self._entries
+        cutoff = now - self.window_seconds
+        while entries:
+            key, seen_at = next(iter(entries.items()))
+            if seen_at >= cutoff and len(entries) <= self.max_size:
+                break
+            entries.popitem(last=False)
+
+    def to_bytes(self) -> bytes:
+        """(해시, 기록 시각) 쌍을 고정 길이 바이너리로 직렬화합니다."""
+        return b"".join(_ENTRY.pack(key, seen_at) for key, seen_at in self._entries.items())
+
+    @classmethod
+    def from_bytes(cls, data: bytes | None, window_seconds: float = SEEN_WINDOW_SECONDS,
+                   max_size: int = SEEN_WINDOW_MAX_SIZE) -> "SeenWindow":
+        window = cls(window_seconds, max_size)
+        if data:
+            for key, seen_at in _ENTRY.iter_unpack(data):
+                window._entries[key] = seen_at
+            window._evict(time.time())
+        return window
@@ -0,0 +1,205 @@
+"""
+DM 알림 발송 파이프라인.
+
+매칭 단계는 enqueue()로 임베드를 넘기기만 하고 곧바로 다음 작업을 진행합니다.
+발송은 별도의 워커들이 담당하며 다음을 처리합니다.
+- 사용자별 DM 채널 캐시 (매 주기 fetch_user 호출 없음)
+- 사용자별로 최대 10개 임베드를 한 메시지로 묶어 전송
+- 동시 전송 수 제한과 초당 전송 수 제한
+- 429/5xx 응답은 지수 백오프로 재시도, 403/404는 재시도하지 않음
+discord.py의 HTTP 클라이언트가 route별 rate limit bucket을 관리하므로,
+여기서는 그 위에서 전체 전송 속도와 재시도만 조절합니다.
+"""
+import asyncio
+import random
+import time
+from collections import OrderedDict, deque
+
+import discord
+
+from metrics import REGISTRY, STAGE_SECONDS
+
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+DISPATCH_CONCURRENCY = 4
+MAX_SENDS_PER_SECOND = 20
+MAX_RETRIES = 4
+BASE_BACKOFF_SECONDS = 1.0
+CHANNEL_CACHE_SIZE = 2000
+# DM이 막힌 사용자는 이 시간 동안 전송을 시도하지 않음
+FORBIDDEN_COOLDOWN_SECONDS = 60 * 60
+
+DM_EMBEDS = REGISTRY.counter("moabot_dm_embeds_total", "발송했거나 발송하지 못한 알림 임베드 수", labels=("result",))
+DM_MESSAGES = REGISTRY.counter("moabot_dm_messages_total", "발송한 DM 메시지 수")
+
+
+class _RateLimiter:
+    """초당 전송 수를 제한하는 토큰 버킷."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._tokens = rate
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class DMDispatcher:
+    """
+    사용자별 DM 발송 큐.
+
+    같은 사용자는 한 번에 하나의 워커만 처리하므로 알림 순서가 유지됩니다.
+    """
+
+    def __init__(self, bot, concurrency: int = DISPATCH_CONCURRENCY, sends_per_second: float = MAX_SENDS_PER_SECOND):
+        self.bot = bot
+        self.concurrency = concurrency
+        self._queue: asyncio.Queue[int] = asyncio.Queue()
+        self._pending: dict[int, deque] = {}
+        self._channels: OrderedDict[int, discord.abc.Messageable] = OrderedDict()
+        # 만료 시각 순서로 유지하여 지난 항목을 앞에서부터 제거함
+        self._forbidden_until: OrderedDict[int, float] = OrderedDict()
+        self._limiter = _RateLimiter(sends_per_second)
+        self._workers: list[asyncio.Task] = []
+        self.sent_messages = 0
+        self.sent_embeds = 0
+        self.failed_embeds = 0
+
+    def start(self):
+        if self._workers:
+            return
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    def enqueue(self, user_id: int, embeds: list[discord.Embed]):
+        """사용자에게 보낼 임베드를 대기열에 추가합니다. 전송을 기다리지 않습니다."""
+        if not embeds:
+            return
+        if self._is_forbidden(user_id):
+            self._record_failed(len(embeds))
+            return
+        pending = self._pending.get(user_id)
+        if pending is None:
+            # 대기열에는 사용자 id가 한 번만 들어가고, 임베드는 사용자별 버퍼에 모임
+            pending = self._pending[user_id] = deque()
+            self._queue.put_nowait(user_id)
+        pending.extend(embeds)
+
+    def pending_count(self) -> int:
+        return sum(len(pending) for pending in self._pending.values())
+
+    async def _worker(self):
+        while True:
+            user_id = await self._queue.get()
+            try:
+                await self._drain_user(user_id)
+            except Exception as e:
+                print(f"오류: DM 발송 워커 처리 중 예외 발생 ({user_id}): {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _drain_user(self, user_id: int):
+        pending = self._pending.get(user_id)
+        while pending:
+            batch = self._take_batch(pending)
+            if not await self._send_with_retry(user_id, batch):
+                self._record_failed(len(batch))
+                if self._is_forbidden(user_id):
+                    self._record_failed(len(pending))
+                    pending.clear()
+        self._pending.pop(user_id, None)
+
+    def _is_forbidden(self, user_id: int) -> bool:
+        """DM이 막혀 대기 중인 사용자인지 확인합니다. 대기 시간이 지난 항목은 이때 함께 제거합니다."""
+        now = time.monotonic()
+        forbidden_until = self._forbidden_until
+        while forbidden_until:
+            oldest_user, until = next(iter(forbidden_until.items()))
+            if until > now:
+                break
+            del forbidden_until[oldest_user]
+        return user_id in forbidden_until
+
+    def _forbid(self, user_id: int):
+        self._forbidden_until[user_id] = time.monotonic() + FORBIDDEN_COOLDOWN_SECONDS
+        self._forbidden_until.move_to_end(user_id)
+
+    def _record_failed(self, count: int):
+        self.failed_embeds += count
+        DM_EMBEDS.inc(count, result="failed")
+
+    @staticmethod
+    def _take_batch(pending: deque) -> list[discord.Embed]:
+        batch = []
+        total_chars = 0
+        while pending and len(batch) < MAX_EMBEDS_PER_MESSAGE:
+            embed_chars = len(pending[0])
+            if batch and total_chars + embed_chars > MAX_EMBED_CHARS_PER_MESSAGE:
+                break
+            batch.append(pending.popleft())
+            total_chars += embed_chars
+        return batch
+
+    async def _get_channel(self, user_id: int):
+        channel = self._channels.get(user_id)
+        if channel is not None:
+            self._channels.move_to_end(user_id)
+            return channel
+
+        user = self.bot.get_user(user_id)
+        if user is None:
+            await self._limiter.acquire()
+            user = await self.bot.fetch_user(user_id)
+        channel = user.dm_channel
+        if channel is None:
+            await self._limiter.acquire()
+            channel = await user.create_dm()
+
+        self._channels[user_id] = channel
+        if len(self._channels) > CHANNEL_CACHE_SIZE:
+            self._channels.popitem(last=False)
+        return channel
+
+    async def _send_with_retry(self, user_id: int, batch: list[discord.Embed]) -> bool:
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                channel = await self._get_channel(user_id)
+                await self._limiter.acquire()
+                with STAGE_SECONDS.time(stage="dm_send"):
+                    await channel.send(embeds=batch)
+                self.sent_messages += 1
+                self.sent_embeds += len(batch)
+                DM_MESSAGES.inc()
+                DM_EMBEDS.inc(len(batch), result="sent")
+                return True
+            except discord.errors.Forbidden:
+                print(f"경고: {user_id}님의 DM이 막혀 있어 알림을 보내지 못했습니다. (discord.errors.Forbidden)")
+                self._forbid(user_id)
+                self._channels.pop(user_id, None)
+                return False
+            except discord.errors.NotFound:
+                print(f"경고: {user_id}님을 찾을 수 없어 알림을 보내지 못했습니다.")
+                self._channels.pop(user_id, None)
+                return False
+            except discord.errors.HTTPException as e:
+                if e.status != 429 and e.status < 500:
+                    print(f"오류: DM 전송 중 다른 오류 발생 ({user_id}): {e}")
+                    return False
+                delay = getattr(e, "retry_after", None) or BASE_BACKOFF_SECONDS * (2 ** attempt)
+            except (OSError, asyncio.TimeoutError) as e:
+                print(f"경고: DM 전송 중 연결 오류 ({user_id}): {e}")
+                delay = BASE_BACKOFF_SECONDS * (2 ** attempt)
+
+            if attempt < MAX_RETRIES:
+                await asyncio.sleep(delay + random.uniform(0, delay / 2))
+        print(f"오류: DM 전송 재시도 횟수를 초과했습니다. ({user_id})")
+        return False
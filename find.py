@@ -1,26 +1,147 @@
+"""
+단어 빈도 분석과 스캔 키워드 추천.
+
+파일을 바이트 구간(chunk)으로 나누어 여러 프로세스가 각자 읽고 센 뒤 Counter를 합칩니다.
+각 구간은 구간 안에서 시작하는 줄만 처리하므로 줄이 두 구간에 걸쳐 중복/누락되지 않습니다.
+(CSV 셀 안의 줄바꿈은 구간 경계에서 잘릴 수 있으므로 그런 파일은 --workers 1로 실행하세요.)
+분석은 실행마다 한 번만 하고, 개수/목록/상위 k개는 같은 결과에서 구합니다.
+
+    # CSV 단어 빈도 (기존 동작)
+    python find.py 짬처리.csv --min-count 5
+    # 핫딜 데이터 제목에서 스캔 키워드 후보 추천 (이미 구독 중인 키워드 제외)
+    python find.py --deals history.ndjson --top 50 --exclude-subscribed subscriptions.db
+"""
+import argparse
 import csv
+import heapq
+import itertools
+import json
+import os
+import re
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+
+DEFAULT_CSV = "짬처리.csv"
+CSV_ENCODING = "cp949"
+MIN_CHUNK_BYTES = 1024 * 1024
+TITLE_BATCH = 10000  # JSON 배열 입력을 작업 프로세스로 보낼 때 한 번에 보내는 제목 수
+
+# 한글 덩어리와 영문/숫자 덩어리를 따로 분리 ("갤럭시s24울트라" -> 갤럭시, s24, 울트라)
+_KOREAN_TOKEN = re.compile(r'[가-힣]+|[a-z0-9]+(?:[.+\-][a-z0-9]+)*')
+
+
+def korean_tokens(text: str) -> list[str]:
+    """한글/영문·숫자 경계에서 나누고 괄호, 기호 등은 버린 소문자 토큰."""
+    return _KOREAN_TOKEN.findall(text.lower())
+
+
+def split_tokens(text: str) -> list[str]:
+    """공백 기준 소문자 토큰. (기존 analyze_words와 같은 규칙)"""
+    return text.lower().split()
+
+
+TOKENIZERS = {"split": split_tokens, "korean": korean_tokens}
+
+
+def _byte_ranges(filename: str, workers: int) -> list[tuple[int, int]]:
+    size = os.path.getsize(filename)
+    parts = max(1, min(workers * 4, size // MIN_CHUNK_BYTES))
+    bounds = [size * i // parts for i in range(parts + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+def _iter_chunk_lines(filename: str, start: int, end: int):
+    """[start, end) 안에서 시작하는 줄을 반환합니다."""
+    with open(filename, "rb") as f:
+        if start > 0:
+            # 앞 구간에 속한 줄(start 직전 바이트를 포함한 줄)은 건너뜀
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            yield line
+
+
+def _count_csv_chunk(task) -> Counter:
+    filename, start, end, encoding, tokenizer = task
+    tokenize = TOKENIZERS[tokenizer]
+    counts = Counter()
+    lines = (line.decode(encoding) for line in _iter_chunk_lines(filename, start, end))
+    for row in csv.reader(lines):
+        for cell in row:
+            counts.update(tokenize(cell))
+    return counts
 
-def analyze_words(filename="짬처리.csv"):
+
+def _count_titles(titles, tokenizer: str) -> Counter:
+    # 제목 하나에 여러 번 나와도 한 번으로 셈 (몇 개의 핫딜에 등장했는지)
+    tokenize = TOKENIZERS[tokenizer]
+    counts = Counter()
+    for title in titles:
+        counts.update(set(tokenize(title)))
+    return counts
+
+
+def _count_ndjson_chunk(task) -> Counter:
+    filename, start, end, tokenizer = task
+    titles = []
+    for line in _iter_chunk_lines(filename, start, end):
+        if not line.strip():
+            continue
+        try:
+            titles.append(json.loads(line).get("title") or "")
+        except json.JSONDecodeError:
+            print(f"경고: {filename}의 {start} 이후 구간에서 읽지 못한 줄을 건너뜁니다.")
+    return _count_titles(titles, tokenizer)
+
+
+def _count_title_batch(task) -> Counter:
+    titles, tokenizer = task
+    return _count_titles(titles, tokenizer)
+
+
+def _merge_counts(worker, tasks, workers: int) -> Counter:
+    """
+    작업을 프로세스 풀에서 실행하고 부분 Counter를 합칩니다.
+
+    작업 수만큼만 프로세스를 띄우며, 작업이 하나뿐이면 (작은 파일) 풀 없이 이 프로세스에서 실행합니다.
+    tasks는 길이를 모르는 generator여도 되므로 앞의 workers개만 미리 꺼내 작업 수를 확인합니다.
+    """
+    tasks = iter(tasks)
+    head = list(itertools.islice(tasks, workers))
+    workers = min(workers, len(head))
+    tasks = itertools.chain(head, tasks)
+    total = Counter()
+    if workers <= 1:
+        for task in tasks:
+            total.update(worker(task))
+        return total
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for partial in executor.map(worker, tasks):
+            total.update(partial)
+    return total
+
+
+def analyze_words(filename=DEFAULT_CSV, workers=None, tokenizer="split", encoding=CSV_ENCODING):
     """
     CSV 파일에서 모든 단어의 빈도를 분석합니다.
 
     Args:
-        filename (str): 분석할 CSV 파일 이름 (기본값: "cleaned.csv").
+        filename (str): 분석할 CSV 파일 이름 (기본값: "짬처리.csv").
+        workers (int | None): 프로세스 수 (기본값: CPU 수).
+        tokenizer (str): "split"(공백 기준) 또는 "korean"(한글/영문 경계 분리).
 
     Returns:
         Counter: 단어별 빈도를 담은 Counter 객체.
                  오류 발생 시 None을 반환합니다.
     """
-    word_counts = Counter()
+    workers = workers or os.cpu_count() or 1
     try:
-        with open(filename, 'r', encoding='cp949') as csvfile:
-            reader = csv.reader(csvfile)
-            for row in reader:
-                for cell in row:
-                    words = cell.lower().split()
-                    word_counts.update(words)
-        return word_counts
+        tasks = [(filename, start, end, encoding, tokenizer) for start, end in _byte_ranges(filename, workers)]
+        return _merge_counts(_count_csv_chunk, tasks, workers)
     except FileNotFoundError:
         print(f"오류: '{filename}' 파일을 찾을 수 없습니다.")
         return None
@@ -28,50 +149,147 @@ def analyze_words(filename="짬처리.csv"):
         print(f"오류 발생: {e}")
         return None
 
-def find_frequent_words_count(filename="짬처리.csv", min_count=3):
+
+def analyze_deal_titles(path, workers=None, tokenizer="korean"):
+    """
+    핫딜 데이터 파일(NDJSON 또는 JSON 배열)의 제목에서 단어별로 등장한 핫딜 수를 셉니다.
+
+    NDJSON은 바이트 구간으로 나누어 작업 프로세스가 직접 읽고, JSON 배열은 이 프로세스가
+    스트리밍으로 읽으면서 제목 묶음을 작업 프로세스로 보냅니다.
+
+    Returns:
+        Counter: 단어별 등장 핫딜 수. 오류 발생 시 None을 반환합니다.
+    """
+    from ndjson import read_path
+
+    workers = workers or os.cpu_count() or 1
+    try:
+        with open(path, "rb") as f:
+            is_array = f.read(MIN_CHUNK_BYTES).lstrip(b"\xef\xbb\xbf \t\r\n").startswith(b"[")
+        if not is_array:
+            tasks = [(path, start, end, tokenizer) for start, end in _byte_ranges(path, workers)]
+            return _merge_counts(_count_ndjson_chunk, tasks, workers)
+
+        def batches():
+            titles = []
+            for item in read_path(path):
+                titles.append(item.get("title") or "")
+                if len(titles) >= TITLE_BATCH:
+                    yield titles, tokenizer
+                    titles = []
+            if titles:
+                yield titles, tokenizer
+        return _merge_counts(_count_title_batch, batches(), workers)
+    except FileNotFoundError:
+        print(f"오류: '{path}' 파일을 찾을 수 없습니다.")
+        return None
+    except Exception as e:
+        print(f"오류 발생: {e}")
+        return None
+
+
+def top_words(word_counts, k, min_count=1):
+    """빈도 상위 k개 (단어, 빈도) 목록. 전체를 정렬하지 않고 heap으로 구합니다."""
+    candidates = ((word, count) for word, count in word_counts.items() if count >= min_count)
+    return heapq.nlargest(k, candidates, key=itemgetter(1))
+
+
+def suggest_keywords(title_counts, k=50, exclude=frozenset(), min_count=5):
+    """
+    스캔 키워드 후보를 추천합니다.
+
+    한 글자 단어, 숫자만 있는 단어(가격, 용량 등), 이미 구독 중인 키워드는 제외합니다.
+    """
+    candidates = Counter({
+        word: count for word, count in title_counts.items()
+        if len(word) > 1 and not word.isdigit() and word not in exclude
+    })
+    return top_words(candidates, k, min_count)
+
+
+def find_frequent_words_count(filename=DEFAULT_CSV, min_count=3, word_counts=None):
     """
     CSV 파일에서 특정 횟수 이상 등장하는 단어들의 총 개수를 반환합니다.
 
     Args:
-        filename (str): 분석할 CSV 파일 이름 (기본값: "cleaned.csv").
-        min_count (int): 최소 등장 횟수 (기본값: 5).
+        filename (str): 분석할 CSV 파일 이름 (기본값: "짬처리.csv").
+        min_count (int): 최소 등장 횟수 (기본값: 3).
+        word_counts (Counter | None): 이미 분석한 결과. 주어지면 파일을 다시 분석하지 않습니다.
 
     Returns:
         int: 최소 등장 횟수 이상 나타난 단어들의 총 개수.
              파일을 찾을 수 없거나 오류 발생 시 0을 반환합니다.
     """
-    word_counts = analyze_words(filename)
+    if word_counts is None:
+        word_counts = analyze_words(filename)
     if word_counts is None:
         return 0
 
     frequent_word_count = sum(1 for count in word_counts.values() if count >= min_count)
     return frequent_word_count
 
-def find_frequent_word_list(filename="짬처리.csv", min_count=5):
+
+def find_frequent_word_list(filename=DEFAULT_CSV, min_count=5, word_counts=None):
     """
     CSV 파일에서 특정 횟수 이상 등장하는 단어들의 리스트를 반환합니다.
 
     Args:
-        filename (str): 분석할 CSV 파일 이름 (기본값: "cleaned.csv").
+        filename (str): 분석할 CSV 파일 이름 (기본값: "짬처리.csv").
         min_count (int): 최소 등장 횟수 (기본값: 5).
+        word_counts (Counter | None): 이미 분석한 결과. 주어지면 파일을 다시 분석하지 않습니다.
 
     Returns:
         list: 최소 등장 횟수 이상 나타난 단어들의 리스트.
               파일을 찾을 수 없거나 오류 발생 시 빈 리스트를 반환합니다.
     """
-    word_counts = analyze_words(filename)
+    if word_counts is None:
+        word_counts = analyze_words(filename)
     if word_counts is None:
         return []
 
     frequent_words = [word for word, count in word_counts.items() if count >= min_count]
     return frequent_words
 
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("filename", nargs="?", default=DEFAULT_CSV)
+    parser.add_argument("--deals", action="store_true", help="filename을 핫딜 데이터로 보고 키워드 후보를 추천")
+    parser.add_argument("--min-count", type=int, default=5)
+    parser.add_argument("--top", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--tokenizer", choices=sorted(TOKENIZERS), help="기본값: CSV는 split, 핫딜 데이터는 korean")
+    parser.add_argument("--exclude-subscribed", metavar="DB", help="이 구독 DB의 키워드는 추천에서 제외")
+    args = parser.parse_args()
+
+    if args.deals:
+        title_counts = analyze_deal_titles(args.filename, args.workers, args.tokenizer or "korean")
+        if title_counts is None:
+            return
+        exclude = frozenset()
+        if args.exclude_subscribed:
+            from subscriptions import SubscriptionStore
+            store = SubscriptionStore(args.exclude_subscribed)
+            exclude = store.keywords()
+            store.close()
+        print(f"'{args.filename}' 스캔 키워드 추천 (등장 핫딜 수 {args.min_count}개 이상, 상위 {args.top}개):")
+        for word, count in suggest_keywords(title_counts, args.top, exclude, args.min_count):
+            print(f"- {word}: {count}")
+        return
+
+    # 한 번만 분석하고 같은 결과에서 개수와 목록을 구함
+    word_counts = analyze_words(args.filename, args.workers, args.tokenizer or "split")
+    if word_counts is None:
+        return
+    frequent_count = find_frequent_words_count(min_count=args.min_count, word_counts=word_counts)
+    frequent_word_list = find_frequent_word_list(min_count=args.min_count, word_counts=word_counts)
+
+    print(f"'{args.filename}' 파일 분석 결과:")
+    print(f"- {args.min_count}번 이상 등장하는 단어 개수: {frequent_count}개")
+    print(f"- {args.min_count}번 이상 등장하는 단어 목록:")
+    print(frequent_word_list)
+    print(f"- 상위 {args.top}개: {top_words(word_counts, args.top, args.min_count)}")
+
+
 if __name__ == "__main__":
-    frequent_count = find_frequent_words_count()
-    frequent_word_list = find_frequent_word_list()
-
-    if frequent_word_list is not None:
-        print(f"'cleaned.csv' 파일 분석 결과:")
-        print(f"- {5}번 이상 등장하는 단어 개수: {frequent_count}개")
-        print(f"- {5}번 이상 등장하는 단어 목록:")
-        print(frequent_word_list)
\ No newline at end of file
+    main()
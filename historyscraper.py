@@ -1,100 +1,341 @@
-from playwright.sync_api import sync_playwright
-import time
+"""
+알구몬 과거 데이터 수집(backfill).
+
+수집 범위를 여러 shard(페이지 구간)로 나누어 여러 프로세스가 각자 브라우저를 띄워 동시에 수집합니다.
+shard가 끝날 때마다 결과를 checkpoint 디렉터리에 저장하므로, 중간에 멈춘 뒤 다시 실행하면
+완료된 shard는 건너뛰고 나머지만 수집합니다. 수집 중인 shard도 읽은 페이지/스크롤 횟수를 재개 지점으로
+남기므로 다시 실행하면 그 다음부터 이어서 수집합니다. 모든 shard가 끝나면 (title, link) 기준으로 중복을
+제거하고 오래된 항목부터 no를 부여해 하나의 파일로 합칩니다. (외부 정렬로 합치므로 메모리보다 커도 됨)
+
+페이지 단위 주소(httpscraper.PAGE_URL_TEMPLATE)가 설정되지 않았으면 무한 스크롤을 따라가야 하므로
+shard 하나(브라우저 하나)로 수집합니다. 이때 --workers를 2 이상으로 주면 병렬로 수집할 수 없으므로 실행을 멈춥니다.
+
+--into를 주면 합친 결과를 세그먼트 저장소(봇/DAG가 읽는 데이터)의 기존 항목 앞에 넣고 no를 1부터 다시
+부여합니다. 저장소를 통째로 다시 쓰므로 DAG를 멈춘 상태에서 실행하세요. 이미 수집이 끝난 checkpoint로
+다시 실행하면 수집 없이 병합과 적재만 합니다.
+
+    python historyscraper.py --pages 300 --workers 4                      # PAGE_URL_TEMPLATE 설정 시
+    python historyscraper.py --max-scrolls 77 --workers 1                 # 무한 스크롤
+    python historyscraper.py --max-scrolls 77 --into gs://moastorage/data/
+"""
+import argparse
 import json
-import random
-from datetime import datetime, timedelta
-import re
-
-def parse_timestamp(timestamp_str):
-    """주어진 타임스탬프 문자열을 파싱하여 datetime 객체를 반환합니다."""
-    now = datetime.now()
-    timestamp_str = timestamp_str.replace(" ", "")  # 공백 제거
-    if "방금" in timestamp_str:
-        return now
-    elif "분전" in timestamp_str:
-        minutes = int(re.search(r'(\d+)분전', timestamp_str).group(1))
-        return now - timedelta(minutes=minutes)
-    elif "시간전" in timestamp_str:
-        hours = int(re.search(r'(\d+)시간전', timestamp_str).group(1))
-        return now - timedelta(hours=hours)
-    elif "일전" in timestamp_str:
-        days = int(re.search(r'(\d+)일전', timestamp_str).group(1))
-        return now - timedelta(days=days)
-    elif "주전" in timestamp_str:
-        weeks = int(re.search(r'(\d+)주전', timestamp_str).group(1))
-        return now - timedelta(weeks=weeks)
-    elif "개월전" in timestamp_str:
-        months = int(re.search(r'(\d+)개월전', timestamp_str).group(1))
-        # 정확한 월 계산은 복잡하므로 대략적인 일수로 계산 (30일/월)
-        return now - timedelta(days=months * 30)
-    else:
-        return None
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from urllib.parse import urljoin
 
-def scrape_data_playwright_optimized(**kwargs):
-    batch_size = 10000  # 한 번에 처리하고 저장할 데이터 개수
-    data_batch = []
-    base_url = 'https://www.algumon.com'
-    now = datetime.now() # 현재 시간 확보
+from playwright.sync_api import sync_playwright
 
+from convert import CHUNK_RECORDS, external_sort
+from dealfields import playwright_extract_rows, playwright_row_count, playwright_wait_for_rows
+from clusters import ClusterState, ClusterStore, item_minute
+from dedupe import deal_key
+from httpscraper import BASE_URL, PAGE_URL_TEMPLATE
+from ndjson import PART_SUFFIX, NDJSONWriter, output_paths, read_path, read_paths
+from normalize import normalize_rows
+from segments import GCSBackend, LocalBackend, Manifest, SegmentStore
+
+ROW_WAIT_TIMEOUT = 30 # 스크롤 후 새 행을 기다리는 최대 시간(초)
+MAX_SCROLLS = 77
+PAGES_PER_SHARD = 10
+DEFAULT_WORKERS = 4
+CHECKPOINT_DIR = "backfill"
+OUTPUT_PATH = "history.ndjson"
+PLAN_NAME = "plan.json"
+RESUME_SUFFIX = ".resume.json"
+
+def page_url(page_number):
+    if page_number == 1:
+        return BASE_URL
+    return urljoin(BASE_URL, PAGE_URL_TEMPLATE.format(page=page_number))
+
+def scrape_pages(first_page, last_page, writer, checkpoint):
+    """페이지 주소로 first_page ~ last_page를 차례로 읽습니다. 빈 페이지(기록의 끝)를 만나면 멈춥니다."""
+    resume = checkpoint.load()
+    start_page = max(first_page, resume.get("page", first_page - 1) + 1)
+    if start_page > first_page:
+        print(f"{start_page - 1} 페이지까지 수집된 shard를 {start_page} 페이지부터 이어서 수집합니다.")
     with sync_playwright() as p:
         browser = p.firefox.launch(headless=True)
-        page = browser.new_page()
-        page.goto(base_url)
-
-        titleselector = "xpath=/html/body/div[6]/div[2]/ul/li/div[1]/div[2]/div/p[2]/span/a"
-        priceselector = "xpath=/html/body/div[6]/div[2]/ul/li/div[1]/div[2]/p[1]"
-        linkselector = "xpath=/html/body/div[6]/div[2]/ul/li/div[1]/div[2]/div/p[2]/span/a"
-        timestampselector = "xpath=/html/body/div[6]/div[2]/ul/li/div[1]/div[2]/p[2]/small"
-        last_count = 0
-        scroll_count = 0
-        max_scrolls = 77
+        try:
+            page = browser.new_page()
+            for page_number in range(start_page, last_page + 1):
+                page.goto(page_url(page_number))
+                if not playwright_wait_for_rows(page, 0, ROW_WAIT_TIMEOUT):
+                    print(f"{page_number} 페이지에 항목이 없어 이 구간의 수집을 멈춥니다.")
+                    break
+                _, rows = playwright_extract_rows(page)
+                writer.write_all(checkpoint.new_rows(normalize_rows(rows)))
+                checkpoint.save(writer, page=page_number)
+        finally:
+            browser.close()
 
+def scrape_scroll(max_scrolls, writer, checkpoint):
+    """첫 페이지에서 무한 스크롤을 따라가며 읽습니다. (페이지 주소를 모를 때)"""
+    resume = checkpoint.load()
+    with sync_playwright() as p:
+        browser = p.firefox.launch(headless=True)
         try:
-            while scroll_count < max_scrolls:
-                time.sleep(random.uniform(7, 10))
-
-                current_titles = page.locator(titleselector).all()
-                current_prices = page.locator(priceselector).all()
-                current_links = page.locator(linkselector).all()
-                current_timestamps = page.locator(timestampselector).all()
-
-                for i in range(last_count, len(current_titles)):
-                    relative_link = current_links[i].get_attribute("href")
-                    full_link = base_url + relative_link
-                    timestamp_text = current_timestamps[i].inner_text()
-                    parsed_datetime = parse_timestamp(timestamp_text)
-
-                    if parsed_datetime:
-                        formatted_timestamp = parsed_datetime.strftime("%Y/%m/%d-%H:%M")
-                    else:
-                        formatted_timestamp = timestamp_text  # 파싱 실패 시 원래 텍스트 유지
-
-                    product_info = {
-                        'no': i + 1,
-                        'title': current_titles[i].inner_text(),
-                        'price': current_prices[i].inner_text(),
-                        'link': full_link,
-                        'timestamp': formatted_timestamp
-                    }
-                    data_batch.append(product_info)
-
-                    if len(data_batch) >= batch_size:
-                        with open("history2.json", "a", encoding="utf-8") as f:
-                            json.dump(data_batch, f, indent=4, ensure_ascii=False)
-                            f.write('\n')
-                        data_batch = []
-
-                last_count = len(current_titles)
+            page = browser.new_page()
+            page.goto(BASE_URL)
+
+            last_count = 0
+            scroll_count = 0
+            # 재개: 이전 실행에서 읽은 깊이까지는 행을 읽지 않고 스크롤만 함.
+            # 그동안 새 글이 올라와 행 위치가 밀리므로, 이후 처음 읽을 때는 처음부터 읽고 이미 쓴 항목만 건너뜀
+            resume_scrolls = min(resume.get("scrolls", 0), max_scrolls)
+            if resume_scrolls:
+                print(f"{resume_scrolls}회 스크롤까지 수집된 shard를 이어서 수집합니다.")
+            while scroll_count < resume_scrolls:
+                if not playwright_wait_for_rows(page, last_count, ROW_WAIT_TIMEOUT):
+                    break
+                last_count = playwright_row_count(page)
                 page.evaluate("window.scrollTo(0, document.body.scrollHeight);")
                 scroll_count += 1
+            last_count = 0
+
+            while scroll_count < max_scrolls:
+                # 고정 시간(7~10초) 대기 대신 새 행이 나타날 때까지만 기다림
+                if not playwright_wait_for_rows(page, last_count, ROW_WAIT_TIMEOUT):
+                    print(f"{ROW_WAIT_TIMEOUT}초 동안 새 항목이 나타나지 않아 스크롤을 멈춥니다. ({scroll_count}회 스크롤)")
+                    break
 
-            # 마지막 남은 데이터 배치 처리
-            if data_batch:
-                with open("add.json", "a", encoding="utf-8") as f:
-                    json.dump(data_batch, f, indent=4, ensure_ascii=False)
-                    f.write('\n')
+                # 새로 나타난 행만 페이지 안에서 한 번에 읽음 (링크는 절대 URL로 변환되어 반환됨)
+                row_count, rows = playwright_extract_rows(page, last_count)
+                writer.write_all(checkpoint.new_rows(normalize_rows(rows)))
 
+                last_count = row_count
+                page.evaluate("window.scrollTo(0, document.body.scrollHeight);")
+                scroll_count += 1
+                checkpoint.save(writer, scrolls=scroll_count)
         finally:
             browser.close()
 
-scrape_data_playwright_optimized()
\ No newline at end of file
+def shard_path(checkpoint_dir, shard):
+    return os.path.join(checkpoint_dir, f"shard-{shard['index']:04d}.ndjson")
+
+class ShardCheckpoint:
+    """
+    수집 중인 shard의 재개 지점.
+
+    `<shard>.resume.json`에 마지막으로 기록한 페이지 번호(page) 또는 스크롤 횟수(scrolls)를 남기고,
+    이미 .part 파일에 기록된 항목의 키를 기억해 다시 읽은 항목은 쓰지 않습니다.
+    재개 지점은 .part 파일을 디스크에 기록한 뒤에 저장하므로 실제 기록보다 앞서지 않습니다.
+    """
+
+    def __init__(self, path):
+        self.path = path + RESUME_SUFFIX
+        self.part_path = path + PART_SUFFIX
+        self.seen = set()
+
+    def load(self):
+        """재개 지점을 읽고 .part 파일에 이미 기록된 항목의 키를 모읍니다. 처음 수집하면 빈 dict."""
+        if not os.path.exists(self.part_path):
+            return {}
+        for record in read_path(self.part_path):
+            self.seen.add(deal_key(record['title'], record['link']))
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def new_rows(self, rows):
+        """아직 기록하지 않은 항목만 반환합니다."""
+        for row in rows:
+            key = deal_key(row['title'], row['link'])
+            if key not in self.seen:
+                self.seen.add(key)
+                yield row
+
+    def save(self, writer, **position):
+        writer.flush()
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(position, f)
+        os.replace(tmp_path, self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def make_plan(pages, pages_per_shard, max_scrolls):
+    """수집 범위를 shard로 나눕니다. shard 순서는 최신 -> 과거 순입니다."""
+    if not PAGE_URL_TEMPLATE:
+        return {"mode": "scroll", "max_scrolls": max_scrolls,
+                "shards": [{"index": 0, "first_page": 1, "last_page": 1}]}
+    shards = []
+    for index, first_page in enumerate(range(1, pages + 1, pages_per_shard)):
+        shards.append({"index": index, "first_page": first_page,
+                       "last_page": min(first_page + pages_per_shard - 1, pages)})
+    return {"mode": "pages", "page_url_template": PAGE_URL_TEMPLATE, "pages": pages, "shards": shards}
+
+def load_or_create_plan(checkpoint_dir, plan):
+    """이전 실행의 계획이 있으면 같은 계획인지 확인합니다. (다른 범위의 shard가 섞이지 않도록)"""
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    plan_path = os.path.join(checkpoint_dir, PLAN_NAME)
+    if os.path.exists(plan_path):
+        with open(plan_path, encoding="utf-8") as f:
+            saved_plan = json.load(f)
+        if saved_plan != plan:
+            raise SystemExit(f"{plan_path}의 수집 계획이 현재 옵션과 다릅니다. "
+                             f"같은 옵션으로 다시 실행하거나 다른 --checkpoint-dir을 지정하세요.")
+        return saved_plan
+    with open(plan_path, "w", encoding="utf-8") as f:
+        json.dump(plan, f, ensure_ascii=False, indent=4)
+    return plan
+
+def run_shard(plan, shard, checkpoint_dir):
+    """
+    shard 하나를 수집해 checkpoint로 저장합니다. (작업 프로세스에서 실행)
+
+    수집하는 동안에는 .part 파일에 기록하고, 끝나면 shard 파일로 교체하므로
+    shard 파일이 있으면 완료된 것입니다. 이전 실행이 남긴 .part 파일이 있으면 재개 지점부터 이어서 씁니다.
+    """
+    path = shard_path(checkpoint_dir, shard)
+    checkpoint = ShardCheckpoint(path)
+    with NDJSONWriter(path, append=True) as writer:
+        if plan["mode"] == "scroll":
+            scrape_scroll(plan["max_scrolls"], writer, checkpoint)
+        else:
+            scrape_pages(shard["first_page"], shard["last_page"], writer, checkpoint)
+    checkpoint.remove()
+    return len(checkpoint.seen)
+
+def merge_shards(plan, checkpoint_dir, output_path, rotate_records=None, chunk_records=CHUNK_RECORDS):
+    """
+    완료된 shard를 하나로 합칩니다.
+
+    같은 (title, link)는 가장 최근에 수집된 것 하나만 남기고, 오래된 항목부터 no를 1부터 부여합니다.
+    항목은 메모리에 모으지 않습니다. 중복이 아닌 항목을 수집 순서(최신 -> 과거)를 no로 임시 파일에 쓴 뒤
+    convert.external_sort로 뒤집어 읽으므로, 메모리에는 중복 확인용 키와 정렬 run 하나만 올라갑니다.
+    """
+    seen = set()
+    with tempfile.TemporaryDirectory(prefix="merge-", dir=checkpoint_dir) as directory:
+        unique_path = os.path.join(directory, "unique.ndjson")
+        with NDJSONWriter(unique_path) as unique:
+            for shard in plan["shards"]:
+                for record in read_path(shard_path(checkpoint_dir, shard)):
+                    key = deal_key(record['title'], record['link'])
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    record['no'] = unique.count
+                    unique.write(record)
+        seen.clear()
+
+        oldest_first, _ = external_sort([unique_path], directory, descending=True, chunk_records=chunk_records)
+        with NDJSONWriter(output_path, rotate_records=rotate_records) as writer:
+            for i, record in enumerate(oldest_first):
+                record['no'] = i + 1
+                writer.write(record)
+    return writer.count
+
+def make_store_backend(target):
+    """gs://버킷/prefix/ 이면 GCS, 아니면 로컬 디렉터리를 세그먼트 저장소 백엔드로 사용합니다."""
+    if target.startswith("gs://"):
+        bucket_name, _, prefix = target[len("gs://"):].partition("/")
+        return GCSBackend(bucket_name, prefix)
+    return LocalBackend(target)
+
+def recluster(store, manifest):
+    """모든 항목을 새 epoch로 다시 클러스터링합니다. (DAG처럼 세그먼트마다 기간이 지난 클러스터를 정리)"""
+    state = ClusterState()
+    for segment in manifest.segments:
+        latest_minute = None
+        for item in store.iter_segment(segment["name"]):
+            minute = item_minute(item)
+            state.assign(item["no"], item.get("title"), minute)
+            if minute is not None and (latest_minute is None or minute > latest_minute):
+                latest_minute = minute
+        if latest_minute is not None:
+            state.prune(latest_minute)
+    ClusterStore(store.backend).save(state)
+    return state
+
+def import_into_store(paths, backend):
+    """
+    backfill 결과(오래된 항목부터)를 세그먼트 저장소의 기존 항목 앞에 넣고 no를 1부터 다시 부여합니다.
+
+    이미 저장소에 있는 (title, link)는 넣지 않습니다. 새 세그먼트를 모두 쓴 뒤 manifest를 한 번만 교체하므로
+    도중에 실패하면 저장소는 이전 상태 그대로입니다. 번호가 바뀌므로 클러스터는 새 epoch로 다시 만들고,
+    DAG의 중복 키 색인은 항목 수가 달라져 다음 실행에서 다시 만들어집니다.
+
+    Returns:
+        tuple[Manifest, int]: (새 manifest, 추가한 과거 항목 수)
+    """
+    store = SegmentStore(backend)
+    manifest = store.load_manifest()
+    existing_keys = {deal_key(item.get('title'), item.get('link')) for item in store.iter_items(manifest)}
+    added = 0
+
+    def merged_items():
+        nonlocal added
+        for record in read_paths(paths):
+            if deal_key(record.get('title'), record.get('link')) not in existing_keys:
+                added += 1
+                yield record
+        existing_keys.clear()
+        yield from store.iter_items(manifest)
+
+    updated = store.append_stream(merged_items(), Manifest())
+    recluster(store, updated)
+    return updated, added
+
+def backfill(pages, workers=None, checkpoint_dir=CHECKPOINT_DIR, output_path=OUTPUT_PATH,
+             pages_per_shard=PAGES_PER_SHARD, max_scrolls=MAX_SCROLLS, rotate_records=None, into=None):
+    plan = make_plan(pages, pages_per_shard, max_scrolls)
+    if plan["mode"] == "scroll":
+        if workers is not None and workers > 1:
+            raise SystemExit("httpscraper.PAGE_URL_TEMPLATE이 설정되지 않아 무한 스크롤 shard 하나로만 수집합니다. "
+                             "--workers 1로 실행하거나 페이지 주소를 설정하세요.")
+        workers = 1
+    elif workers is None:
+        workers = DEFAULT_WORKERS
+    plan = load_or_create_plan(checkpoint_dir, plan)
+    pending = [shard for shard in plan["shards"] if not os.path.exists(shard_path(checkpoint_dir, shard))]
+    print(f"shard {len(plan['shards'])}개 중 {len(plan['shards']) - len(pending)}개 완료, "
+          f"{len(pending)}개를 {workers}개 프로세스로 수집합니다.")
+
+    failed = 0
+    if pending:
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as executor:
+            futures = {executor.submit(run_shard, plan, shard, checkpoint_dir): shard for shard in pending}
+            for future in as_completed(futures):
+                shard = futures[future]
+                try:
+                    count = future.result()
+                    print(f"shard {shard['index']} 완료: {count}개 항목")
+                except Exception as e:
+                    failed += 1
+                    print(f"shard {shard['index']} 수집 실패: {e}")
+
+    if failed:
+        print(f"shard {failed}개가 실패했습니다. 다시 실행하면 실패한 shard만 수집합니다.")
+        return None
+    count = merge_shards(plan, checkpoint_dir, output_path, rotate_records)
+    print(f"{count}개 항목을 {', '.join(output_paths(output_path))}에 저장했습니다.")
+    if into is not None:
+        manifest, added = import_into_store(output_paths(output_path), make_store_backend(into))
+        print(f"과거 항목 {added}개를 {into}에 넣었습니다. (전체 {manifest.max_no}개, 세그먼트 {len(manifest.segments)}개)")
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=MAX_SCROLLS, help="수집할 페이지 수 (페이지 주소 사용 시)")
+    parser.add_argument("--pages-per-shard", type=int, default=PAGES_PER_SHARD)
+    parser.add_argument("--max-scrolls", type=int, default=MAX_SCROLLS, help="최대 스크롤 횟수 (무한 스크롤 사용 시)")
+    parser.add_argument("--workers", type=int,
+                        help=f"수집 프로세스 수 (기본: 페이지 주소 사용 시 {DEFAULT_WORKERS}, 무한 스크롤은 1)")
+    parser.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR)
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    parser.add_argument("--rotate-records", type=int, help="주어지면 이 개수마다 출력 파일을 나눔")
+    parser.add_argument("--into", metavar="STORE",
+                        help="합친 결과를 넣을 세그먼트 저장소 (gs://버킷/prefix/ 또는 로컬 디렉터리)")
+    args = parser.parse_args()
+    backfill(args.pages, args.workers, args.checkpoint_dir, args.output, args.pages_per_shard, args.max_scrolls,
+             args.rotate_records, args.into)
+
+if __name__ == "__main__":
+    main()
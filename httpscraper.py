@@ -0,0 +1,208 @@
+"""
+브라우저 없이 알구몬 목록을 읽는 HTTP 스크래퍼.
+
+목록은 서버에서 렌더링되므로 headless Chrome을 띄우지 않고 HTML을 받아 lxml로 파싱합니다.
+필드 정의는 dealfields.FIELDS를 그대로 사용하므로 Selenium 경로와 같은 행을 같은 값으로 읽습니다.
+파싱 결과가 비정상(행이 없거나 필수 필드가 비어 있음)이면 ListParseError를 발생시키고,
+호출하는 쪽(DAG)은 브라우저 경로로 대체합니다.
+
+HTML 문자열만 있으면 parse_list_page()를 호출할 수 있으므로 네트워크 없이 저장된 HTML로 확인할 수 있습니다.
+"""
+import re
+from urllib.parse import urljoin
+
+from dealfields import FIELDS, LIST_ITEM_XPATH
+
+BASE_URL = 'https://www.algumon.com'
+# 다음 페이지 목록 주소. 무한 스크롤이 사용하는 주소를 알면 "{page}"를 포함한 형식으로 지정합니다.
+# None이면 첫 페이지만 읽고, 나머지는 브라우저 경로가 처리합니다.
+PAGE_URL_TEMPLATE = None
+REQUEST_TIMEOUT = 10
+POOL_SIZE = 4
+USER_AGENT = ("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/124.0 Safari/537.36")
+
+
+class ListParseError(Exception):
+    """목록 HTML에서 상품 행을 읽지 못한 경우."""
+
+
+# innerText에 나타나지 않는 요소 (렌더링되지 않음)
+_SKIPPED_TAGS = frozenset(("script", "style", "noscript", "template", "iframe", "head"))
+# 기본 스타일이 block인 요소. 앞뒤에 줄바꿈이 필요하며 p는 두 줄을 띄움
+_BLOCK_TAGS = frozenset((
+    "address", "article", "aside", "blockquote", "center", "dd", "details", "dialog", "dir", "div", "dl", "dt",
+    "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hgroup",
+    "hr", "legend", "li", "main", "menu", "nav", "ol", "p", "pre", "section", "summary", "table", "tr", "ul",
+))
+_TABLE_CELL_TAGS = frozenset(("td", "th"))
+# CSS에서 합쳐지는 공백 (&nbsp;는 합쳐지지 않음)
+_COLLAPSIBLE_SPACE = re.compile(r"[ \t\n\r\f]+")
+# JavaScript String.prototype.trim()이 지우는 공백
+_JS_WHITESPACE = " \t\n\v\f\r\xa0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a" \
+                 "\u2028\u2029\u202f\u205f\u3000\ufeff"
+
+
+def _is_hidden(element) -> bool:
+    """hidden 속성이나 inline style로 숨긴 요소. (스타일시트의 클래스는 해석하지 않음)"""
+    if element.get("hidden") is not None:
+        return True
+    style = element.get("style")
+    if not style:
+        return False
+    declarations = style.replace(" ", "").lower()
+    return "display:none" in declarations or "visibility:hidden" in declarations
+
+
+def _inner_text(element) -> str:
+    """
+    브라우저의 element.innerText.trim()과 같은 텍스트를 만듭니다. (Selenium 경로와 같은 값)
+
+    text_content()는 숨겨진 요소와 script/style 내용까지 포함하고 <br>을 지우므로,
+    innerText 규칙대로 렌더링되지 않는 요소는 건너뛰고 <br>은 줄바꿈으로, block 요소 경계는
+    줄바꿈으로 바꾸며, 한 줄 안의 연속된 공백은 하나로 합치고 줄 앞뒤의 공백은 지웁니다.
+    """
+    parts = []  # 문자열 또는 필요한 줄바꿈 수(int)
+    line = []  # 현재 줄의 inline 텍스트 조각
+
+    def end_line():
+        text = _COLLAPSIBLE_SPACE.sub(" ", "".join(line)).strip(" ")
+        line.clear()
+        if text:
+            parts.append(text)
+
+    def visit_children(node):
+        if node.text:
+            line.append(node.text)
+        for child in node:
+            # 주석 등은 tag가 문자열이 아님 (뒤따르는 텍스트는 포함)
+            if isinstance(child.tag, str):
+                visit(child)
+            if child.tail:
+                line.append(child.tail)
+
+    def visit(node):
+        tag = node.tag.lower()
+        if tag in _SKIPPED_TAGS or _is_hidden(node):
+            return
+        if tag == "br":
+            end_line()
+            parts.append("\n")
+            return
+        breaks = 2 if tag == "p" else 1 if tag in _BLOCK_TAGS else 0
+        if breaks:
+            end_line()
+            parts.append(breaks)
+        visit_children(node)
+        if breaks:
+            end_line()
+            parts.append(breaks)
+        elif tag in _TABLE_CELL_TAGS and node.getnext() is not None and node.getnext().tag in _TABLE_CELL_TAGS:
+            end_line()
+            parts.append("\t")
+
+    visit_children(element)
+    end_line()
+
+    # 앞뒤의 줄바꿈은 버리고, 연속된 줄바꿈은 가장 큰 수 하나로 합침
+    result = []
+    pending = 0
+    for part in parts:
+        if isinstance(part, int):
+            pending = max(pending, part)
+            continue
+        if result and pending:
+            result.append("\n" * pending)
+        pending = 0
+        result.append(part)
+    return "".join(result).strip(_JS_WHITESPACE)
+
+
+def _resolve_href(href: str | None, base_url: str) -> str:
+    """브라우저의 el.href처럼 앞뒤 공백을 지우고 절대 URL로 바꿉니다. href 속성이 없으면 빈 문자열."""
+    if href is None:
+        return ""
+    return urljoin(base_url, href.strip(" \t\n\r\f"))
+
+
+def parse_list_page(html: str | bytes, base_url: str = BASE_URL) -> list[dict]:
+    """
+    목록 페이지 HTML에서 상품 행을 읽습니다.
+
+    Args:
+        html (str | bytes): 페이지 HTML.
+        base_url (str): 상대 링크를 절대 URL로 바꿀 때 기준이 되는 주소.
+
+    Returns:
+        list[dict]: dealfields.selenium_extract_rows와 같은 형식의 행 목록 (제목 없는 행 제외).
+
+    Raises:
+        ListParseError: 목록을 찾지 못했거나 행의 링크가 비어 있는 경우.
+    """
+    import lxml.html
+
+    try:
+        document = lxml.html.document_fromstring(html)
+    except (ValueError, lxml.etree.ParserError) as e:
+        raise ListParseError(f"HTML을 파싱하지 못했습니다: {e}") from e
+
+    # 문서에 <base href>가 있으면 브라우저처럼 그 주소를 기준으로 링크를 변환
+    base = document.find(".//base[@href]")
+    if base is not None:
+        base_url = _resolve_href(base.get("href"), base_url)
+
+    rows = []
+    for row_element in document.xpath(LIST_ITEM_XPATH):
+        record = {}
+        for name, path, kind in FIELDS:
+            found = row_element.xpath(path)
+            if not found:
+                record[name] = None
+            elif kind == "href":
+                record[name] = _resolve_href(found[0].get("href"), base_url)
+            else:
+                record[name] = _inner_text(found[0])
+        if record.get("title"):
+            rows.append(record)
+
+    if not rows:
+        raise ListParseError("목록에서 상품 행을 찾지 못했습니다.")
+    if any(not row.get("link") for row in rows):
+        raise ListParseError("링크가 비어 있는 행이 있습니다.")
+    return rows
+
+
+def make_session():
+    """연결을 재사용하는 HTTP 세션을 만듭니다."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=2)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+def iter_list_pages(session, max_pages: int, base_url: str = BASE_URL):
+    """
+    첫 페이지부터 최대 max_pages개 페이지의 행 목록을 차례로 반환합니다.
+
+    Raises:
+        ListParseError: 페이지를 받지 못했거나 파싱하지 못한 경우.
+    """
+    import requests
+
+    urls = [base_url]
+    if PAGE_URL_TEMPLATE:
+        urls += [urljoin(base_url, PAGE_URL_TEMPLATE.format(page=page)) for page in range(2, max_pages + 1)]
+
+    for url in urls[:max_pages]:
+        try:
+            response = session.get(url, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise ListParseError(f"페이지를 받지 못했습니다 ({url}): {e}") from e
+        # 브라우저의 el.href처럼 실제로 받은 페이지 주소를 기준으로 링크를 변환
+        yield parse_list_page(response.content, response.url)
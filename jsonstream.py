@@ -0,0 +1,127 @@
+"""
+JSON 배열 스트리밍 디코더.
+
+hotdeal.json처럼 `[ {...}, {...}, ... ]` 형태의 큰 파일을 전부 메모리에 올리지 않고
+다운로드 스트림에서 항목을 하나씩 꺼냅니다. 항목 경계 탐색과 디코딩은 정규식과
+json 모듈(C 구현)이 처리하므로 문자 단위 파이썬 루프가 없습니다.
+"""
+import codecs
+import json
+import re
+
+CHUNK_SIZE = 1024 * 1024
+
+# 중첩 없는 JSON 객체 하나 (hotdeal 항목은 모두 평평한 객체)
+_FLAT_OBJECT = re.compile(r'\{(?:[^{}"]|"(?:[^"\\]|\\.)*")*\}', re.DOTALL)
+_NO_FIELD = re.compile(r'[{,]\s*"no"\s*:\s*(-?\d+)(?=\s*[,}])')
+_SEPARATOR = re.compile(r'[\s,]*')
+_WHITESPACE = re.compile(r'\s*')
+_DELIMITERS = frozenset(",] \t\r\n")
+_decoder = json.JSONDecoder()
+
+
+def _read_more(stream, decoder, chunk_size: int) -> str | None:
+    chunk = stream.read(chunk_size)
+    if not chunk:
+        return None
+    return decoder.decode(chunk)
+
+
+def iter_json_array(stream, skip_at_or_below: int | None = None, chunk_size: int = CHUNK_SIZE,
+                    skipped: list | None = None, concatenated: bool = False):
+    """
+    바이너리 스트림에 담긴 JSON 배열의 원소를 하나씩 반환합니다.
+
+    Args:
+        stream: read(n)을 지원하는 바이너리 파일 객체.
+        skip_at_or_below (int | None): "no" 값이 이 값 이하인 항목은 dict로 만들지 않고 건너뜁니다.
+        chunk_size (int): 한 번에 읽을 바이트 수.
+        skipped (list | None): 주어지면 건너뛴 항목 수를 skipped[0]에 누적합니다.
+        concatenated (bool): True이면 `[...]\n[...]`처럼 이어 붙인 여러 배열의 원소를 차례로 반환합니다.
+
+    Raises:
+        ValueError: 최상위 값이 배열이 아니거나 JSON 형식이 잘못된 경우.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        text = _read_more(stream, decoder, chunk_size)
+        if text is None:
+            eof = True
+            buffer = buffer[pos:] + decoder.decode(b"", final=True)
+        else:
+            buffer = buffer[pos:] + text
+        pos = 0
+
+    # 여는 대괄호 찾기 (BOM/공백 허용)
+    while True:
+        stripped = buffer.lstrip("﻿ \t\r\n")
+        if stripped or eof:
+            break
+        fill()
+    if not stripped.startswith("["):
+        raise ValueError("JSON 배열 형식이 아닙니다.")
+    buffer = stripped[1:]
+
+    while True:
+        pos = _SEPARATOR.match(buffer, pos).end()
+        if pos >= len(buffer):
+            if eof:
+                raise ValueError("JSON 배열이 닫히지 않았습니다.")
+            fill()
+            continue
+        if buffer[pos] == "]":
+            if not concatenated:
+                return
+            # 다음 배열의 여는 대괄호를 찾음
+            pos += 1
+            while True:
+                pos = _WHITESPACE.match(buffer, pos).end()
+                if pos < len(buffer) or eof:
+                    break
+                fill()
+            if pos >= len(buffer):
+                return
+            if buffer[pos] != "[":
+                raise ValueError(f"JSON 배열 사이에 예상하지 못한 값이 있습니다 (위치 {pos})")
+            pos += 1
+            continue
+
+        match = _FLAT_OBJECT.match(buffer, pos)
+        if match is not None:
+            end = match.end()
+            text = match.group()
+            if skip_at_or_below is not None:
+                no_match = _NO_FIELD.search(text)
+                if no_match is not None and int(no_match.group(1)) <= skip_at_or_below:
+                    if skipped is not None:
+                        skipped[0] += 1
+                    pos = end
+                    continue
+            pos = end
+            yield json.loads(text)
+            continue
+
+        # 중첩 객체 등 정규식으로 처리할 수 없는 값은 raw_decode로 처리 (덜 읽은 경우 더 읽고 재시도)
+        try:
+            value, end = _decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise ValueError(f"JSON 형식 오류 (위치 {pos})")
+            fill()
+            continue
+        if not eof and (end >= len(buffer) or buffer[end] not in _DELIMITERS):
+            # 숫자 등은 청크 경계에서 잘렸을 수 있으므로 더 읽고 다시 해석
+            fill()
+            continue
+        pos = end
+        if skip_at_or_below is not None and isinstance(value, dict) and \
+           isinstance(value.get("no"), int) and value["no"] <= skip_at_or_below:
+            if skipped is not None:
+                skipped[0] += 1
+            continue
+        yield value
@@ -0,0 +1,86 @@
+"""
+주기적 스캔용 다중 키워드 매칭 엔진 (Aho-Corasick).
+
+모든 사용자의 구독 키워드를 정규화(소문자)한 뒤 중복을 제거하여 하나의 오토마톤으로 만들고,
+각 제목을 한 번만 훑어 일치하는 키워드를 모두 찾습니다.
+"""
+from collections import deque
+
+
+class KeywordMatcher:
+    """
+    정규화된 키워드 집합으로 만든 Aho-Corasick 오토마톤.
+
+    판정은 기존 `keyword.lower() in title.lower()`와 동일합니다.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = frozenset(keyword.lower() for keyword in keywords)
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[tuple[str, ...]] = [()]
+
+        for keyword in self.keywords:
+            if keyword:
+                self._insert(keyword)
+        self._build_failure_links()
+        # 빈 키워드는 모든 제목에 포함되는 것으로 취급 ('' in title == True)
+        self._always = ("",) if "" in self.keywords else ()
+
+    def _insert(self, keyword: str):
+        state = 0
+        for ch in keyword:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+                self._goto[state][ch] = next_state
+            state = next_state
+        self._out[state] = (keyword,)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail_target = self._goto[fail].get(ch, 0)
+                self._fail[next_state] = fail_target if fail_target != next_state else 0
+                # 접미사로 끝나는 키워드도 함께 출력되도록 실패 링크의 출력을 합침
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def match(self, title: str) -> set[str]:
+        """제목에 포함된 (정규화된) 키워드 집합을 반환합니다."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set(self._always)
+        state = 0
+        for ch in title.lower():
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+    def match_items(self, items) -> dict[str, list]:
+        """
+        항목 목록을 한 번 훑어 키워드별로 일치한 항목을 모읍니다.
+
+        Returns:
+            dict: 정규화된 키워드 -> 일치한 항목 리스트 (입력 순서 유지).
+        """
+        matches: dict[str, list] = {}
+        if not self.keywords:
+            return matches
+        for item in items:
+            title = item.get("title")
+            if not title:
+                continue
+            for keyword in self.match(title):
+                matches.setdefault(keyword, []).append(item)
+        return matches
@@ -0,0 +1,310 @@
+"""
+봇/DAG 단계별 지연 시간과 처리량 지표.
+
+외부 라이브러리 없이 Prometheus 텍스트 형식(0.0.4)으로 내보낼 수 있는 카운터, 게이지, 히스토그램입니다.
+봇은 REGISTRY를 로컬 HTTP 엔드포인트(/metrics)와 관리자 명령어(/지표)로 보여주고,
+DAG는 실행마다 새 Registry에 기록한 결과를 저장소의 hotdeal.metrics로 남깁니다.
+(node_exporter textfile collector와 같은 형식이므로 봇의 엔드포인트에 그대로 이어 붙입니다.)
+"""
+import bisect
+import contextlib
+import http.server
+import math
+import threading
+import time
+
+DAG_METRICS_NAME = "hotdeal.metrics"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# 초 단위. 색인 조회(ms 이하)부터 DAG 크롤링(수 분)까지 담을 수 있도록 넓게 잡음
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if len(labels) != len(self.label_names) or any(name not in labels for name in self.label_names):
+            raise ValueError(f"{self.name}의 label은 {self.label_names}이어야 합니다: {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def label_values(self) -> list[tuple]:
+        """기록된 label 값 조합 목록."""
+        with self._lock:
+            return list(self._values)
+
+    def _samples(self):
+        """(이름 접미사, label 쌍, 값) 목록."""
+        with self._lock:
+            return [("", tuple(zip(self.label_names, key)), value) for key, value in self._values.items()]
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, pairs, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(pairs)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """증가만 하는 누적 값."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("카운터는 감소할 수 없습니다.")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """마지막으로 기록한 값. (DAG 실행별 값, 마지막 스캔 주기의 값 등)"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels) -> float | None:
+        return self._values.get(self._key(labels))
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        """블록 실행 시간(초)을 기록합니다."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.set(time.perf_counter() - start, **labels)
+
+
+class _HistogramState:
+    __slots__ = ("counts", "sum", "count", "last")
+
+    def __init__(self, bucket_count: int):
+        self.counts = [0] * (bucket_count + 1)  # 마지막 칸은 +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.last = 0.0
+
+
+class Histogram(_Metric):
+    """구간(bucket)별 관측 수와 합계. 분위수는 구간 안에서 선형 보간으로 추정합니다."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = _HistogramState(len(self.buckets))
+            state.counts[bisect.bisect_left(self.buckets, value)] += 1
+            state.sum += value
+            state.count += 1
+            state.last = value
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        """블록 실행 시간(초)을 관측합니다. 예외가 발생해도 기록합니다."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        samples = []
+        with self._lock:
+            for key, state in self._values.items():
+                pairs = tuple(zip(self.label_names, key))
+                cumulative = 0
+                for bound, count in zip(self.buckets + (math.inf,), state.counts):
+                    cumulative += count
+                    samples.append(("_bucket", pairs + (("le", _format_value(bound)),), cumulative))
+                samples.append(("_sum", pairs, state.sum))
+                samples.append(("_count", pairs, state.count))
+        return samples
+
+    def stats(self, **labels) -> dict | None:
+        """관측 수, 평균, 최근 값, p50/p95 추정치. 관측이 없으면 None."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            if state is None or not state.count:
+                return None
+            counts = list(state.counts)
+            result = {"count": state.count, "mean": state.sum / state.count, "last": state.last}
+        result["p50"] = self._quantile(counts, 0.5)
+        result["p95"] = self._quantile(counts, 0.95)
+        return result
+
+    def _quantile(self, counts: list[int], q: float) -> float:
+        rank = q * sum(counts)
+        cumulative = 0
+        for i, count in enumerate(counts):
+            if count and cumulative + count >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]  # +Inf 구간은 가장 큰 경계로 표시
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+
+class Registry:
+    """지표 목록. 같은 이름으로 다시 요청하면 기존 지표를 반환합니다."""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str, labels, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labels, **kwargs)
+            elif type(metric) is not cls or metric.label_names != tuple(labels):
+                raise ValueError(f"이미 다른 형식으로 등록된 지표입니다: {name}")
+            return metric
+
+    def counter(self, name: str, help: str, labels=()) -> Counter:
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str, labels=()) -> Gauge:
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name: str, help: str, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def metrics(self) -> list[_Metric]:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def render(self) -> str:
+        """Prometheus 텍스트 형식."""
+        lines = []
+        for metric in self.metrics():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def summary_lines(self) -> list[str]:
+        """관리자 명령어용 요약. 히스토그램은 분위수 추정치, 나머지는 값만 표시합니다."""
+        lines = []
+        for metric in self.metrics():
+            if isinstance(metric, Histogram):
+                for key in metric.label_values():
+                    labels = dict(zip(metric.label_names, key))
+                    stats = metric.stats(**labels)
+                    if stats is None:
+                        continue
+                    lines.append(f"{metric.name}{_format_labels(tuple(labels.items()))}: {stats['count']}회, "
+                                 f"평균 {stats['mean'] * 1000:.1f}ms, p50 {stats['p50'] * 1000:.1f}ms, "
+                                 f"p95 {stats['p95'] * 1000:.1f}ms, 최근 {stats['last'] * 1000:.1f}ms")
+            else:
+                for _, pairs, value in metric._samples():
+                    lines.append(f"{metric.name}{_format_labels(pairs)}: {_format_value(value)}")
+        return lines
+
+
+# 봇 프로세스의 기본 레지스트리와 모듈 공용 단계별 처리 시간
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.histogram("moabot_stage_seconds", "단계별 처리 시간(초)", labels=("stage",))
+
+
+def sample_lines(text: str) -> list[str]:
+    """Prometheus 텍스트에서 주석과 히스토그램 구간을 뺀 값 줄만 반환합니다."""
+    return [line for line in text.splitlines() if line and not line.startswith("#") and "_bucket{" not in line]
+
+
+class StoredMetrics:
+    """
+    세그먼트 저장소 백엔드에 저장된 지표 파일(DAG의 hotdeal.metrics)을 읽습니다.
+
+    버전(generation)이 바뀐 경우에만 다시 내려받습니다.
+    """
+
+    def __init__(self, backend, name: str = DAG_METRICS_NAME):
+        self.backend = backend
+        self.name = name
+        self._version = None
+        self._text = ""
+        self._lock = threading.Lock()
+
+    def text(self) -> str:
+        with self._lock:
+            try:
+                version = self.backend.version(self.name)
+                if version != self._version:
+                    data = self.backend.read(self.name)
+                    self._text = data.decode("utf-8") if data else ""
+                    self._version = version
+            except Exception as e:
+                print(f"저장된 지표({self.name})를 읽지 못했습니다: {e}")
+            return self._text
+
+
+def start_http_server(port: int, host: str = "127.0.0.1", registry: Registry = REGISTRY,
+                      extra=None) -> http.server.ThreadingHTTPServer:
+    """
+    /metrics 경로로 지표를 제공하는 HTTP 서버를 백그라운드 스레드에서 시작합니다.
+
+    Args:
+        extra (Callable[[], str] | None): 이어 붙일 Prometheus 텍스트를 반환하는 함수. (DAG 지표 등)
+    """
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render()
+            if extra is not None:
+                body += extra()
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
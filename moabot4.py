@@ -1,14 +1,20 @@
 import discord
 from discord.ui import View, Button
 from discord.ext import commands
-from google.cloud import storage
-import json
-from io import BytesIO
 import asyncio
 import datetime
 import pytz
-from Levenshtein import distance
-import re
+import math
+import time
+from dealcache import DealSnapshot, DealSnapshotManager, GCSBlobSource, LocalFileSource, SegmentSource
+from dealstore import NO_TIMESTAMP
+from dedupe import SeenWindow
+from dispatch import DMDispatcher
+from subscriptions import Subscription, SubscriptionStore
+from matcher import KeywordMatcher
+from metrics import REGISTRY, STAGE_SECONDS, StoredMetrics, sample_lines, start_http_server
+from pricehistory import WINDOW_MONTHS
+from segments import GCSBackend, LocalBackend, SegmentStore
 
 # 봇 토큰을 여기에 입력하세요
 TOKEN = ''
@@ -18,70 +24,104 @@ intents.message_content = True
 
 bot = commands.Bot(command_prefix='/', intents=intents)
 
-scanning_users = {}
 SCAN_INTERVAL = 20 * 60
 BUCKET_NAME = 'moastorage'
 BLOB_NAME = 'data/hotdeal.json'
+SEGMENT_PREFIX = 'data/'
+# GCS 대신 로컬 디렉터리의 세그먼트 저장소를 사용하려면 경로를 입력하세요 (DAG의 HOTDEAL_LOCAL_STORAGE와 같은 경로)
+LOCAL_STORAGE_DIR = None
+
+SUBSCRIPTION_DB_PATH = 'subscriptions.db'
 
-LEVENSHTEIN_THRESHOLD = 4 
-JACCARD_THRESHOLD = 0.4   
 SIMILAR_DEAL_LOOKBACK_MONTHS = 6
 MAX_SIMILAR_DEALS = 3
+# 같은 상품의 가격이 이보다 적게 모였으면 가격 비교를 표시하지 않음 (새 핫딜 자신 포함)
+PRICE_HISTORY_MIN_COUNT = 3
 
-KST = pytz.timezone('Asia/Seoul')
+ITEMS_PER_PAGE = 4
+MAX_RESULTS_PER_VIEW = 500
 
-# --- 가격 추출 함수 (다시 추가) ---
-def extract_numeric_price(text: str) -> float | None:
-    """
-    텍스트에서 최종적인 단일 숫자 가격을 추출합니다.
-    괄호 안의 계산식은 무시하고, 괄호 밖의 최종 가격을 우선적으로 찾습니다.
-    """
-    if not text:
-        return None
+# 로컬 지표 엔드포인트 (http://127.0.0.1:9108/metrics, Prometheus 텍스트 형식). None이면 열지 않음
+METRICS_HOST = '127.0.0.1'
+METRICS_PORT = 9108
+# /지표 명령어를 사용할 수 있는 관리자의 Discord 사용자 id
+ADMIN_USER_IDS = set()
+# Discord 메시지 길이 제한(2000자)보다 조금 작게
+MAX_MESSAGE_CHARS = 1900
 
-    # 1. '숫자원' 또는 '숫자 ₩' 형식 (괄호 밖에 있는 명확한 가격)
-    price_match_won = re.search(r'([\d,]+)\s*(?:원|₩)(?![^()]*\))', text)
-    if price_match_won:
-        try:
-            return float(price_match_won.group(1).replace(',', ''))
-        except ValueError:
-            pass
+KST = pytz.timezone('Asia/Seoul')
 
-    # 2. 괄호 밖에 있는 숫자로만 끝나는 경우 (단위 '원'이 생략된 경우)
-    price_match_end = re.search(r'(\d{1,3}(?:,\d{3})*(?:\.\d+)?)\s*$(?![^()]*\))', text)
-    if price_match_end:
+# 모든 명령어가 공유하는 핫딜 스냅샷 (manifest가 바뀐 경우에만 새 세그먼트를 내려받음)
+if LOCAL_STORAGE_DIR:
+    deal_source = SegmentSource(SegmentStore(LocalBackend(LOCAL_STORAGE_DIR)),
+                                fallback=LocalFileSource(f"{LOCAL_STORAGE_DIR}/hotdeal.json"))
+else:
+    deal_source = SegmentSource(SegmentStore(GCSBackend(BUCKET_NAME, SEGMENT_PREFIX)),
+                                fallback=GCSBlobSource(BUCKET_NAME, BLOB_NAME))
+snapshot_manager = DealSnapshotManager(deal_source)
+
+# 스캔 구독은 SQLite에 기록되어 재시작 후에도 watermark부터 이어서 스캔함
+# (import만 할 때 DB 파일을 만들지 않도록 봇을 실행할 때 연결)
+subscription_store: SubscriptionStore | None = None
+
+# 스캔 알림 DM은 이 대기열을 통해 묶어서 발송 (매칭 단계는 전송을 기다리지 않음)
+dm_dispatcher = DMDispatcher(bot)
+
+# 스캔 주기 지표 (단계별 처리 시간은 metrics.STAGE_SECONDS)
+SCAN_CYCLE_SECONDS = REGISTRY.histogram("moabot_scan_cycle_seconds", "주기적 스캔 한 주기의 처리 시간(초)")
+SCAN_LAG_SECONDS = REGISTRY.histogram("moabot_scan_lag_seconds", "스캔 주기가 SCAN_INTERVAL보다 늦게 시작된 시간(초)")
+SCAN_ITEMS = REGISTRY.counter("moabot_scan_items_total", "주기적 스캔에서 확인한 새 항목 수")
+SCAN_MATCHES = REGISTRY.counter("moabot_scan_matches_total", "알림 대상이 된 새 핫딜 수 (구독별)")
+SCAN_ERRORS = REGISTRY.counter("moabot_scan_errors_total", "오류로 끝난 스캔 주기/구독 처리 수", labels=("scope",))
+SCAN_LAST_ITEMS = REGISTRY.gauge("moabot_scan_last_items", "마지막 스캔 주기에서 확인한 새 항목 수")
+SCAN_LAST_MATCHES = REGISTRY.gauge("moabot_scan_last_matches", "마지막 스캔 주기의 알림 대상 핫딜 수")
+SCAN_LAST_DM_EMBEDS = REGISTRY.gauge("moabot_scan_last_dm_embeds", "직전 스캔 주기 이후 발송/실패한 알림 임베드 수",
+                                     labels=("result",))
+DM_PENDING = REGISTRY.gauge("moabot_dm_pending_embeds", "발송 대기 중인 알림 임베드 수")
+COMMAND_SECONDS = REGISTRY.histogram("moabot_command_seconds", "명령어 처리 시간(초, 상호작용 생성 시각부터)",
+                                     labels=("command",))
+
+# DAG가 실행마다 세그먼트 저장소에 남기는 지표도 엔드포인트와 /지표에서 함께 보여줌
+dag_metrics = StoredMetrics(deal_source.store.backend)
+
+
+class PageJumpModal(discord.ui.Modal, title="페이지 이동"):
+    page_input = discord.ui.TextInput(label="이동할 페이지 번호", required=True, max_length=6)
+
+    def __init__(self, paginator: "PaginatorView"):
+        super().__init__()
+        self.paginator = paginator
+        self.page_input.placeholder = f"1 ~ {paginator.total_pages}"
+
+    async def on_submit(self, interaction: discord.Interaction):
         try:
-            return float(price_match_end.group(1).replace(',', ''))
+            page = int(self.page_input.value)
         except ValueError:
-            pass
+            await interaction.response.send_message("페이지 번호는 숫자로 입력해주세요.", ephemeral=True)
+            return
+        if not 1 <= page <= self.paginator.total_pages:
+            await interaction.response.send_message(f"1 ~ {self.paginator.total_pages} 사이의 페이지를 입력해주세요.", ephemeral=True)
+            return
+        await self.paginator.show_page(interaction, page - 1)
 
-    # 3. 괄호 안에 있지만 계산식이 아닌 단일 숫자 (예: (8900))
-    price_in_paren_single = re.search(r'\(([\d,]+)\)$', text)
-    if price_in_paren_single:
-        try:
-            return float(price_in_paren_single.group(1).replace(',', ''))
-        except ValueError:
-            pass
-            
-    # 4. 다른 모든 시도가 실패했을 때, 텍스트에서 첫 번째 유효한 숫자 패턴
-    price_match_fallback = re.search(r'(\d{1,3}(?:,\d{3})*(?:\.\d+)?)', text)
-    if price_match_fallback:
-        try:
-            return float(price_match_fallback.group(1).replace(',', ''))
-        except ValueError:
-            pass
 
-    return None
-# --- 가격 추출 함수 끝 ---
+class PaginatorView(View):
+    """
+    검색 결과 페이지 넘김 뷰.
 
+    페이지 임베드를 미리 만들어 두지 않고 결과 id 목록과 현재 위치(cursor)만 보관하다가
+    버튼을 누를 때 render_page로 해당 페이지만 만듭니다.
+    """
 
-class PaginatorView(View):
-    def __init__(self, interaction: discord.Interaction, pages: list[discord.Embed], timeout: float = 180):
+    def __init__(self, interaction: discord.Interaction, result_ids: list[int], render_page,
+                 items_per_page: int = ITEMS_PER_PAGE, timeout: float = 180):
         super().__init__(timeout=timeout)
         self.interaction = interaction
-        self.pages = pages
+        self.result_ids = result_ids[:MAX_RESULTS_PER_VIEW]
+        self.render_page = render_page
+        self.items_per_page = items_per_page
         self.current_page = 0
-        self.total_pages = len(pages)
+        self.total_pages = max(1, math.ceil(len(self.result_ids) / items_per_page))
 
         self.prev_button = Button(label="이전", style=discord.ButtonStyle.primary, disabled=True)
         self.prev_button.callback = self.prev_page
@@ -94,17 +134,30 @@ class PaginatorView(View):
         self.next_button.callback = self.next_page
         self.add_item(self.next_button)
 
+        self.jump_button = Button(label="이동", style=discord.ButtonStyle.secondary, disabled=self.total_pages <= 1)
+        self.jump_button.callback = self.jump_page
+        self.add_item(self.jump_button)
+
         self.update_buttons()
 
-    async def prev_page(self, interaction: discord.Interaction):
-        self.current_page -= 1
+    def current_embed(self) -> discord.Embed:
+        start = self.current_page * self.items_per_page
+        page_ids = self.result_ids[start:start + self.items_per_page]
+        return self.render_page(page_ids, self.current_page, self.total_pages)
+
+    async def show_page(self, interaction: discord.Interaction, page: int):
+        self.current_page = page
         self.update_buttons()
-        await interaction.response.edit_message(embed=self.pages[self.current_page], view=self)
+        await interaction.response.edit_message(embed=self.current_embed(), view=self)
+
+    async def prev_page(self, interaction: discord.Interaction):
+        await self.show_page(interaction, self.current_page - 1)
 
     async def next_page(self, interaction: discord.Interaction):
-        self.current_page += 1
-        self.update_buttons()
-        await interaction.response.edit_message(embed=self.pages[self.current_page], view=self)
+        await self.show_page(interaction, self.current_page + 1)
+
+    async def jump_page(self, interaction: discord.Interaction):
+        await interaction.response.send_modal(PageJumpModal(self))
 
     def update_buttons(self):
         self.prev_button.disabled = self.current_page == 0
@@ -123,82 +176,72 @@ async def on_ready():
         print(f'{len(synced)}개의 커맨드를 동기화했습니다.')
     except Exception as e:
         print(f"커맨드 동기화 오류: {e}")
+    dm_dispatcher.start()
     bot.loop.create_task(periodic_scan())
 
+@bot.event
+async def on_app_command_completion(interaction: discord.Interaction, command):
+    elapsed = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+    COMMAND_SECONDS.observe(elapsed, command=command.name)
+
+def search_result_ids(snapshot: DealSnapshot, keyword: str) -> list[int]:
+    """색인에서 no 내림차순으로 정렬된 결과 id만 가져옵니다. (뷰 하나당 최대 MAX_RESULTS_PER_VIEW개)"""
+    with STAGE_SECONDS.time(stage="search"):
+        return snapshot.search_index.search(keyword, size=len(snapshot), limit=MAX_RESULTS_PER_VIEW)
+
 @bot.tree.command(name="검색", description="키워드와 일치하는 정보를 보냅니다.")
 async def search_keyword(interaction: discord.Interaction, 키워드: str):
     await interaction.response.defer(ephemeral=True)
     try:
-        client = storage.Client()
-        bucket = client.bucket(BUCKET_NAME)
-        blob = bucket.blob(BLOB_NAME)
-        json_bytes = await asyncio.to_thread(blob.download_as_bytes) # 비동기 처리
-        data = await asyncio.to_thread(json.load, BytesIO(json_bytes)) # 비동기 처리
-
-        data.sort(key=lambda x: int(x.get('no', 0)) if x.get('no') is not None else 0, reverse=True)
-        
-        matched_items = [item for item in data if 키워드.lower() in item.get("title","").lower()]
+        snapshot = await snapshot_manager.get()
+        result_ids = search_result_ids(snapshot, 키워드)
 
-        if not matched_items:
+        if not result_ids:
             await interaction.followup.send("해당 키워드에 대한 결과를 찾을 수 없습니다.", ephemeral=True)
             return
 
-        items_per_page = 4
-        pages = [matched_items[i:i + items_per_page] for i in range(0, len(matched_items), items_per_page)]
-        embed_pages = []
-
-        for page_num, page_items in enumerate(pages):
-            embed = discord.Embed(title=f"🔍 키워드 '{키워드}' 검색 결과 (페이지 {page_num + 1}/{len(pages)})", color=discord.Color.blue())
-            for index, item in enumerate(page_items):
+        def render_page(page_ids: list[int], page_num: int, total_pages: int) -> discord.Embed:
+            embed = discord.Embed(title=f"🔍 키워드 '{키워드}' 검색 결과 (페이지 {page_num + 1}/{total_pages})", color=discord.Color.blue())
+            if len(result_ids) >= MAX_RESULTS_PER_VIEW:
+                embed.description = f"결과가 많아 최근 {MAX_RESULTS_PER_VIEW}개까지만 표시합니다."
+            for index, item_id in enumerate(page_ids):
+                item = snapshot.items[item_id]
                 title = item.get('title', '정보 없음')
                 price = item.get('price', '정보 없음') # 가격 정보 다시 추가
                 link = item.get('link', '정보 없음')
                 timestamp = item.get('timestamp', '정보 없음')
 
-                embed.add_field(name=f"🎁 상품 {index + 1 + (page_num * items_per_page)}", value="", inline=False)
+                embed.add_field(name=f"🎁 상품 {index + 1 + (page_num * ITEMS_PER_PAGE)}", value="", inline=False)
                 embed.add_field(name="제목", value=title, inline=False)
                 embed.add_field(name="가격", value=price, inline=True) # 가격 필드 다시 추가
                 embed.add_field(name="링크", value=f"[바로가기]({link})" if link != '정보 없음' else '정보 없음', inline=False)
                 embed.add_field(name="등록 시간", value=timestamp, inline=True)
-                if index < len(page_items) - 1:
+                if index < len(page_ids) - 1:
                     embed.add_field(name="", value="-" * 30, inline=False)
+            return embed
 
-            embed_pages.append(embed)
-
-        if not embed_pages:
-            await interaction.followup.send("검색 결과가 없습니다.", ephemeral=True)
-            return
-
-        paginator = PaginatorView(interaction, embed_pages)
-        await interaction.followup.send(embed=embed_pages[0], view=paginator, ephemeral=True)
+        paginator = PaginatorView(interaction, result_ids, render_page)
+        await interaction.followup.send(embed=paginator.current_embed(), view=paginator, ephemeral=True)
 
     except Exception as e:
         print(f"검색 중 오류 발생: {e}")
         await interaction.followup.send("검색 중 오류가 발생했습니다. 다시 시도해주세요.", ephemeral=True)
 
-async def fetch_recent_results(키워드: str, since: datetime.datetime, seen_titles: set):
+async def fetch_recent_results(키워드: str, since: datetime.datetime, seen_titles: SeenWindow, snapshot: DealSnapshot | None = None):
     try:
-        client = storage.Client()
-        bucket = client.bucket(BUCKET_NAME)
-        blob = bucket.blob(BLOB_NAME)
-        json_bytes = await asyncio.to_thread(blob.download_as_bytes) # 비동기 처리
-        data = await asyncio.to_thread(json.load, BytesIO(json_bytes)) # 비동기 처리
+        if snapshot is None:
+            snapshot = await snapshot_manager.get()
 
         matched_items = []
-        for item in data:
-            title = item.get("title", "")
-            timestamp_str = item.get("timestamp", "")
+        for item in reversed(snapshot.search(키워드)):
+            title = item.title
             price = item.get("price", "가격 정보 없음") # 가격 정보 다시 추가
 
-            if 키워드.lower() in title.lower() and timestamp_str and title not in seen_titles:
-                try:
-                    item_time = datetime.datetime.strptime(timestamp_str, "%Y/%m/%d-%H:%M").astimezone(KST)
-                    if item_time > since:
-                        # 가격 정보 포함하여 메시지 구성
-                        matched_items.append(f"[{title}]({item.get('link', '링크 없음')}) - **가격: {price}**") 
-                        seen_titles.add(title)
-                except ValueError:
-                    continue
+            if item.minute != NO_TIMESTAMP and title not in seen_titles:
+                if item.minute * 60 > since.timestamp():
+                    # 가격 정보 포함하여 메시지 구성
+                    matched_items.append(f"[{title}]({item.get('link', '링크 없음')}) - **가격: {price}**") 
+                    seen_titles.add(title)
         return matched_items
     except Exception as e:
         print(f"최근 결과 검색 중 오류 발생: {e}")
@@ -210,25 +253,30 @@ async def start_scan(interaction: discord.Interaction, 키워드: str):
 
     user_id = interaction.user.id
 
-    if user_id not in scanning_users:
-        scanning_users[user_id] = {}
-
-    user_keywords = scanning_users[user_id]
-
-    if 키워드 in user_keywords:
+    if subscription_store.get(user_id, 키워드):
         await interaction.followup.send(f"'{키워드}' 키워드는 이미 스캔 중입니다.", ephemeral=True)
         return
 
     now = datetime.datetime.now(KST)
     one_hour_ago = now - datetime.timedelta(hours=1)
 
-    user_keywords[키워드] = {
-        "last_seen_titles": set(),
-        "start_time": now
-    }
+    try:
+        snapshot = await snapshot_manager.get()
+    except Exception as e:
+        print(f"스캔 시작 중 데이터 로드 오류: {e}")
+        snapshot = snapshot_manager.snapshot
+
+    if snapshot is None:
+        # watermark를 알 수 없는 채로 등록하면 다음 주기에 전체 이력을 새 항목으로 보고 알림을 보내므로 등록하지 않음
+        await interaction.followup.send("핫딜 데이터를 불러오지 못해 스캔을 시작할 수 없습니다. 잠시 후 다시 시도해주세요.", ephemeral=True)
+        return
+
+    # 현재 데이터까지는 아래의 최근 1시간 결과로만 알리고, 이후 주기적 스캔은 새로 추가된 항목만 확인
+    subscription = await subscription_store.add(user_id, 키워드, now, snapshot.max_no)
 
-    seen_titles = user_keywords[키워드]["last_seen_titles"]
-    recent_results = await fetch_recent_results(키워드, since=one_hour_ago, seen_titles=seen_titles)
+    recent_results = await fetch_recent_results(키워드, since=one_hour_ago, seen_titles=subscription.recent_titles, snapshot=snapshot)
+    if recent_results:
+        await subscription_store.save_progress([subscription])
 
     if recent_results:
         try:
@@ -254,7 +302,7 @@ async def check_scan(interaction: discord.Interaction):
     await interaction.response.defer(ephemeral=True)
 
     user_id = interaction.user.id
-    scan_info = scanning_users.get(user_id)
+    scan_info = subscription_store.get_user(user_id)
 
     if not scan_info:
         await interaction.followup.send("현재 스캔 중인 키워드가 없습니다.", ephemeral=True)
@@ -267,7 +315,7 @@ async def check_scan(interaction: discord.Interaction):
     )
 
     for keyword, info in scan_info.items():
-        start_time = info.get("start_time")
+        start_time = info.start_time
         if isinstance(start_time, datetime.datetime):
             start_time_str = start_time.strftime("%Y-%m-%d %H:%M:%S KST")
         else:
@@ -290,270 +338,341 @@ async def stop_scan(interaction: discord.Interaction, 키워드: str):
 
     user_id = interaction.user.id
     
-    if user_id not in scanning_users:
+    if not subscription_store.get_user(user_id):
         await interaction.followup.send("현재 활성화된 키워드 스캔이 없습니다.", ephemeral=True)
         return
 
     if 키워드.lower() == "all":
-        if user_id in scanning_users:
-            del scanning_users[user_id]
+        if await subscription_store.remove_user(user_id):
             await interaction.followup.send("모든 키워드에 대한 스캔을 중지했습니다.", ephemeral=True)
         else:
             await interaction.followup.send("현재 활성화된 키워드 스캔이 없습니다.", ephemeral=True)
         return
 
-    if 키워드 not in scanning_users.get(user_id, {}):
+    if not await subscription_store.remove(user_id, 키워드):
         await interaction.followup.send(f"'{키워드}'에 대한 스캔이 활성화되어 있지 않습니다.", ephemeral=True)
         return
 
-    del scanning_users[user_id][키워드]
-    if not scanning_users[user_id]:
-        del scanning_users[user_id]
-
     await interaction.followup.send(f"**'{키워드}'**에 대한 스캔을 중지합니다.", ephemeral=True)
 
-def jaccard_similarity(s1: str, s2: str) -> float:
-    """두 문자열의 Jaccard 유사도를 계산합니다."""
-    def normalize_text(text):
-        text = re.sub(r'[^가-힣a-zA-Z\s]', '', text)
-        return set(text.lower().split())
-
-    set1 = normalize_text(s1)
-    set2 = normalize_text(s2)
-
-    if not set1 and not set2:
-        return 1.0
-    if not set1 or not set2:
-        return 0.0
-
-    intersection = len(set1.intersection(set2))
-    union = len(set1.union(set2))
-    return intersection / union if union != 0 else 0.0
+@bot.tree.command(name="지표", description="봇과 DAG의 단계별 처리 시간과 처리량을 확인합니다. (관리자 전용)")
+@discord.app_commands.default_permissions(administrator=True)
+async def show_metrics(interaction: discord.Interaction):
+    if interaction.user.id not in ADMIN_USER_IDS:
+        await interaction.response.send_message("관리자만 사용할 수 있는 명령어입니다.", ephemeral=True)
+        return
+    await interaction.response.defer(ephemeral=True)
 
+    lines = ["[봇]"] + (REGISTRY.summary_lines() or ["기록 없음"])
+    dag_lines = sample_lines(await asyncio.to_thread(dag_metrics.text))
+    lines += ["", "[DAG 마지막 실행]"] + (dag_lines or ["기록 없음"])
+
+    # 메시지 길이 제한에 맞춰 줄 단위로 나누어 보냄
+    chunk = []
+    chunk_chars = 0
+    for line in lines:
+        if chunk and chunk_chars + len(line) + 1 > MAX_MESSAGE_CHARS:
+            await interaction.followup.send("```\n" + "\n".join(chunk) + "\n```", ephemeral=True)
+            chunk = []
+            chunk_chars = 0
+        chunk.append(line[:MAX_MESSAGE_CHARS])
+        chunk_chars += len(chunk[-1]) + 1
+    await interaction.followup.send("```\n" + "\n".join(chunk) + "\n```", ephemeral=True)
 
 async def find_similar_deals(
     target_keyword: str, 
     new_match_title: str, 
-    all_data: list, 
+    snapshot: DealSnapshot, 
     seen_titles: set, 
     lookback_months: int, 
-    current_time: datetime.datetime
+    current_time: datetime.datetime,
+    new_match_no: int | None = None
 ) -> list:
     """
     주어진 키워드와 새로 발견된 핫딜 제목을 기준으로 유사한 과거 핫딜을 찾습니다.
-    새로 발견된 핫딜 제목과 비교하여 Levenshtein 거리와 Jaccard 유사도를 사용합니다.
+
+    DAG가 새 핫딜을 유사 핫딜 클러스터에 배정했으면 같은 클러스터의 항목만 확인합니다.
+    아직 배정되지 않은 경우(클러스터링 단계가 끝나기 전)에는 Levenshtein 거리와 Jaccard 유사도로
+    스냅샷의 유사도 색인에서 후보를 직접 찾습니다.
     """
     similar_deals = []
     
     lookback_date = current_time - datetime.timedelta(days=30 * lookback_months)
-
-    for item in all_data:
-        await asyncio.sleep(0) 
-        item_title = item.get("title", "")
-        item_timestamp_str = item.get("timestamp", "")
-        
-        item_timestamp = item.get('parsed_timestamp') 
-        if not item_timestamp and item_timestamp_str:
-            try:
-                naive_dt = datetime.datetime.strptime(item_timestamp_str, "%Y/%m/%d-%H:%M")
-                item_timestamp = KST.localize(naive_dt)
-            except ValueError:
+    since_minute = math.ceil(lookback_date.timestamp() / 60)
+    size = len(snapshot.items)
+
+    # 1. 유사 핫딜의 제목에 target_keyword가 포함되어야 함
+    # 2. Levenshtein 거리 또는 Jaccard 유사도 조건을 만족해야 함 (클러스터는 DAG에서 같은 기준으로 계산됨)
+    cluster_id = None
+    if snapshot.clusters is not None and new_match_no is not None and snapshot.ordered:
+        cluster_id = snapshot.clusters.cluster_of(new_match_no)
+    if cluster_id is not None:
+        keyword_lower = target_keyword.lower()
+        positions = []
+        for no in snapshot.clusters.members(cluster_id):
+            pos = snapshot.position_of(no)
+            if pos is None or no == new_match_no:
                 continue
-
-        if not item_title or not item_timestamp or item_title in seen_titles:
-            continue
-
-        if item_timestamp < lookback_date:
+            item = snapshot.items[pos]
+            if item.minute >= since_minute and keyword_lower in item.title.lower():
+                positions.append(pos)
+    else:
+        keyword_hits = snapshot.search_index.search(target_keyword, size=size)
+        positions = snapshot.similarity_index.find(new_match_title, target_keyword, since_minute, keyword_hits,
+                                                   size=size)
+
+    for pos in positions:
+        item = snapshot.items[pos]
+        item_title = item.title
+        if item_title in seen_titles:
             continue
-
-        lev_dist = distance(new_match_title.lower(), item_title.lower())
-        jac_sim = jaccard_similarity(new_match_title, item_title)
-
-        # 1. 유사 핫딜의 제목에 target_keyword가 포함되어야 함
-        # 2. Levenshtein 거리 또는 Jaccard 유사도 조건을 만족해야 함
-        if target_keyword.lower() in item_title.lower() and \
-           (lev_dist <= LEVENSHTEIN_THRESHOLD or jac_sim >= JACCARD_THRESHOLD):
-            similar_deals.append(item)
-            seen_titles.add(item_title)
+        similar_deals.append(item)
+        seen_titles.add(item_title)
             
-    similar_deals.sort(key=lambda x: x.get('parsed_timestamp') or datetime.datetime.min.replace(tzinfo=KST), reverse=True)
+    similar_deals.sort(key=lambda x: x.minute, reverse=True)
             
     return similar_deals[:MAX_SIMILAR_DEALS]
 
 
-async def process_user_scan_for_keyword(user_id: int, keyword: str, scan_info: dict, all_data: list, now: datetime.datetime):
-    """단일 사용자의 단일 키워드에 대한 스캔을 처리합니다."""
-    
-    last_seen_titles = scan_info["last_seen_titles"]
-    start_time = scan_info.get("start_time")
+def price_comparison_text(snapshot: DealSnapshot, deal) -> str | None:
+    """
+    새 핫딜 가격을 같은 상품(정규화된 제목)의 최근 가격 집계와 비교한 문구를 만듭니다.
+    집계는 스냅샷에 미리 만들어져 있으므로 과거 이력을 훑지 않습니다. 비교할 이력이 부족하면 None.
+    """
+    price = deal.price_value
+    if price is None:
+        return None
+    stats = snapshot.price_history.lookup(deal.title)
+    if stats is None or stats.count < PRICE_HISTORY_MIN_COUNT:
+        return None
+
+    median = stats.median
+    if price <= stats.min_price:
+        headline = f"최근 {WINDOW_MONTHS}개월 최저가"
+    elif price < median:
+        headline = f"최근 {WINDOW_MONTHS}개월 중앙값보다 {(median - price) / median * 100:.0f}% 저렴"
+    elif price > median:
+        headline = f"최근 {WINDOW_MONTHS}개월 중앙값보다 {(price - median) / median * 100:.0f}% 비쌈"
+    else:
+        headline = f"최근 {WINDOW_MONTHS}개월 중앙값과 같음"
+    low_date = datetime.datetime.fromtimestamp(stats.last_low_minute * 60, KST).strftime("%Y/%m/%d")
+    return f"{headline}\n중앙값 {median:,.0f}원 · 최저가 {stats.min_price:,.0f}원 ({low_date}) · {stats.count}건"
+
+
+async def process_user_scan_for_keyword(subscription: Subscription, candidates: list,
+                                        snapshot: DealSnapshot, now: datetime.datetime):
+    """
+    단일 사용자의 단일 키워드에 대한 스캔을 처리합니다.
+
+    candidates는 KeywordMatcher가 이미 키워드 일치를 확인한 새 항목들이며,
+    이 구독의 watermark 이후에 추가된 항목만 알림 대상으로 봅니다. 알림 대상 핫딜 수를 반환합니다.
+    """
     
-    if not start_time:
-        start_time = now
-        scan_info["start_time"] = now
+    user_id = subscription.user_id
+    keyword = subscription.keyword
+    recent_titles = subscription.recent_titles
+    watermark = subscription.watermark
+    start_time = subscription.start_time
 
     # 테스트를 위해 start_time에 15분 여유를 줍니다. (필요 없으면 주석 처리 또는 제거)
     test_start_time = start_time - datetime.timedelta(minutes=15) 
 
     new_matches = []
-    
-    current_titles_in_data = {item.get("title") for item in all_data if item.get("title")}
+    candidate_titles = []
 
-    for item in all_data:
-        await asyncio.sleep(0) 
-        try:
-            item_no = item.get("no")
-            item_title = item.get("title", "")
-            item_timestamp_str = item.get("timestamp")
-
-            if not item_no or not item_title or not item_timestamp_str:
-                continue
+    for item in candidates:
+        item_title = item.title
 
-            item_timestamp = None
-            try:
-                naive_dt = datetime.datetime.strptime(item_timestamp_str, "%Y/%m/%d-%H:%M")
-                item_timestamp = KST.localize(naive_dt)
-            except ValueError as e:
-                print(f"시간 변환 오류: '{item_timestamp_str}' - {e}")
-                continue
-
-            if keyword.lower() in item_title.lower() and \
-               item_title not in last_seen_titles and \
-               item_timestamp and item_timestamp >= test_start_time: # test_start_time 사용
-                
-                new_matches.append(item)
-        except Exception as item_error:
-            print(f"항목 처리 중 예외 발생: {item_error}. 항목 내용: {item}")
+        if not item.no or not item_title or item.minute == NO_TIMESTAMP or item.no <= watermark:
             continue
+        candidate_titles.append(item_title)
+
+        if item_title not in recent_titles and item.minute * 60 >= test_start_time.timestamp(): # test_start_time 사용
+            new_matches.append(item)
 
     if new_matches:
-        user = await bot.fetch_user(user_id)
-        if user:
-            for new_deal in new_matches:
-                await asyncio.sleep(0) 
-                # --------------------- 새로운 핫딜 알림 임베드 ---------------------
-                embed = discord.Embed(title=f"🔔 새로운 키워드 알림: **'{keyword}'**", color=discord.Color.green())
-                
-                new_deal_title = new_deal.get('title', '정보 없음')
-                new_deal_price_str = new_deal.get('price', '정보 없음') # 가격 정보 다시 추가
-                new_deal_link = new_deal.get('link', '')
-                new_deal_timestamp = new_deal.get('timestamp', '정보 없음')
-
-                embed.add_field(name="제목", value=new_deal_title, inline=False)
-                embed.add_field(name="가격", value=new_deal_price_str, inline=True) # 가격 필드 다시 추가
-                embed.add_field(name="링크", value=f"[바로가기]({new_deal_link})" if new_deal_link else '정보 없음', inline=False)
-                embed.add_field(name="등록 시간", value=new_deal_timestamp, inline=True)
-                embed.add_field(name="", value="-" * 30, inline=False) # 구분선 유지
-
-                embed.timestamp = now
-                try:
-                    await user.send(embed=embed)
-                except discord.errors.Forbidden:
-                    print(f"경고: {user_id}님의 DM이 막혀 있어 알림을 보내지 못했습니다. (discord.errors.Forbidden)")
-                except Exception as e:
-                    print(f"오류: DM 전송 중 다른 오류 발생 ({user_id}): {e}")
-
-                # --------------------- 유사 핫딜 정보 임베드 (개별 비교 포함) ---------------------
-                # find_similar_deals 함수는 seen_titles를 업데이트하므로, 여기서는 새로 찾은 딜의 제목을 추가하기 위해 임시 set을 넘겨주는 것이 안전할 수 있음.
-                # 하지만 이미 process_user_scan_for_keyword의 상위 scope에서 last_seen_titles가 전달되고 있으므로 굳이 여기서 다시 초기화할 필요는 없습니다.
-                # 오히려 find_similar_deals의 seen_titles 인자가 의미가 없어질 수 있으므로,
-                # 여기서는 그냥 빈 set 또는 new_deal_title만 포함하는 set을 넘겨주는 것이 맞습니다.
-                # find_similar_deals에서 seen_titles를 업데이트하게 하거나,
-                # 아니면 find_similar_deals가 seen_titles를 반환하도록 변경해야 합니다.
-                # 현재 코드를 유지하려면, find_similar_deals 내에서 seen_titles를 복사해서 사용해야 합니다.
-                all_deal_titles_for_similar_search = {new_deal_title} # 유사 핫딜 검색을 위한 임시 seen_titles
+        # 임베드만 만들어 발송 대기열에 넘기고, Discord 전송은 dm_dispatcher가 따로 처리함
+        embeds = []
+        for new_deal in new_matches:
+            # --------------------- 새로운 핫딜 알림 임베드 ---------------------
+            embed = discord.Embed(title=f"🔔 새로운 키워드 알림: **'{keyword}'**", color=discord.Color.green())
+            
+            new_deal_title = new_deal.get('title', '정보 없음')
+            new_deal_price_str = new_deal.get('price', '정보 없음') # 가격 정보 다시 추가
+            new_deal_link = new_deal.get('link', '')
+            new_deal_timestamp = new_deal.get('timestamp', '정보 없음')
+
+            embed.add_field(name="제목", value=new_deal_title, inline=False)
+            embed.add_field(name="가격", value=new_deal_price_str, inline=True) # 가격 필드 다시 추가
+            embed.add_field(name="링크", value=f"[바로가기]({new_deal_link})" if new_deal_link else '정보 없음', inline=False)
+            embed.add_field(name="등록 시간", value=new_deal_timestamp, inline=True)
+            price_comparison = price_comparison_text(snapshot, new_deal)
+            if price_comparison:
+                embed.add_field(name="가격 비교", value=price_comparison, inline=False)
+            embed.add_field(name="", value="-" * 30, inline=False) # 구분선 유지
+
+            embed.timestamp = now
+            embeds.append(embed)
+
+            # --------------------- 유사 핫딜 정보 임베드 (개별 비교 포함) ---------------------
+            # find_similar_deals 함수는 seen_titles를 업데이트하므로, 여기서는 새로 찾은 딜의 제목을 추가하기 위해 임시 set을 넘겨주는 것이 안전할 수 있음.
+            # 하지만 이미 process_user_scan_for_keyword의 상위 scope에서 last_seen_titles가 전달되고 있으므로 굳이 여기서 다시 초기화할 필요는 없습니다.
+            # 오히려 find_similar_deals의 seen_titles 인자가 의미가 없어질 수 있으므로,
+            # 여기서는 그냥 빈 set 또는 new_deal_title만 포함하는 set을 넘겨주는 것이 맞습니다.
+            # find_similar_deals에서 seen_titles를 업데이트하게 하거나,
+            # 아니면 find_similar_deals가 seen_titles를 반환하도록 변경해야 합니다.
+            # 현재 코드를 유지하려면, find_similar_deals 내에서 seen_titles를 복사해서 사용해야 합니다.
+            all_deal_titles_for_similar_search = {new_deal_title} # 유사 핫딜 검색을 위한 임시 seen_titles
+            with STAGE_SECONDS.time(stage="similar"):
                 similar_deals = await find_similar_deals(
                     keyword, 
                     new_deal_title, 
-                    all_data, 
+                    snapshot, 
                     all_deal_titles_for_similar_search, # 임시 seen_titles 사용
                     SIMILAR_DEAL_LOOKBACK_MONTHS,
-                    now
+                    now,
+                    new_deal.no
                 )
+            
+            if similar_deals:
+                similar_embed = discord.Embed(
+                    title=f"📦 유사 핫딜 정보: '{new_deal_title}'", 
+                    description=f"**{new_deal_title}**에 비해 과거 **유사 핫딜** 가격을 비교합니다. (최대 {MAX_SIMILAR_DEALS}개)", 
+                    color=discord.Color.orange()
+                )
+                
+                for s_item in similar_deals:
+                    s_item_title = s_item.get('title', '정보 없음')
+                    s_item_price_str = s_item.get('price', '정보 없음') # 가격 정보 다시 추가
+                    s_item_link = s_item.get('link', '')
+                    s_item_timestamp = s_item.get('timestamp', '정보 없음')
+
+                    similar_embed.add_field(name=f"제목", value=s_item_title, inline=False)
+                    similar_embed.add_field(name="가격", value=s_item_price_str, inline=True) # 가격 필드 다시 추가
+                    similar_embed.add_field(name="링크", value=f"[바로가기]({s_item_link})" if s_item_link else '정보 없음', inline=False)
+                    similar_embed.add_field(name="등록 시간", value=s_item_timestamp, inline=True)
+                    similar_embed.add_field(name="", value="-" * 30, inline=False)
                 
-                if similar_deals:
-                    similar_embed = discord.Embed(
-                        title=f"📦 유사 핫딜 정보: '{new_deal_title}'", 
-                        description=f"**{new_deal_title}**에 비해 과거 **유사 핫딜** 가격을 비교합니다. (최대 {MAX_SIMILAR_DEALS}개)", 
-                        color=discord.Color.orange()
-                    )
-                    
-                    for s_item in similar_deals:
-                        await asyncio.sleep(0) 
-                        s_item_title = s_item.get('title', '정보 없음')
-                        s_item_price_str = s_item.get('price', '정보 없음') # 가격 정보 다시 추가
-                        s_item_link = s_item.get('link', '')
-                        s_item_timestamp = s_item.get('timestamp', '정보 없음')
-
-                        similar_embed.add_field(name=f"제목", value=s_item_title, inline=False)
-                        similar_embed.add_field(name="가격", value=s_item_price_str, inline=True) # 가격 필드 다시 추가
-                        similar_embed.add_field(name="링크", value=f"[바로가기]({s_item_link})" if s_item_link else '정보 없음', inline=False)
-                        similar_embed.add_field(name="등록 시간", value=s_item_timestamp, inline=True)
-                        similar_embed.add_field(name="", value="-" * 30, inline=False)
-                    
-                    if similar_embed.fields and similar_embed.fields[-1].value == "-" * 30:
-                        similar_embed.remove_field(-1)
-                    
-                    similar_embed.timestamp = now
-                    try:
-                        await user.send(embed=similar_embed)
-                    except discord.errors.Forbidden:
-                        print(f"경고: {user_id}님의 DM이 막혀 유사 핫딜 알림을 보내지 못했습니다.")
-                    except Exception as e:
-                        print(f"오류: 유사 핫딜 DM 전송 중 다른 오류 발생 ({user_id}): {e}")
-
-    last_seen_titles.update(current_titles_in_data)
+                if similar_embed.fields and similar_embed.fields[-1].value == "-" * 30:
+                    similar_embed.remove_field(-1)
+                
+                similar_embed.timestamp = now
+                embeds.append(similar_embed)
+
+        dm_dispatcher.enqueue(user_id, embeds)
+
+    recent_titles.update(candidate_titles)
+    subscription.watermark = max(watermark, snapshot.max_no)
+    return len(new_matches)
+
+
+_keyword_matcher = KeywordMatcher(())
+
+
+def get_keyword_matcher(keywords) -> KeywordMatcher:
+    """구독 키워드 집합이 바뀐 경우에만 오토마톤을 다시 만듭니다."""
+    global _keyword_matcher
+    normalized = frozenset(keyword.lower() for keyword in keywords)
+    if normalized != _keyword_matcher.keywords:
+        _keyword_matcher = KeywordMatcher(normalized)
+    return _keyword_matcher
+
+
+async def scan_cycle(snapshot: DealSnapshot, now: datetime.datetime) -> tuple[int, int]:
+    """
+    스캔 한 주기: 새 항목을 구독 키워드와 매칭해 알림을 대기열에 넣고 구독별 진행 상태를 저장합니다.
+
+    Returns:
+        tuple[int, int]: (확인한 새 항목 수, 알림 대상 핫딜 수)
+    """
+    subscriptions = subscription_store.all()
+    reset_subscriptions = []
+    for subscription in subscriptions:
+        if subscription.watermark > snapshot.max_no:
+            # 데이터가 재생성되어 번호가 줄어든 경우. 중복 알림은 recent_titles로 걸러짐
+            print(f"경고: {subscription.user_id}님의 '{subscription.keyword}' watermark가 데이터의 최대 no({snapshot.max_no})보다 커서 초기화합니다.")
+            subscription.watermark = 0
+            reset_subscriptions.append(subscription)
+    # 가장 뒤처진 구독의 watermark 이후 항목만 확인 (전체 이력은 다시 보지 않음)
+    min_watermark = min((subscription.watermark for subscription in subscriptions), default=snapshot.max_no)
+    new_items = snapshot.items_after(min_watermark)
+
+    # 모든 구독 키워드를 정규화하여 하나의 오토마톤으로 만들고, 각 제목은 한 번만 훑음
+    matcher = get_keyword_matcher(subscription_store.keywords())
+    with STAGE_SECONDS.time(stage="match"):
+        matches_by_keyword = await asyncio.to_thread(matcher.match_items, new_items)
+
+    # 일치한 키워드의 구독자만 역색인으로 찾아 처리
+    matched_subscriptions = []
+    tasks = []
+    for normalized_keyword, candidates in matches_by_keyword.items():
+        for subscription in subscription_store.subscribers(normalized_keyword):
+            matched_subscriptions.append(subscription)
+            tasks.append(process_user_scan_for_keyword(subscription, candidates, snapshot, now))
+
+    new_match_count = 0
+    failed = set()
+    if tasks:
+        with STAGE_SECONDS.time(stage="notify"):
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+        for subscription, result in zip(matched_subscriptions, results):
+            if isinstance(result, BaseException):
+                SCAN_ERRORS.inc(scope="subscription")
+                print(f"{subscription.user_id}님의 '{subscription.keyword}' 스캔 처리 중 오류 발생: {result}")
+                failed.add((subscription.user_id, subscription.keyword))
+            else:
+                new_match_count += result
+
+    # 일치 항목이 없던 구독도 이번 데이터까지 확인한 것으로 기록
+    # 처리에 실패한 구독은 watermark를 그대로 두어 다음 주기에 같은 항목을 다시 확인함
+    for subscription in subscriptions:
+        if (subscription.user_id, subscription.keyword) not in failed:
+            subscription.watermark = max(subscription.watermark, snapshot.max_no)
+    with STAGE_SECONDS.time(stage="save_progress"):
+        await subscription_store.save_progress(matched_subscriptions + reset_subscriptions, snapshot.max_no)
+    return len(new_items), new_match_count
 
 
 async def periodic_scan():
     await bot.wait_until_ready()
-    client = storage.Client()
-    bucket = client.bucket(BUCKET_NAME)
 
+    last_cycle_start = None
+    last_dm_sent, last_dm_failed = dm_dispatcher.sent_embeds, dm_dispatcher.failed_embeds
     while not bot.is_closed():
         now = datetime.datetime.now(KST)
+        cycle_start = time.monotonic()
+        if last_cycle_start is not None:
+            # 주기 처리 시간과 이벤트 루프 지연만큼 SCAN_INTERVAL보다 늦게 시작됨
+            SCAN_LAG_SECONDS.observe(max(0.0, cycle_start - last_cycle_start - SCAN_INTERVAL))
+        last_cycle_start = cycle_start
         
         try:
-            blob = bucket.blob(BLOB_NAME)
-            json_bytes = await asyncio.to_thread(blob.download_as_bytes) # 비동기 처리
-            raw_data = await asyncio.to_thread(json.load, BytesIO(json_bytes))
-            
-            if not isinstance(raw_data, list):
-                print(f"오류: Google Cloud Storage에서 로드된 데이터가 리스트 형식이 아닙니다. 타입: {type(raw_data)}")
-                await asyncio.sleep(SCAN_INTERVAL)
-                continue
-
-            # 데이터를 전처리하여 메모리에 효율적으로 저장 (예: timestamp 파싱)
-            processed_data = []
-            for item in raw_data:
-                await asyncio.sleep(0) # 데이터 전처리 중 블로킹 방지
-                try:
-                    item_timestamp_str = item.get("timestamp")
-                    if item_timestamp_str:
-                        naive_dt = datetime.datetime.strptime(item_timestamp_str, "%Y/%m/%d-%H:%M")
-                        item['parsed_timestamp'] = KST.localize(naive_dt)
-                    else:
-                        item['parsed_timestamp'] = None
-                    processed_data.append(item)
-                except ValueError as e:
-                    print(f"데이터 전처리 중 시간 변환 오류: '{item_timestamp_str}' - {e}")
-                    item['parsed_timestamp'] = None # 파싱 실패 시 None으로 설정
-                    processed_data.append(item)
-                except Exception as e:
-                    print(f"데이터 전처리 중 기타 오류: {item.get('title', '제목 없음')} - {e}")
-                    item['parsed_timestamp'] = None
-                    processed_data.append(item)
-            
-            tasks = []
-            for user_id, keywords_info in scanning_users.copy().items():
-                for keyword, scan_info in keywords_info.copy().items():
-                    tasks.append(process_user_scan_for_keyword(user_id, keyword, scan_info, processed_data, now))
-            
-            if tasks:
-                await asyncio.gather(*tasks, return_exceptions=True)
+            # generation이 바뀐 경우에만 내려받고, timestamp 전처리도 스냅샷 생성 시 한 번만 수행됨
+            with STAGE_SECONDS.time(stage="snapshot"):
+                snapshot = await snapshot_manager.get(force_check=True)
+            new_item_count, new_match_count = await scan_cycle(snapshot, now)
+
+            SCAN_ITEMS.inc(new_item_count)
+            SCAN_MATCHES.inc(new_match_count)
+            SCAN_LAST_ITEMS.set(new_item_count)
+            SCAN_LAST_MATCHES.set(new_match_count)
             
         except Exception as e:
+            SCAN_ERRORS.inc(scope="cycle")
             print(f"주기적 스캔 중 치명적인 오류 발생: {e}")
 
+        SCAN_CYCLE_SECONDS.observe(time.monotonic() - cycle_start)
+        # DM은 발송 대기열에서 따로 보내므로, 직전 주기 이후 발송/실패한 임베드 수를 기록
+        dm_sent, dm_failed = dm_dispatcher.sent_embeds, dm_dispatcher.failed_embeds
+        SCAN_LAST_DM_EMBEDS.set(dm_sent - last_dm_sent, result="sent")
+        SCAN_LAST_DM_EMBEDS.set(dm_failed - last_dm_failed, result="failed")
+        last_dm_sent, last_dm_failed = dm_sent, dm_failed
+        DM_PENDING.set(dm_dispatcher.pending_count())
+
         await asyncio.sleep(SCAN_INTERVAL)
 
-bot.run(TOKEN)
\ No newline at end of file
+if __name__ == "__main__":
+    subscription_store = SubscriptionStore(SUBSCRIPTION_DB_PATH)
+    if METRICS_PORT:
+        start_http_server(METRICS_PORT, METRICS_HOST, extra=dag_metrics.text)
+    bot.run(TOKEN)
@@ -0,0 +1,257 @@
+"""
+NDJSON(한 줄에 항목 하나) 기록/읽기.
+
+NDJSONWriter는 항목을 `<파일>.part`에 한 줄씩 쓰고, 일정 개수마다 flush + fsync 하므로
+중간에 프로세스가 죽어도 마지막 일부 줄만 잃습니다. close()하거나 rotate_records개를 채우면
+.part 파일을 최종 이름으로 교체(os.replace)하므로, .part가 아닌 파일은 항상 완성된 파일입니다.
+
+iter_records()는 NDJSON뿐 아니라 이전 형식(JSON 배열, history2.json처럼 배열을 이어 붙인 파일)도
+파일 전체를 메모리에 올리지 않고 항목 하나씩 읽습니다.
+"""
+import glob
+import json
+import os
+import re
+
+from jsonstream import CHUNK_SIZE, iter_json_array
+
+FLUSH_EVERY = 1000
+PART_SUFFIX = ".part"
+# 객체의 키 자리("{" 또는 "," 바로 뒤)에 있는 "no"만 찾음. 문자열 안의 따옴표는 항상 이스케이프되므로
+# 제목 등에 '"no": 1'이 들어 있어도 일치하지 않음
+_NO_FIELD = re.compile(rb'[{,]\s*"no"\s*:\s*(-?\d+)(?=\s*[,}])')
+
+
+def rotated_path(path: str, index: int) -> str:
+    """history.ndjson -> history-00001.ndjson"""
+    root, ext = os.path.splitext(path)
+    return f"{root}-{index:05d}{ext}"
+
+
+def _truncate_partial_line(path: str):
+    """마지막 줄바꿈 뒤의 (쓰다 만) 내용을 잘라냅니다."""
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        position = size
+        while position > 0:
+            step = min(CHUNK_SIZE, position)
+            f.seek(position - step)
+            chunk = f.read(step)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                position = position - step + newline + 1
+                break
+            position -= step
+        if position != size:
+            f.truncate(position)
+
+
+class NDJSONWriter:
+    """
+    항목을 NDJSON으로 기록하는 스트리밍 출력.
+
+    Args:
+        path (str): 최종 파일 경로.
+        flush_every (int): 이 개수마다 디스크에 flush + fsync 합니다.
+        rotate_records (int | None): 주어지면 이 개수마다 파일을 나누어 path-00001.ndjson, ... 으로 저장합니다.
+        append (bool): True이면 남아 있는 .part 파일의 완성된 줄 뒤에 이어서 씁니다. (중단된 작업 재개용)
+    """
+
+    def __init__(self, path: str, flush_every: int = FLUSH_EVERY, rotate_records: int | None = None,
+                 append: bool = False):
+        self.path = path
+        self.flush_every = flush_every
+        self.rotate_records = rotate_records
+        self.append = append
+        self.completed_paths: list[str] = []
+        self.count = 0
+        self._file = None
+        self._file_count = 0
+        self._unsynced = 0
+        self._part_index = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # 실패한 경우 지금까지 쓴 줄만 보존하고 .part는 완성 처리하지 않음
+            if self._file is not None:
+                self._sync(force=True)
+                self._file.close()
+                self._file = None
+
+    def _target_path(self) -> str:
+        if self.rotate_records is None:
+            return self.path
+        return rotated_path(self.path, self._part_index)
+
+    def _open(self):
+        if self.rotate_records is not None:
+            self._part_index += 1
+            while os.path.exists(rotated_path(self.path, self._part_index)):
+                # 이전 실행에서 완성된 파일 다음 번호부터 사용
+                self._part_index += 1
+        part_path = self._target_path() + PART_SUFFIX
+        directory = os.path.dirname(part_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self.append and os.path.exists(part_path):
+            _truncate_partial_line(part_path)
+            self._file = open(part_path, "ab")
+        else:
+            self._file = open(part_path, "wb")
+        self._file_count = 0
+
+    def write(self, record: dict):
+        if self._file is None:
+            self._open()
+        self._file.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.count += 1
+        self._file_count += 1
+        self._unsynced += 1
+        if self._unsynced >= self.flush_every:
+            self._sync()
+        if self.rotate_records is not None and self._file_count >= self.rotate_records:
+            self._finish()
+
+    def write_all(self, records):
+        for record in records:
+            self.write(record)
+
+    def flush(self):
+        """지금까지 쓴 줄을 디스크에 기록합니다. (재개 지점을 저장하기 전에 호출)"""
+        self._sync(force=True)
+
+    def _sync(self, force: bool = False):
+        if self._file is not None and (self._unsynced or force):
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def _finish(self):
+        """현재 .part 파일을 최종 이름으로 교체합니다."""
+        self._sync(force=True)
+        self._file.close()
+        self._file = None
+        target = self._target_path()
+        os.replace(target + PART_SUFFIX, target)
+        self.completed_paths.append(target)
+
+    def close(self):
+        if self._file is None and self.rotate_records is None and not self.completed_paths:
+            # 항목이 하나도 없어도 빈 파일을 만들어 완료를 표시
+            self._open()
+        if self._file is not None:
+            self._finish()
+
+
+def output_paths(path: str) -> list[str]:
+    """NDJSONWriter가 만든 완성된 파일 목록. (회전한 경우 번호 순)"""
+    root, ext = os.path.splitext(path)
+    rotated = sorted(glob.glob(f"{glob.escape(root)}-[0-9][0-9][0-9][0-9][0-9]{ext}"))
+    return rotated or ([path] if os.path.exists(path) else [])
+
+
+class _PrefixedStream:
+    """이미 읽은 앞부분을 되돌려 놓은 스트림."""
+
+    def __init__(self, prefix: bytes, stream):
+        self._prefix = prefix
+        self._stream = stream
+
+    def read(self, size: int = -1) -> bytes:
+        if self._prefix:
+            data, self._prefix = self._prefix, b""
+            if size is None or size < 0:
+                return data + self._stream.read()
+            return data
+        return self._stream.read(size)
+
+
+def _iter_lines(stream, chunk_size: int):
+    pending = b""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        yield from lines
+    if pending.strip():
+        yield pending
+
+
+def iter_records(stream, skip_at_or_below: int | None = None, chunk_size: int = CHUNK_SIZE,
+                 skipped: list | None = None):
+    """
+    바이너리 스트림에서 항목을 하나씩 반환합니다. 형식(NDJSON/JSON 배열/이어 붙인 배열)은 자동으로 판별합니다.
+
+    Args:
+        skip_at_or_below (int | None): "no" 값이 이 값 이하인 항목은 dict로 만들지 않고 건너뜁니다.
+        skipped (list | None): 주어지면 건너뛴 항목 수를 skipped[0]에 누적합니다.
+
+    Raises:
+        ValueError: 형식이 잘못된 경우. 단, NDJSON의 마지막 줄이 잘린 경우(쓰다가 중단된 파일)는 무시합니다.
+    """
+    head = b""
+    while True:
+        chunk = stream.read(chunk_size)
+        head += chunk
+        stripped = head.lstrip(b"\xef\xbb\xbf \t\r\n")
+        if stripped or not chunk:
+            break
+    if not stripped:
+        return
+    stream = _PrefixedStream(head, stream)
+
+    if stripped.startswith(b"["):
+        yield from iter_json_array(stream, skip_at_or_below, chunk_size, skipped, concatenated=True)
+        return
+
+    lines = _iter_lines(stream, chunk_size)
+    line = next(lines, None)
+    while line is not None:
+        next_line = next(lines, None)
+        if not line.strip():
+            line = next_line
+            continue
+        # 중괄호가 하나뿐인 평평한 객체만 파싱 없이 판단하고, 중첩 객체(또는 제목에 중괄호가 있는 줄)는
+        # 안쪽 객체의 "no"와 구분할 수 없으므로 파싱한 뒤 판단함
+        flat = line.count(b"{") == 1
+        if skip_at_or_below is not None and flat:
+            match = _NO_FIELD.search(line)
+            if match is not None and int(match.group(1)) <= skip_at_or_below:
+                if skipped is not None:
+                    skipped[0] += 1
+                line = next_line
+                continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            if next_line is None:
+                print("경고: 마지막 줄이 잘려 있어 건너뜁니다. (기록 중 중단된 파일)")
+                return
+            raise ValueError(f"NDJSON 형식 오류: {line[:80]!r}")
+        line = next_line
+        if skip_at_or_below is not None and not flat and isinstance(record, dict):
+            no = record.get("no")
+            if type(no) is int and no <= skip_at_or_below:
+                if skipped is not None:
+                    skipped[0] += 1
+                continue
+        yield record
+
+
+def read_path(path: str):
+    """파일 하나의 항목을 하나씩 반환합니다."""
+    with open(path, "rb") as f:
+        yield from iter_records(f)
+
+
+def read_paths(paths):
+    for path in paths:
+        yield from read_path(path)
@@ -0,0 +1,129 @@
+"""
+핫딜 항목 정규화 함수 모음.
+
+봇과 데이터 적재 단계가 같은 규칙으로 가격과 등록 시간을 해석하도록 한 곳에 모아 둡니다.
+적재 단계(DAG, historyscraper)는 normalize_rows()로 각 항목에 숫자 필드
+(timestamp_epoch: epoch 초, price_value: 숫자 가격)를 함께 기록하므로, 봇은 이 값을 그대로 사용하고
+문자열을 다시 파싱하지 않습니다. 정규식은 모듈을 불러올 때 한 번만 컴파일합니다.
+"""
+import re
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+KST = ZoneInfo('Asia/Seoul')
+TIMESTAMP_FORMAT = "%Y/%m/%d-%H:%M"
+
+# 가격 패턴 (extract_numeric_price에서 위에서부터 차례로 시도)
+_PRICE_WON = re.compile(r'([\d,]+)\s*(?:원|₩)(?![^()]*\))')
+_PRICE_END = re.compile(r'(\d{1,3}(?:,\d{3})*(?:\.\d+)?)\s*$(?![^()]*\))')
+_PRICE_IN_PAREN = re.compile(r'\(([\d,]+)\)$')
+_PRICE_FALLBACK = re.compile(r'(\d{1,3}(?:,\d{3})*(?:\.\d+)?)')
+
+# "5분 전", "3시간 전", ... (공백 제거 후 비교)
+_RELATIVE_TIME = re.compile(r'(\d+)(분|시간|일|주|개월)전')
+_RELATIVE_UNITS = {
+    '분': timedelta(minutes=1),
+    '시간': timedelta(hours=1),
+    '일': timedelta(days=1),
+    '주': timedelta(weeks=1),
+    # 정확한 월 계산은 복잡하므로 대략적인 일수로 계산 (30일/월)
+    '개월': timedelta(days=30),
+}
+
+
+def extract_numeric_price(text: str) -> float | None:
+    """
+    텍스트에서 최종적인 단일 숫자 가격을 추출합니다.
+    괄호 안의 계산식은 무시하고, 괄호 밖의 최종 가격을 우선적으로 찾습니다.
+    """
+    if not text:
+        return None
+
+    # 1. '숫자원' 또는 '숫자 ₩' 형식 (괄호 밖에 있는 명확한 가격)
+    price_match_won = _PRICE_WON.search(text)
+    if price_match_won:
+        try:
+            return float(price_match_won.group(1).replace(',', ''))
+        except ValueError:
+            pass
+
+    # 2. 괄호 밖에 있는 숫자로만 끝나는 경우 (단위 '원'이 생략된 경우)
+    price_match_end = _PRICE_END.search(text)
+    if price_match_end:
+        try:
+            return float(price_match_end.group(1).replace(',', ''))
+        except ValueError:
+            pass
+
+    # 3. 괄호 안에 있지만 계산식이 아닌 단일 숫자 (예: (8900))
+    price_in_paren_single = _PRICE_IN_PAREN.search(text)
+    if price_in_paren_single:
+        try:
+            return float(price_in_paren_single.group(1).replace(',', ''))
+        except ValueError:
+            pass
+            
+    # 4. 다른 모든 시도가 실패했을 때, 텍스트에서 첫 번째 유효한 숫자 패턴
+    price_match_fallback = _PRICE_FALLBACK.search(text)
+    if price_match_fallback:
+        try:
+            return float(price_match_fallback.group(1).replace(',', ''))
+        except ValueError:
+            pass
+
+    return None
+
+
+def reference_time() -> datetime:
+    """상대 시간("5분 전")의 기준 시각. 한 번에 읽은 항목들은 같은 기준 시각을 사용해야 합니다."""
+    return datetime.now(KST)
+
+
+def parse_timestamp(timestamp_str: str, reference: datetime) -> datetime | None:
+    """
+    "방금", "5분 전" 같은 상대 시간 문자열을 reference 기준의 시각으로 바꿉니다.
+
+    Returns:
+        datetime | None: 해석하지 못하면 None.
+    """
+    timestamp_str = timestamp_str.replace(" ", "")  # 공백 제거
+    if "방금" in timestamp_str:
+        return reference
+    match = _RELATIVE_TIME.search(timestamp_str)
+    if match is None:
+        return None
+    return reference - int(match.group(1)) * _RELATIVE_UNITS[match.group(2)]
+
+
+def normalize_row(row: dict, reference: datetime) -> dict:
+    """
+    dealfields 형식의 행을 저장 형식의 항목으로 바꿉니다. (no는 저장할 때 부여)
+
+    timestamp는 기존과 같은 문자열(KST, TIMESTAMP_FORMAT)로 남기고, 해석한 값은
+    timestamp_epoch(epoch 초)와 price_value에 기록합니다. 해석하지 못하면 원래 텍스트와 None을 기록합니다.
+    """
+    timestamp_text = row['timestamp'] or ''
+    parsed_datetime = parse_timestamp(timestamp_text, reference)
+    if parsed_datetime:
+        timestamp = parsed_datetime.astimezone(KST).strftime(TIMESTAMP_FORMAT)
+        # 문자열과 같은 분 단위로 맞춰, 어느 쪽으로 읽어도 같은 시각이 되도록 함
+        timestamp_epoch = int(parsed_datetime.timestamp()) // 60 * 60
+    else:
+        timestamp = timestamp_text  # 파싱 실패 시 원래 텍스트 유지
+        timestamp_epoch = None
+
+    return {
+        'title': row['title'],
+        'price': row['price'],
+        'link': row['link'],
+        'timestamp': timestamp,
+        'timestamp_epoch': timestamp_epoch,
+        'price_value': extract_numeric_price(row['price']),
+    }
+
+
+def normalize_rows(rows, reference: datetime | None = None) -> list[dict]:
+    """한 번에 읽은 행들을 같은 기준 시각으로 정규화합니다."""
+    if reference is None:
+        reference = reference_time()
+    return [normalize_row(row, reference) for row in rows]
@@ -0,0 +1,139 @@
+"""
+정규화된 제목별 가격 이력 집계.
+
+스냅샷마다 한 번 만들어 두고 새 항목이 들어오면 덧붙입니다. (similarity.SimilarityIndex와 같은 방식)
+제목에서 쇼핑몰 태그, 괄호 안 설명, 가격 표기를 지우고 남은 단어를 정렬한 것을 키로 사용하며,
+키마다 최근 window_minutes 동안의 가격을 정렬된 상태로 보관하므로 최저가/중앙값/최저가를 마지막으로
+본 시각을 알림마다 이력을 훑지 않고 바로 구할 수 있습니다.
+가격은 적재 단계에서 해석한 price_value(normalize.extract_numeric_price)를 사용합니다.
+"""
+import bisect
+import heapq
+import re
+
+from dealstore import NO_TIMESTAMP
+
+WINDOW_MONTHS = 6
+WINDOW_MINUTES = WINDOW_MONTHS * 30 * 24 * 60  # 30일/월
+
+_TAG_PATTERN = re.compile(r'\[[^\]]*\]|\([^)]*\)|\{[^}]*\}')
+_TOKEN_PATTERN = re.compile(r'[가-힣a-z0-9]+(?:\.[0-9]+)?')
+# 가격/할인 표기 ("12,900원", "15%", "무료배송")는 같은 상품이라도 달라지므로 키에서 제외
+_PRICE_TOKEN = re.compile(r'^\d[\d,.]*(?:원|만원)?$|^\d+%$|^(?:무료배송|무배|무료)$')
+
+
+def title_key(title: str) -> str:
+    """가격 이력을 묶는 제목 키. 같은 상품의 다른 게시글이 같은 키가 되도록 정규화합니다."""
+    text = _TAG_PATTERN.sub(' ', title.lower()).replace(',', '')
+    tokens = {token for token in _TOKEN_PATTERN.findall(text) if not _PRICE_TOKEN.match(token)}
+    return ' '.join(sorted(tokens))
+
+
+class PriceStats:
+    """
+    한 제목 키의 가격 집계.
+
+    (가격, -등록 시각) 순으로 정렬해 두므로 첫 항목이 최저가이면서 그 가격을 가장 최근에 본 시각입니다.
+    """
+
+    __slots__ = ("_entries",)
+
+    def __init__(self):
+        self._entries: list[tuple[float, int]] = []
+
+    def add(self, price: float, minute: int):
+        bisect.insort(self._entries, (price, -minute))
+
+    def remove(self, price: float, minute: int):
+        entries = self._entries
+        pos = bisect.bisect_left(entries, (price, -minute))
+        if pos < len(entries) and entries[pos] == (price, -minute):
+            del entries[pos]
+
+    @property
+    def count(self) -> int:
+        return len(self._entries)
+
+    @property
+    def min_price(self) -> float:
+        return self._entries[0][0]
+
+    @property
+    def last_low_minute(self) -> int:
+        """최저가를 마지막으로 본 시각 (epoch 분)."""
+        return -self._entries[0][1]
+
+    @property
+    def median(self) -> float:
+        entries = self._entries
+        middle = len(entries) // 2
+        if len(entries) % 2:
+            return entries[middle][0]
+        return (entries[middle - 1][0] + entries[middle][0]) / 2
+
+    def __repr__(self):
+        return f"PriceStats(count={self.count}, min={self.min_price}, median={self.median})"
+
+
+class PriceHistory:
+    """
+    스냅샷 위치를 문서 id로 사용하는 가격 이력 집계. 항목은 DealView입니다.
+
+    기간은 지금까지 본 가장 최근 등록 시각을 기준으로 계산하며, 기간을 벗어난 가격은
+    등록 시각 순 heap에서 꺼내 해당 키의 집계에서 제거합니다.
+    이후 스냅샷과 공유되므로 집계는 항상 가장 최근 스냅샷 기준입니다.
+    """
+
+    def __init__(self, window_minutes: int = WINDOW_MINUTES):
+        self.window_minutes = window_minutes
+        self._size = 0
+        self._stats: dict[str, PriceStats] = {}
+        self._expiry: list[tuple[int, str, float]] = []
+        self._latest_minute = NO_TIMESTAMP
+
+    def __len__(self):
+        return self._size
+
+    @classmethod
+    def build(cls, items, window_minutes: int = WINDOW_MINUTES) -> "PriceHistory":
+        history = cls(window_minutes)
+        history.extend(items)
+        return history
+
+    def extend(self, items):
+        """items 중 아직 집계되지 않은 뒤쪽 항목만 추가합니다."""
+        for doc_id in range(self._size, len(items)):
+            item = items[doc_id]
+            price = item.price_value
+            minute = item.minute
+            if price is None or minute == NO_TIMESTAMP or not item.title:
+                continue
+            if minute <= self._latest_minute - self.window_minutes:
+                continue
+            key = title_key(item.title)
+            if not key:
+                continue
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = PriceStats()
+            stats.add(price, minute)
+            heapq.heappush(self._expiry, (minute, key, price))
+            if minute > self._latest_minute:
+                self._latest_minute = minute
+        self._size = len(items)
+        self._expire()
+
+    def _expire(self):
+        cutoff = self._latest_minute - self.window_minutes
+        expiry = self._expiry
+        while expiry and expiry[0][0] <= cutoff:
+            minute, key, price = heapq.heappop(expiry)
+            stats = self._stats[key]
+            stats.remove(price, minute)
+            if not stats.count:
+                del self._stats[key]
+
+    def lookup(self, title: str) -> PriceStats | None:
+        """title과 같은 키의 집계. 기간 내 가격이 없으면 None."""
+        return self._stats.get(title_key(title))
+
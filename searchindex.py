@@ -0,0 +1,123 @@
+"""
+/검색용 역색인.
+
+제목을 소문자로 바꾼 뒤 문자 1-gram/2-gram 색인과 공백 단위 토큰 색인을 만듭니다.
+한국어는 띄어쓰기 단위와 검색어가 일치하지 않는 경우가 많으므로 부분 문자열 검색은
+n-gram 색인으로 후보를 좁히고, 최종 판정은 기존과 동일하게 `키워드.lower() in 제목.lower()`로 합니다.
+"""
+import itertools
+from array import array
+
+
+def sort_key(item: dict) -> int:
+    """기존 search_keyword의 정렬 키와 동일합니다."""
+    return int(item.get('no', 0)) if item.get('no') is not None else 0
+
+
+class SearchIndex:
+    """
+    스냅샷 위치(position)를 문서 id로 사용하는 검색 색인.
+
+    모든 posting은 (no 오름차순, 위치 내림차순) 순서로 저장되므로, 뒤집기만 하면
+    기존 `data.sort(key=no, reverse=True)`와 같은 순서의 결과를 얻습니다.
+    새 항목은 extend()로 색인에 덧붙이며 전체를 다시 만들지 않습니다.
+    """
+
+    def __init__(self):
+        self._titles: list[str] = []
+        self._keys: list[int] = []
+        self._order = array('i')
+        self._grams: dict[str, array] = {}
+        self._tokens: dict[str, array] = {}
+        self._last_rank: tuple | None = None
+        self._ordered = True
+
+    def __len__(self):
+        return len(self._titles)
+
+    @classmethod
+    def build(cls, items) -> "SearchIndex":
+        index = cls()
+        index.extend(items)
+        return index
+
+    def extend(self, items):
+        """
+        items 중 아직 색인되지 않은 뒤쪽 항목만 색인에 추가합니다.
+
+        Args:
+            items: 스냅샷 항목 시퀀스. 앞쪽 len(self)개는 이미 색인된 것과 같아야 합니다.
+        """
+        start = len(self._titles)
+        new_ids = range(start, len(items))
+        for i in new_ids:
+            item = items[i]
+            self._titles.append(item.get("title", "").lower())
+            self._keys.append(sort_key(item))
+
+        for i in sorted(new_ids, key=lambda i: (self._keys[i], -i)):
+            rank = (self._keys[i], -i)
+            if self._last_rank is not None and rank < self._last_rank:
+                # 번호가 뒤섞인 채로 들어오면 검색 시 결과만 정렬함
+                self._ordered = False
+            self._last_rank = rank
+            self._add(i, self._titles[i])
+
+    def _add(self, doc_id: int, title: str):
+        self._order.append(doc_id)
+        grams = set(title)
+        grams.update(title[j:j + 2] for j in range(len(title) - 1))
+        for gram in grams:
+            posting = self._grams.get(gram)
+            if posting is None:
+                posting = self._grams[gram] = array('i')
+            posting.append(doc_id)
+        for token in set(title.split()):
+            posting = self._tokens.get(token)
+            if posting is None:
+                posting = self._tokens[token] = array('i')
+            posting.append(doc_id)
+
+    def _candidates(self, query: str):
+        """query를 포함할 수 있는 문서의 posting 중 가장 짧은 것을 반환합니다."""
+        if len(query) == 1:
+            return self._grams.get(query, ())
+
+        postings = []
+        for j in range(len(query) - 1):
+            posting = self._grams.get(query[j:j + 2])
+            if posting is None:
+                return ()
+            postings.append(posting)
+
+        # 'a b c' 형태의 검색어에서 가운데 단어는 제목에서도 온전한 토큰이어야 함
+        for piece in query.split(' ')[1:-1]:
+            if piece and piece.split() == [piece]:
+                posting = self._tokens.get(piece)
+                if posting is None:
+                    return ()
+                postings.append(posting)
+
+        return min(postings, key=len)
+
+    def search(self, keyword: str, size: int | None = None, limit: int | None = None) -> list[int]:
+        """
+        keyword를 제목에 포함하는 항목의 위치를 no 내림차순으로 반환합니다.
+
+        Args:
+            keyword (str): 검색어 (대소문자 구분 없음).
+            size (int | None): 이 값 미만의 위치만 반환합니다. 색인이 더 최신 스냅샷까지
+                               확장된 경우에도 이전 스냅샷의 범위로 결과를 제한할 때 사용합니다.
+            limit (int | None): 최대 결과 수. 앞쪽(최신) 결과를 찾는 즉시 탐색을 멈춥니다.
+        """
+        query = keyword.lower()
+        if size is None:
+            size = len(self._titles)
+        candidates = self._candidates(query) if query else self._order
+
+        titles = self._titles
+        matches = (i for i in reversed(candidates) if i < size and query in titles[i])
+        if not self._ordered:
+            keys = self._keys
+            return sorted(matches, key=lambda i: (keys[i], -i), reverse=True)[:limit]
+        return list(itertools.islice(matches, limit))
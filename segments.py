@@ -0,0 +1,253 @@
+"""
+세그먼트 단위 핫딜 저장소.
+
+하나의 hotdeal.json을 매번 통째로 다시 쓰는 대신, DAG 실행마다 새 항목만 담은
+변경되지 않는(immutable) 세그먼트(dealcodec 바이너리 형식)를 하나씩 추가하고, 세그먼트 목록과 최대 no를
+작은 manifest.json에 기록합니다. 세그먼트를 먼저 쓰고 manifest를 마지막에 교체하므로
+읽는 쪽은 항상 완성된 세그먼트만 보게 됩니다.
+
+저장 위치는 백엔드로 분리되어 있어 GCS 없이 로컬 디렉터리만으로도 전체 파이프라인을 실행할 수 있습니다.
+"""
+import datetime
+import json
+import os
+import tempfile
+
+import dealcodec
+
+MANIFEST_NAME = "manifest.json"
+SEGMENT_DIR = "segments"
+MANIFEST_VERSION = 1
+# 한 번에 많은 항목을 옮길 때(이전 형식에서 옮기기 등) 세그먼트 하나에 담는 최대 항목 수.
+# 봇은 세그먼트를 하나씩 내려받아 해석하므로 이 크기가 시작 시 최대 메모리 사용량을 정함
+MAX_SEGMENT_ITEMS = 50_000
+
+
+class LocalBackend:
+    """로컬 디렉터리를 저장소로 사용합니다. (오프라인 테스트/개발용)"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, *name.split("/"))
+
+    def version(self, name: str) -> int | None:
+        """파일 수정 시각(ns)을 버전으로 사용합니다. 파일이 없으면 None."""
+        try:
+            return os.stat(self._path(name)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def read(self, name: str) -> bytes | None:
+        try:
+            with open(self._path(name), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def open(self, name: str):
+        return open(self._path(name), "rb")
+
+    def write(self, name: str, data: bytes, content_type: str = "application/octet-stream"):
+        """임시 파일에 쓴 뒤 교체하므로 읽는 쪽이 쓰다 만 파일을 보지 않습니다."""
+        path = self._path(name)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+class GCSBackend:
+    """Google Cloud Storage 버킷의 prefix 아래를 저장소로 사용합니다."""
+
+    def __init__(self, bucket_name: str, prefix: str = "", client=None):
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+        self._client = client
+        self._bucket = None
+
+    def _blob(self, name: str):
+        if self._bucket is None:
+            if self._client is None:
+                from google.cloud import storage
+                self._client = storage.Client()
+            self._bucket = self._client.bucket(self.bucket_name)
+        return self._bucket.blob(self.prefix + name)
+
+    def version(self, name: str) -> int | None:
+        """blob의 generation을 반환합니다. (본문은 내려받지 않음)"""
+        from google.api_core.exceptions import NotFound
+        blob = self._blob(name)
+        try:
+            blob.reload()
+        except NotFound:
+            return None
+        return blob.generation
+
+    def read(self, name: str) -> bytes | None:
+        from google.api_core.exceptions import NotFound
+        try:
+            return self._blob(name).download_as_bytes()
+        except NotFound:
+            return None
+
+    def open(self, name: str):
+        return self._blob(name).open("rb")
+
+    def write(self, name: str, data: bytes, content_type: str = "application/octet-stream"):
+        self._blob(name).upload_from_string(data, content_type=content_type)
+
+
+class Manifest:
+    """세그먼트 목록과 지금까지 부여된 최대 no."""
+
+    __slots__ = ("max_no", "segments")
+
+    def __init__(self, max_no: int = 0, segments: list[dict] | None = None):
+        self.max_no = max_no
+        # 각 세그먼트: {"name", "first_no", "last_no", "count", "created_at"}
+        self.segments = segments if segments is not None else []
+
+    @property
+    def segment_names(self) -> list[str]:
+        return [segment["name"] for segment in self.segments]
+
+    def to_bytes(self) -> bytes:
+        return json.dumps({
+            "version": MANIFEST_VERSION,
+            "max_no": self.max_no,
+            "segments": self.segments,
+        }, ensure_ascii=False).encode("utf-8")
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Manifest":
+        manifest = json.loads(data)
+        if manifest.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"지원하지 않는 manifest 버전입니다: {manifest.get('version')}")
+        return cls(manifest["max_no"], manifest["segments"])
+
+
+def segment_name(created_at: datetime.datetime, first_no: int) -> str:
+    """날짜별 디렉터리 아래에 생성 시각과 첫 no로 구분되는 세그먼트 이름을 만듭니다."""
+    return f"{SEGMENT_DIR}/{created_at:%Y%m%d}/{created_at:%H%M%S}-{first_no:09d}.moad"
+
+
+class SegmentStore:
+    """
+    manifest와 세그먼트를 읽고 쓰는 저장소.
+
+    쓰기는 DAG 한 곳에서만 한다고 가정합니다. (DAG의 max_active_runs=1)
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def manifest_version(self) -> int | None:
+        return self.backend.version(MANIFEST_NAME)
+
+    def exists(self) -> bool:
+        return self.manifest_version() is not None
+
+    def load_manifest(self) -> Manifest:
+        """manifest를 불러옵니다. 아직 없으면 빈 manifest를 반환합니다."""
+        data = self.backend.read(MANIFEST_NAME)
+        if data is None:
+            return Manifest()
+        return Manifest.from_bytes(data)
+
+    def append(self, items: list[dict], manifest: Manifest | None = None,
+               created_at: datetime.datetime | None = None) -> Manifest:
+        """
+        items에 manifest의 최대 no 다음부터 번호를 붙여 새 세그먼트로 저장합니다.
+
+        Args:
+            items (list[dict]): 새 항목. 'no' 필드는 이 함수에서 부여합니다.
+            manifest (Manifest | None): 이미 불러온 manifest. 없으면 새로 불러옵니다.
+            created_at (datetime | None): 세그먼트 생성 시각 (기본값: 현재 UTC 시각).
+
+        Returns:
+            Manifest: 새 세그먼트가 반영된 manifest. items가 비어 있으면 기존 manifest를 그대로 반환합니다.
+        """
+        if manifest is None:
+            manifest = self.load_manifest()
+        if not items:
+            return manifest
+        if created_at is None:
+            created_at = datetime.datetime.now(datetime.timezone.utc)
+
+        segment = self._write_segment(items, manifest.max_no + 1, created_at)
+        # 세그먼트가 저장된 뒤에 manifest를 교체 (manifest가 곧 커밋 지점)
+        return self._commit(manifest, [segment])
+
+    def append_stream(self, items, manifest: Manifest | None = None,
+                      created_at: datetime.datetime | None = None,
+                      segment_items: int = MAX_SEGMENT_ITEMS) -> Manifest:
+        """
+        많은 항목을 segment_items개씩 나누어 여러 세그먼트로 저장합니다.
+
+        items는 하나씩 읽으므로 전체를 메모리에 올리지 않습니다. manifest는 모든 세그먼트를 저장한 뒤
+        한 번만 교체하므로, 도중에 실패하면 저장소는 이전 상태 그대로입니다. (남은 세그먼트는 manifest에 없으므로 읽히지 않음)
+        """
+        if manifest is None:
+            manifest = self.load_manifest()
+        if created_at is None:
+            created_at = datetime.datetime.now(datetime.timezone.utc)
+
+        segments = []
+        next_no = manifest.max_no + 1
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= segment_items:
+                segments.append(self._write_segment(batch, next_no, created_at))
+                next_no += len(batch)
+                batch = []
+        if batch:
+            segments.append(self._write_segment(batch, next_no, created_at))
+        if not segments:
+            return manifest
+        return self._commit(manifest, segments)
+
+    def _write_segment(self, items: list[dict], first_no: int, created_at: datetime.datetime) -> dict:
+        """items에 first_no부터 번호를 붙여 세그먼트로 저장하고 manifest에 넣을 항목을 반환합니다."""
+        for i, item in enumerate(items):
+            item['no'] = first_no + i
+        name = segment_name(created_at, first_no)
+        self.backend.write(name, dealcodec.encode(items))
+        return {
+            "name": name,
+            "first_no": first_no,
+            "last_no": first_no + len(items) - 1,
+            "count": len(items),
+            "created_at": created_at.isoformat(),
+        }
+
+    def _commit(self, manifest: Manifest, segments: list[dict]) -> Manifest:
+        updated = Manifest(segments[-1]["last_no"], manifest.segments + segments)
+        self.backend.write(MANIFEST_NAME, updated.to_bytes(), "application/json")
+        return updated
+
+    def read_segment(self, name: str) -> bytes:
+        """세그먼트 원본을 내려받습니다. (해석은 dealcodec.decode_columns 또는 iter_decode)"""
+        data = self.backend.read(name)
+        if data is None:
+            raise FileNotFoundError(f"manifest에 있는 세그먼트를 찾을 수 없습니다: {name}")
+        return data
+
+    def iter_segment(self, name: str):
+        """세그먼트의 항목을 반환합니다. (이전에 저장된 NDJSON 세그먼트도 읽음)"""
+        yield from dealcodec.iter_decode(self.read_segment(name))
+
+    def iter_items(self, manifest: Manifest | None = None, start: int = 0):
+        """manifest의 start번째 세그먼트부터 모든 항목을 순서대로 반환합니다."""
+        if manifest is None:
+            manifest = self.load_manifest()
+        for segment in manifest.segments[start:]:
+            yield from self.iter_segment(segment["name"])
@@ -0,0 +1,192 @@
+"""
+유사 핫딜 검색용 후보 색인.
+
+스냅샷마다 한 번 만들어 두고 새 항목이 들어오면 덧붙입니다.
+- 정규화된 토큰 집합 (Jaccard 유사도를 정규식 없이 바로 계산)
+- MinHash/LSH 버킷 (Jaccard 후보 검색)
+- 시간순 정렬 배열 (조회 기간의 시작 위치를 이진 탐색으로 찾음)
+Levenshtein 거리는 후보에 대해서만, 임계값을 넘으면 바로 중단하도록 계산합니다.
+"""
+import bisect
+import re
+import zlib
+from array import array
+
+from Levenshtein import distance
+
+from dealstore import NO_TIMESTAMP
+
+LEVENSHTEIN_THRESHOLD = 4
+JACCARD_THRESHOLD = 0.4
+
+MINHASH_BANDS = 20
+MINHASH_ROWS = 2
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# 고정된 계수를 사용해야 다른 프로세스(DAG 등)에서 만든 시그니처와도 비교할 수 있음
+_PERMUTATIONS = [
+    (1 + (zlib.crc32(f"a{i}".encode()) << 16) % (_MERSENNE_PRIME - 1),
+     zlib.crc32(f"b{i}".encode()) << 16)
+    for i in range(MINHASH_BANDS * MINHASH_ROWS)
+]
+
+# 키워드 일치 항목이 이보다 많으면 Jaccard 후보는 LSH 버킷에서만 찾음
+EXACT_SCAN_LIMIT = 5000
+
+_NON_WORD_PATTERN = re.compile(r'[^가-힣a-zA-Z\s]')
+
+
+def normalize_tokens(text: str) -> frozenset:
+    """한글/영문만 남기고 소문자로 바꾼 단어 집합."""
+    return frozenset(_NON_WORD_PATTERN.sub('', text).lower().split())
+
+
+def jaccard(set1: frozenset, set2: frozenset) -> float:
+    if not set1 and not set2:
+        return 1.0
+    if not set1 or not set2:
+        return 0.0
+    intersection = len(set1 & set2)
+    return intersection / (len(set1) + len(set2) - intersection)
+
+
+def jaccard_similarity(s1: str, s2: str) -> float:
+    """두 문자열의 Jaccard 유사도를 계산합니다."""
+    return jaccard(normalize_tokens(s1), normalize_tokens(s2))
+
+
+def minhash_signature(tokens: frozenset) -> tuple:
+    hashes = [zlib.crc32(token.encode("utf-8")) for token in tokens]
+    return tuple(
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def lsh_keys(tokens: frozenset) -> list:
+    """토큰 집합의 LSH 버킷 키 목록. 빈 집합은 하나의 전용 버킷을 사용합니다."""
+    if not tokens:
+        return [(-1, ())]
+    signature = minhash_signature(tokens)
+    return [
+        (band, signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS])
+        for band in range(MINHASH_BANDS)
+    ]
+
+
+def is_similar(title_lower: str, tokens: frozenset, other_lower: str, other_tokens: frozenset) -> bool:
+    """Jaccard 유사도 또는 (제한된) Levenshtein 거리 조건을 만족하는지 확인합니다."""
+    if jaccard(tokens, other_tokens) >= JACCARD_THRESHOLD:
+        return True
+    if abs(len(title_lower) - len(other_lower)) > LEVENSHTEIN_THRESHOLD:
+        return False
+    return distance(title_lower, other_lower, score_cutoff=LEVENSHTEIN_THRESHOLD) <= LEVENSHTEIN_THRESHOLD
+
+
+class SimilarityIndex:
+    """
+    스냅샷 위치를 문서 id로 사용하는 유사도 색인. 항목은 DealView입니다.
+
+    제목 또는 등록 시각이 없는 항목은 기존과 같이 후보에서 제외됩니다.
+    """
+
+    def __init__(self):
+        self._size = 0
+        self._titles: list[str | None] = []
+        self._tokens: list[frozenset | None] = []
+        self._minutes = array('q')
+        self._buckets: dict[tuple, list[int]] = {}
+        self._times = array('q')
+        self._time_ids = array('i')
+
+    def __len__(self):
+        return self._size
+
+    @classmethod
+    def build(cls, items) -> "SimilarityIndex":
+        index = cls()
+        index.extend(items)
+        return index
+
+    def extend(self, items):
+        """items 중 아직 색인되지 않은 뒤쪽 항목만 추가합니다."""
+        for doc_id in range(self._size, len(items)):
+            item = items[doc_id]
+            title = item.title
+            minute = item.minute
+            if not title or minute == NO_TIMESTAMP:
+                self._titles.append(None)
+                self._tokens.append(None)
+                self._minutes.append(NO_TIMESTAMP)
+                continue
+            tokens = normalize_tokens(title)
+            self._titles.append(title.lower())
+            self._tokens.append(tokens)
+            self._minutes.append(minute)
+            for key in lsh_keys(tokens):
+                self._buckets.setdefault(key, []).append(doc_id)
+
+            if not self._times or minute >= self._times[-1]:
+                self._times.append(minute)
+                self._time_ids.append(doc_id)
+            else:
+                pos = bisect.bisect_right(self._times, minute)
+                self._times.insert(pos, minute)
+                self._time_ids.insert(pos, doc_id)
+        self._size = len(items)
+
+    def window(self, since_minute: int, size: int | None = None) -> list[int]:
+        """since_minute 이후의 문서 id 목록 (이진 탐색)."""
+        size = self._size if size is None else size
+        start = bisect.bisect_left(self._times, since_minute)
+        return [doc_id for doc_id in self._time_ids[start:] if doc_id < size]
+
+    def lsh_candidates(self, title: str) -> set[int]:
+        """title과 Jaccard 유사도가 높을 가능성이 있는 문서 id 집합."""
+        candidates = set()
+        for key in lsh_keys(normalize_tokens(title)):
+            candidates.update(self._buckets.get(key, ()))
+        return candidates
+
+    def find(self, title: str, keyword: str, since_minute: int, keyword_hits: list[int],
+             size: int | None = None) -> list[int]:
+        """
+        keyword를 포함하면서 title과 유사한, since_minute 이후 문서 id를 위치 오름차순으로 반환합니다.
+
+        Args:
+            title (str): 기준이 되는 새 핫딜 제목.
+            keyword (str): 유사 핫딜 제목에 반드시 포함되어야 하는 키워드.
+            since_minute (int): 조회 기간의 시작 (epoch 분).
+            keyword_hits (list[int]): SearchIndex.search(keyword) 결과.
+            size (int | None): 이 값 미만의 위치만 반환합니다.
+        """
+        size = self._size if size is None else size
+        title_lower = title.lower()
+        tokens = normalize_tokens(title)
+        minutes, titles, token_sets = self._minutes, self._titles, self._tokens
+
+        start = bisect.bisect_left(self._times, since_minute)
+        if len(self._times) - start < len(keyword_hits):
+            # 키워드가 매우 흔하면 기간 내 항목을 직접 훑는 편이 더 적음
+            keyword_lower = keyword.lower()
+            hits = [doc_id for doc_id in self.window(since_minute, size) if keyword_lower in titles[doc_id]]
+        else:
+            hits = [doc_id for doc_id in keyword_hits
+                    if doc_id < size and minutes[doc_id] >= since_minute]
+
+        if len(hits) <= EXACT_SCAN_LIMIT:
+            similar = [doc_id for doc_id in hits
+                       if is_similar(title_lower, tokens, titles[doc_id], token_sets[doc_id])]
+        else:
+            # Jaccard 후보는 LSH 버킷에서, Levenshtein 후보는 길이 차이로 걸러서 찾음
+            accepted = {doc_id for doc_id in self.lsh_candidates(title).intersection(hits)
+                        if jaccard(tokens, token_sets[doc_id]) >= JACCARD_THRESHOLD}
+            similar = list(accepted)
+            similar.extend(
+                doc_id for doc_id in hits
+                if doc_id not in accepted
+                and abs(len(title_lower) - len(titles[doc_id])) <= LEVENSHTEIN_THRESHOLD
+                and distance(title_lower, titles[doc_id], score_cutoff=LEVENSHTEIN_THRESHOLD) <= LEVENSHTEIN_THRESHOLD
+            )
+        similar.sort()
+        return similar
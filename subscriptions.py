@@ -0,0 +1,177 @@
+"""
+스캔 구독 저장소.
+
+구독(사용자, 키워드)과 각 구독의 watermark, 중복 방지 상태를 SQLite(WAL 모드)에 기록합니다.
+봇이 재시작되면 한 번의 조회로 모두 불러와 멈춘 지점부터 스캔을 이어갑니다.
+메모리에는 사용자별 구독과 함께 정규화된 키워드 -> 구독자 역색인을 유지합니다.
+"""
+import asyncio
+import datetime
+import sqlite3
+import threading
+
+from dedupe import SeenWindow
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscriptions (
+    user_id    INTEGER NOT NULL,
+    keyword    TEXT    NOT NULL,
+    start_time TEXT    NOT NULL,
+    watermark  INTEGER NOT NULL DEFAULT 0,
+    seen       BLOB,
+    PRIMARY KEY (user_id, keyword)
+)
+"""
+
+
+class Subscription:
+    """사용자 한 명의 키워드 하나에 대한 스캔 상태."""
+
+    __slots__ = ("user_id", "keyword", "start_time", "watermark", "recent_titles")
+
+    def __init__(self, user_id: int, keyword: str, start_time: datetime.datetime,
+                 watermark: int = 0, recent_titles: SeenWindow | None = None):
+        self.user_id = user_id
+        self.keyword = keyword
+        self.start_time = start_time
+        self.watermark = watermark
+        self.recent_titles = recent_titles if recent_titles is not None else SeenWindow()
+
+    @property
+    def normalized_keyword(self) -> str:
+        return self.keyword.lower()
+
+
+class SubscriptionStore:
+    """
+    구독 정보를 SQLite에 즉시 기록(write-through)하는 저장소.
+
+    조회는 모두 메모리에서 처리하며, subscribers()는 정규화된 키워드로 구독자를 O(1)에 찾습니다.
+    변경 메서드는 SQLite 기록만 작업 스레드에서 실행하고 메모리 색인은 호출한 이벤트 루프에서 갱신하므로
+    스캔 주기가 색인을 훑는 동안 다른 스레드가 바꾸지 않습니다.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._by_user: dict[int, dict[str, Subscription]] = {}
+        self._by_keyword: dict[str, dict[tuple[int, str], Subscription]] = {}
+        self._load()
+
+    def _load(self):
+        """모든 구독을 한 번의 조회로 불러옵니다."""
+        rows = self._conn.execute(
+            "SELECT user_id, keyword, start_time, watermark, seen FROM subscriptions"
+        ).fetchall()
+        for user_id, keyword, start_time, watermark, seen in rows:
+            self._index(Subscription(
+                user_id, keyword, datetime.datetime.fromisoformat(start_time),
+                watermark, SeenWindow.from_bytes(seen),
+            ))
+        print(f"구독 {len(rows)}개를 불러왔습니다. ({self.path})")
+
+    def _index(self, subscription: Subscription):
+        self._by_user.setdefault(subscription.user_id, {})[subscription.keyword] = subscription
+        self._by_keyword.setdefault(subscription.normalized_keyword, {})[
+            (subscription.user_id, subscription.keyword)] = subscription
+
+    def _unindex(self, subscription: Subscription):
+        user_subscriptions = self._by_user.get(subscription.user_id, {})
+        user_subscriptions.pop(subscription.keyword, None)
+        if not user_subscriptions:
+            self._by_user.pop(subscription.user_id, None)
+        subscribers = self._by_keyword.get(subscription.normalized_keyword, {})
+        subscribers.pop((subscription.user_id, subscription.keyword), None)
+        if not subscribers:
+            self._by_keyword.pop(subscription.normalized_keyword, None)
+
+    def __len__(self):
+        return sum(len(keywords) for keywords in self._by_user.values())
+
+    def get(self, user_id: int, keyword: str) -> Subscription | None:
+        return self._by_user.get(user_id, {}).get(keyword)
+
+    def get_user(self, user_id: int) -> dict[str, Subscription]:
+        """사용자의 구독을 키워드 -> Subscription 형태로 반환합니다. (복사본)"""
+        return dict(self._by_user.get(user_id, {}))
+
+    def all(self) -> list[Subscription]:
+        return [subscription for keywords in self._by_user.values() for subscription in keywords.values()]
+
+    def keywords(self) -> frozenset:
+        """현재 구독 중인 정규화된 키워드 집합."""
+        return frozenset(self._by_keyword)
+
+    def subscribers(self, normalized_keyword: str) -> list[Subscription]:
+        return list(self._by_keyword.get(normalized_keyword, {}).values())
+
+    async def add(self, user_id: int, keyword: str, start_time: datetime.datetime, watermark: int) -> Subscription:
+        await asyncio.to_thread(self._execute,
+                                "INSERT OR REPLACE INTO subscriptions (user_id, keyword, start_time, watermark, seen) "
+                                "VALUES (?, ?, ?, ?, ?)",
+                                (user_id, keyword, start_time.isoformat(), watermark, b""))
+        subscription = Subscription(user_id, keyword, start_time, watermark)
+        self._index(subscription)
+        return subscription
+
+    async def remove(self, user_id: int, keyword: str) -> bool:
+        subscription = self.get(user_id, keyword)
+        if subscription is None:
+            return False
+        await asyncio.to_thread(self._execute, "DELETE FROM subscriptions WHERE user_id = ? AND keyword = ?",
+                                (user_id, keyword))
+        self._unindex(subscription)
+        return True
+
+    async def remove_user(self, user_id: int) -> bool:
+        subscriptions = self._by_user.get(user_id)
+        if not subscriptions:
+            return False
+        await asyncio.to_thread(self._execute, "DELETE FROM subscriptions WHERE user_id = ?", (user_id,))
+        for subscription in list(self._by_user.get(user_id, {}).values()):
+            self._unindex(subscription)
+        return True
+
+    async def save_progress(self, subscriptions, watermark: int | None = None):
+        """
+        스캔 주기가 끝난 뒤 진행 상태를 한 트랜잭션으로 기록합니다.
+
+        구독의 중복 방지 상태는 이벤트 루프에서만 바뀌므로 기록할 행은 여기(루프)에서 만들고,
+        완성된 행 목록만 작업 스레드에 넘겨 SQLite에 씁니다.
+
+        Args:
+            subscriptions: 중복 방지 상태가 바뀐 구독 목록. 이 구독들은 각자의 watermark를 그대로 기록하므로
+                처리에 실패해 watermark를 올리지 않은 구독도 여기에 넣으면 다음 주기에 다시 확인합니다.
+            watermark (int | None): 주어지면 subscriptions에 없는 구독의 watermark를 이 값까지 올립니다.
+        """
+        rows = [(s.watermark, s.recent_titles.to_bytes(), s.user_id, s.keyword) for s in subscriptions]
+        await asyncio.to_thread(self._write_progress, rows, watermark)
+
+    def _execute(self, sql: str, parameters: tuple):
+        with self._lock:
+            self._conn.execute(sql, parameters)
+
+    def _write_progress(self, rows: list[tuple], watermark: int | None):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                if watermark is not None:
+                    self._conn.execute(
+                        "UPDATE subscriptions SET watermark = ? WHERE watermark < ?", (watermark, watermark)
+                    )
+                # 구독별 행을 나중에 써서 일괄 갱신보다 우선하도록 함
+                self._conn.executemany(
+                    "UPDATE subscriptions SET watermark = ?, seen = ? WHERE user_id = ? AND keyword = ?", rows
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 봇/DAG와 같이 저장소 루트의 모듈을 바로 불러옴
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,119 @@
+import json
+import struct
+import zlib
+from array import array
+
+import clusters
+from clusters import CLUSTERS_NAME, NO_CLUSTER, ClusterMembership, ClusterState, ClusterStore
+from segments import LocalBackend
+
+TITLES = ["농심 신라면 120g 20개", "농심 신라면 120g 40개", "삼다수 2L 12병", None, "삼다수 2L 24병",
+          "애플 에어팟 프로 2세대 USB-C", "농심 신라면 120g 20개 무료배송"]
+
+
+def assign_all(state, titles, first_no=1):
+    for offset, title in enumerate(titles):
+        state.assign(first_no + offset, title, 1000 + offset)
+
+
+def full_assignments(backend):
+    membership = ClusterMembership.load(backend)
+    return list(membership.assignments)
+
+
+def test_save_and_load_in_parts(tmp_path, monkeypatch):
+    monkeypatch.setattr(clusters, "PART_ITEMS", 3)
+    backend = LocalBackend(str(tmp_path))
+    store = ClusterStore(backend)
+    state = ClusterState()
+    assign_all(state, TITLES)
+    expected = list(state.assignments)
+    head = store.save(state)
+    assert [(part["first_no"], part["last_no"]) for part in head.parts] == [(1, 3), (4, 6), (7, 7)]
+    assert full_assignments(backend) == expected
+
+    # 다 채워진 part는 불러오지 않고 마지막 part부터 이어서 배정
+    loaded = store.load_state()
+    assert (loaded.first_no, list(loaded.assignments)) == (7, expected[6:])
+    assert loaded.reps == state.reps
+    loaded.assign(8, "삼다수 2L 6병", 2000)
+    store.save(loaded)
+    assert full_assignments(backend) == expected + [loaded.assignments[-1]]
+
+
+def test_membership_extends_previous(tmp_path, monkeypatch):
+    monkeypatch.setattr(clusters, "PART_ITEMS", 3)
+    backend = LocalBackend(str(tmp_path))
+    store = ClusterStore(backend)
+    state = ClusterState()
+    assign_all(state, TITLES[:4])
+    store.save(state)
+    previous = ClusterMembership.load(backend)
+    first = previous.cluster_of(1)
+    assert previous.members(first) == [1, 2]
+
+    state = store.load_state()
+    assign_all(state, TITLES[4:], first_no=5)
+    store.save(state)
+    reads = []
+    original = ClusterStore.read_part
+    monkeypatch.setattr(ClusterStore, "read_part", lambda self, part: reads.append(part["first_no"]) or
+                        original(self, part))
+    membership = ClusterMembership.load(backend, previous)
+    assert membership is previous
+    assert reads == [4, 7]  # 이전에 다 읽은 part(1~3)는 내려받지 않음
+    assert membership.item_count == len(TITLES)
+    assert membership.members(first) == [1, 2, 7]
+    assert membership.cluster_of(4) is None
+
+
+def test_reclustered_epoch_rebuilds_membership(tmp_path):
+    backend = LocalBackend(str(tmp_path))
+    store = ClusterStore(backend)
+    state = ClusterState()
+    assign_all(state, TITLES)
+    store.save(state)
+    previous = ClusterMembership.load(backend)
+
+    state = ClusterState()
+    assign_all(state, TITLES[:2])
+    store.save(state)
+    membership = ClusterMembership.load(backend, previous)
+    assert membership is not previous
+    assert membership.item_count == 2
+
+
+def test_part_written_without_head_is_ignored(tmp_path):
+    backend = LocalBackend(str(tmp_path))
+    store = ClusterStore(backend)
+    state = ClusterState()
+    assign_all(state, TITLES[:3])
+    head = store.save(state)
+
+    # part만 다시 쓰고 클러스터 파일을 교체하기 전에 중단된 경우
+    state = store.load_state()
+    assign_all(state, TITLES[3:], first_no=4)
+    backend.write(head.parts[-1]["name"], zlib.compress(state.assignments.tobytes()))
+    assert ClusterMembership.load(backend).item_count == 3
+    assert store.load_state().item_count == 3
+
+
+def test_legacy_file_is_read_and_migrated(tmp_path):
+    backend = LocalBackend(str(tmp_path))
+    assignments = array('I', [1, 1, 3, NO_CLUSTER])
+    membership_section = zlib.compress(assignments.tobytes())
+    reps = zlib.compress(json.dumps([[1, 1000, "농심 신라면"], [3, 1002, "삼다수"]]).encode("utf-8"))
+    header = struct.pack("<4sBQII", b"MOAC", 1, len(assignments), len(membership_section), len(reps))
+    backend.write(CLUSTERS_NAME, header + membership_section + reps)
+
+    membership = ClusterMembership.load(backend)
+    assert list(membership.assignments) == list(assignments)
+    assert membership.members(1) == [1, 2]
+
+    store = ClusterStore(backend)
+    state = store.load_state()
+    assert state.item_count == 4
+    assert state.reps == {1: ["농심 신라면", 1000], 3: ["삼다수", 1002]}
+    state.assign(5, "농심 신라면", 1003)
+    store.save(state)
+    assert full_assignments(backend) == [1, 1, 3, NO_CLUSTER, 1]
@@ -0,0 +1,34 @@
+import json
+
+import convert
+
+
+def write_ndjson(path, items):
+    path.write_text("".join(json.dumps(item, ensure_ascii=False) + "\n" for item in items), encoding="utf-8")
+
+
+def test_sort_no_treats_missing_and_non_int_as_zero():
+    assert [convert.sort_no(item) for item in [{"no": 3}, {}, {"no": None}, {"no": "7"}, {"no": 1.5}]] == \
+        [3, 0, 0, 0, 0]
+
+
+def test_external_sort_with_null_no(tmp_path):
+    items = [{"no": 3, "title": "c"}, {"no": None, "title": "null"}, {"title": "missing"},
+             {"no": 1, "title": "a"}, {"no": "2", "title": "text"}]
+    write_ndjson(tmp_path / "input.ndjson", items)
+    for chunk_records in (100, 2):
+        records, stats = convert.external_sort([str(tmp_path / "input.ndjson")], str(tmp_path),
+                                               chunk_records=chunk_records)
+        assert [item["title"] for item in records] == ["null", "missing", "text", "a", "c"]
+        assert (stats.count, stats.min_no, stats.max_no) == (5, 1, 3)
+
+
+def test_convert_sort_reverse_keeps_non_int_no(tmp_path):
+    items = [{"no": 1, "title": "a"}, {"no": None, "title": "null"}, {"no": 3, "title": "c"}]
+    write_ndjson(tmp_path / "input.ndjson", items)
+    output = tmp_path / "output.ndjson"
+    count = convert.convert([str(tmp_path / "input.ndjson")], str(output), sort=True, reverse=True,
+                            chunk_records=2, tmp_dir=str(tmp_path))
+    assert count == 3
+    result = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert result == [{"no": 1, "title": "c"}, {"no": 3, "title": "a"}, {"no": None, "title": "null"}]
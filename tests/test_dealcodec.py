@@ -0,0 +1,148 @@
+import json
+import struct
+import zlib
+
+import pytest
+
+import dealcodec
+from dealstore import DealStore
+
+
+def roundtrip(items):
+    return dealcodec.decode(dealcodec.encode(items))
+
+
+def test_roundtrip_normalized_items():
+    items = [
+        {"title": "[쿠팡] 농심 신라면 (12,000원)", "price": "12,000원", "link": "https://www.algumon.com/l/d/1",
+         "timestamp": "2025/01/01-09:00", "timestamp_epoch": 1735689600, "price_value": 12000.0, "no": 1},
+        {"title": "삼다수 2L 12병", "price": "9,900원", "link": "https://www.algumon.com/l/d/2",
+         "timestamp": "2025/01/01-09:02", "timestamp_epoch": 1735689720, "price_value": 9900.0, "no": 2},
+    ]
+    assert roundtrip(items) == items
+
+
+def test_roundtrip_mixed_types_keep_value_types():
+    items = [{"value": 1}, {"value": 1.5}, {"value": "1"}, {"value": 2 ** 70}]
+    decoded = roundtrip(items)
+    assert decoded == items
+    assert [type(item["value"]) for item in decoded] == [int, float, str, int]
+
+
+def test_roundtrip_bool_is_not_int():
+    items = [{"flag": True, "no": 1}, {"flag": False, "no": 2}]
+    decoded = roundtrip(items)
+    assert decoded == items
+    assert all(type(item["flag"]) is bool for item in decoded)
+
+
+def test_roundtrip_none_is_kept_separate_from_missing():
+    items = [{"no": 1, "price_value": None}, {"no": 2}, {"no": 3, "price_value": 100.0}]
+    decoded = roundtrip(items)
+    assert decoded == items
+    assert "price_value" in decoded[0] and "price_value" not in decoded[1]
+
+
+def test_roundtrip_missing_fields():
+    items = [{"no": 1, "title": "a"}, {"no": 2, "link": "b"}, {}, {"no": 4, "title": "d", "link": "e"}]
+    assert roundtrip(items) == items
+
+
+def test_roundtrip_nested_values():
+    items = [{"no": 1, "tags": ["무료배송", "카드할인"], "meta": {"shop": "G마켓", "rank": [1, 2.5, None]}},
+             {"no": 2, "tags": [], "meta": {}}]
+    assert roundtrip(items) == items
+
+
+def test_roundtrip_empty():
+    assert roundtrip([]) == []
+    assert roundtrip([{}, {}]) == [{}, {}]
+
+
+def test_legacy_json_array():
+    items = [{"title": "가", "no": 1}, {"title": "나", "no": 2}]
+    data = json.dumps(items, ensure_ascii=False, indent=4).encode("utf-8")
+    assert dealcodec.decode(data) == items
+    assert dealcodec.decode(b"\xef\xbb\xbf" + data) == items
+
+
+def test_legacy_ndjson():
+    items = [{"title": "가", "no": 1}, {"title": "나", "no": 2}]
+    data = "\n".join(json.dumps(item, ensure_ascii=False) for item in items).encode("utf-8") + b"\n\n"
+    assert dealcodec.decode(data) == items
+    assert list(dealcodec.iter_decode(data)) == items
+
+
+def test_corrupted_payload_is_rejected():
+    data = bytearray(dealcodec.encode([{"title": "가", "no": 1}]))
+    data[-1] ^= 0xFF
+    with pytest.raises(ValueError, match="체크섬"):
+        dealcodec.decode(bytes(data))
+
+
+def test_truncated_payload_is_rejected():
+    data = dealcodec.encode([{"title": "가", "no": 1}])
+    with pytest.raises(ValueError):
+        dealcodec.decode(data[:-3])
+
+
+def test_truncated_header_is_rejected():
+    with pytest.raises(ValueError, match="헤더"):
+        dealcodec.decode(dealcodec.MAGIC + b"\x01\x00")
+
+
+def test_unknown_version_is_rejected():
+    data = bytearray(dealcodec.encode([{"no": 1}]))
+    data[len(dealcodec.MAGIC)] = dealcodec.FORMAT_VERSION + 1
+    with pytest.raises(ValueError, match="버전"):
+        dealcodec.decode(bytes(data))
+
+
+def test_column_count_mismatch_is_rejected():
+    # 체크섬은 맞지만 헤더의 항목 수가 열과 다른 경우
+    data = dealcodec.encode([{"no": 1}, {"no": 2}])
+    payload = data[struct.calcsize("<4sBBHIII"):]
+    header = struct.pack("<4sBBHIII", dealcodec.MAGIC, dealcodec.FORMAT_VERSION, 0, 0, 3,
+                         zlib.crc32(payload), len(payload))
+    with pytest.raises(ValueError):
+        dealcodec.decode(header + payload)
+
+
+def test_decode_columns_marks_missing_fields():
+    count, columns = dealcodec.decode_columns(dealcodec.encode([{"no": 1, "title": "a"}, {"no": 2}]))
+    assert count == 2
+    assert columns["no"] == [1, 2]
+    assert columns["title"] == ["a", dealcodec.MISSING]
+    with pytest.raises(ValueError):
+        dealcodec.decode_columns(b'[{"no": 1}]')
+
+
+def _store_state(store):
+    size = len(store)
+    return (list(store.nos), list(store.minutes), [repr(price) for price in store.prices],
+            [store.titles[i] for i in range(size)], [store.links[i] for i in range(size)],
+            [store.price_texts[i] for i in range(size)], store._raw_timestamps, store._missing)
+
+
+@pytest.mark.parametrize("items", [
+    [
+        {"title": "가", "price": "1,000원", "link": "l1", "timestamp": "2025/01/01-09:00",
+         "timestamp_epoch": 1735689600, "price_value": 1000.0, "no": 1},
+        {"title": "나", "price": "2,000원", "link": "l2", "timestamp": "2025/01/01-09:01",
+         "timestamp_epoch": 1735689660, "price_value": 2000.0, "no": 2},
+    ],
+    [
+        # 정규화 이전 항목, 값이 없거나 None인 필드, 파싱할 수 없는 시각이 섞인 경우
+        {"title": "가", "price": "1,000원", "link": "l1", "timestamp": "2025/01/01-09:00", "no": 1},
+        {"title": None, "price": "가격 정보 없음", "timestamp": "방금 전", "no": 2},
+        {"link": "l3", "timestamp_epoch": None, "price_value": None, "no": None},
+        {"title": "라", "price": "3,000원", "timestamp_epoch": 1735689720, "price_value": 3000, "no": 4},
+    ],
+    [{}, {}],
+])
+def test_extend_columns_matches_append(items, capsys):
+    by_item = DealStore()
+    by_item.extend(items)
+    by_column = DealStore()
+    by_column.extend_columns(*dealcodec.decode_columns(dealcodec.encode(items)))
+    assert _store_state(by_column) == _store_state(by_item)
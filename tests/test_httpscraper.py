@@ -0,0 +1,76 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("lxml")
+
+import lxml.html  # noqa: E402
+
+from httpscraper import ListParseError, _inner_text, parse_list_page  # noqa: E402
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+FIXTURE_URL = "https://www.algumon.com/"
+
+
+def fixture_names():
+    return sorted(name[:-len(".html")] for name in os.listdir(FIXTURE_DIR) if name.endswith(".html"))
+
+
+@pytest.mark.parametrize("name", fixture_names())
+def test_fixture_rows_match_browser(name):
+    """저장된 목록 HTML의 행이 브라우저 경로(dealfields.EXTRACT_ROWS_JS)가 읽는 행과 같아야 함."""
+    with open(os.path.join(FIXTURE_DIR, f"{name}.html"), "rb") as f:
+        html = f.read()
+    with open(os.path.join(FIXTURE_DIR, f"{name}.json"), encoding="utf-8") as f:
+        expected = json.load(f)
+    assert parse_list_page(html, FIXTURE_URL) == expected
+
+
+@pytest.mark.parametrize("html, expected", [
+    # 한 줄 안의 연속된 공백(소스의 줄바꿈 포함)은 하나로 합치고 앞뒤 공백은 지움
+    ("<a>  [쿠팡]\n   신라면   <b>20개</b> </a>", "[쿠팡] 신라면 20개"),
+    # <br>은 줄바꿈, 줄 끝/시작의 공백은 지움
+    ("<a>닌텐도 스위치 <br> OLED<br></a>", "닌텐도 스위치\nOLED"),
+    # 숨겨진 요소와 script/style 내용은 포함하지 않음
+    ("<a>삼다수<span hidden>HOT</span><span style='display:none'>광고</span><script>x()</script>"
+     "<style>a{}</style> 2L</a>", "삼다수 2L"),
+    ("<a>MX Keys <span style='visibility: hidden'>숨김</span>미니</a>", "MX Keys 미니"),
+    # &nbsp;는 합치지 않지만 앞뒤의 것은 trim()이 지움
+    ("<a>&nbsp;2L&nbsp; 12병&nbsp;</a>", "2L\xa0 12병"),
+    # 주석은 건너뛰고 뒤따르는 텍스트는 포함
+    ("<a>무료<!-- 이벤트 -->배송</a>", "무료배송"),
+    # block 요소 경계는 줄바꿈 (p는 두 줄)
+    ("<div><p>가</p><p>나</p>다<div>라</div></div>", "가\n\n나\n\n다\n라"),
+    ("<div><table><tr><td>가</td><td>나</td></tr><tr><td>다</td></tr></table></div>", "가\t나\n다"),
+])
+def test_inner_text_matches_browser(html, expected):
+    assert _inner_text(lxml.html.fragment_fromstring(html)) == expected
+
+
+def _page(rows_html: str, head: str = "") -> str:
+    fillers = "<div></div>" * 5
+    return (f"<html><head>{head}</head><body>{fillers}<div><div></div><div><ul>{rows_html}</ul></div></div>"
+            "</body></html>")
+
+
+def _row(title: str, href: str) -> str:
+    return (f"<li><div><div></div><div><p>1,000원</p><p><small>방금 전</small></p>"
+            f"<div><p>쇼핑몰</p><p><span><a href='{href}'>{title}</a></span></p></div></div></div></li>")
+
+
+def test_links_resolve_against_base_element():
+    html = _page(_row("가", "d/1"), head="<base href='https://link.algumon.com/l/'>")
+    assert parse_list_page(html, FIXTURE_URL)[0]["link"] == "https://link.algumon.com/l/d/1"
+
+
+def test_page_without_rows_is_rejected():
+    with pytest.raises(ListParseError):
+        parse_list_page(_page(""), FIXTURE_URL)
+
+
+def test_row_without_link_is_rejected():
+    html = _page(_row("가", "/l/d/1") + "<li><div><div></div><div><p>1,000원</p>"
+                 "<div><p>쇼핑몰</p><p><span><a>나</a></span></p></div></div></div></li>")
+    with pytest.raises(ListParseError):
+        parse_list_page(html, FIXTURE_URL)
@@ -0,0 +1,63 @@
+import random
+
+from matcher import KeywordMatcher
+
+# 'İ'.lower()는 두 글자가 되므로 대소문자 정규화 후 길이가 달라지는 경우도 포함
+ALPHABET = "abAB 가İi"
+
+
+def baseline(keywords, title):
+    return {keyword.lower() for keyword in keywords if keyword.lower() in title.lower()}
+
+
+def random_text(rng, max_length):
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, max_length)))
+
+
+def test_match_agrees_with_substring_check():
+    rng = random.Random(1)
+    for _ in range(300):
+        keywords = [random_text(rng, 4) for _ in range(rng.randint(0, 8))]
+        matcher = KeywordMatcher(keywords)
+        for _ in range(20):
+            title = random_text(rng, 12)
+            assert matcher.match(title) == baseline(keywords, title)
+
+
+def test_match_items_agrees_with_substring_check():
+    rng = random.Random(2)
+    for _ in range(100):
+        keywords = [random_text(rng, 3) for _ in range(rng.randint(0, 6))]
+        items = [{"title": random_text(rng, 10)} for _ in range(rng.randint(0, 15))] + [{}]
+        expected = {}
+        for item in items:
+            title = item.get("title")
+            if not title:
+                continue
+            for keyword in baseline(keywords, title):
+                expected.setdefault(keyword, []).append(item)
+        assert KeywordMatcher(keywords).match_items(items) == expected
+
+
+def test_overlapping_and_suffix_keywords():
+    matcher = KeywordMatcher(["he", "she", "his", "hers", "e", "rs"])
+    assert matcher.match("ushers") == {"he", "she", "hers", "e", "rs"}
+    assert matcher.match("ahishe") == {"his", "she", "he", "e"}
+    matcher = KeywordMatcher(["aa", "aaa", "a"])
+    assert matcher.match("aa") == {"a", "aa"}
+    assert matcher.match("baaab") == {"a", "aa", "aaa"}
+
+
+def test_empty_keyword_matches_every_title():
+    matcher = KeywordMatcher(["", "x"])
+    assert matcher.match("") == {""}
+    assert matcher.match("abc") == {""}
+    assert matcher.match("xyz") == {"", "x"}
+
+
+def test_case_folding():
+    matcher = KeywordMatcher(["RTX 4090", "Galaxy", "İ"])
+    assert matcher.keywords == {"rtx 4090", "galaxy", "i̇"}
+    assert matcher.match("[특가] rtx 4090 GALAXY") == {"rtx 4090", "galaxy"}
+    assert matcher.match("İSTANBUL") == {"i̇"}
+    assert matcher.match("istanbul") == set()
@@ -0,0 +1,55 @@
+import asyncio
+import datetime
+
+import pytest
+
+pytest.importorskip("discord")
+pytest.importorskip("pytz")
+
+import moabot4  # noqa: E402
+from dealcache import SegmentSource  # noqa: E402
+from segments import LocalBackend, SegmentStore  # noqa: E402
+from subscriptions import SubscriptionStore  # noqa: E402
+
+START = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def make_snapshot(root, count):
+    store = SegmentStore(LocalBackend(str(root)))
+    store.append([{"title": f"농심 신라면 {i}개", "price": "1,000원", "link": f"https://www.algumon.com/l/d/{i}",
+                   "timestamp": "2025/01/01-09:00", "timestamp_epoch": int(START.timestamp()) + i * 60}
+                  for i in range(count)])
+    source = SegmentSource(store)
+    return source.build_snapshot(source.current_generation())
+
+
+def test_scan_cycle_keeps_watermark_of_failed_subscription(tmp_path, monkeypatch):
+    snapshot = make_snapshot(tmp_path / "data", 5)
+    store = SubscriptionStore(str(tmp_path / "subscriptions.db"))
+    monkeypatch.setattr(moabot4, "subscription_store", store)
+
+    async def process(subscription, candidates, snapshot, now):
+        if subscription.user_id == 2:
+            raise RuntimeError("임베드 생성 실패")
+        subscription.watermark = max(subscription.watermark, snapshot.max_no)
+        return len(candidates)
+
+    monkeypatch.setattr(moabot4, "process_user_scan_for_keyword", process)
+
+    async def run():
+        await store.add(1, "신라면", START, 2)
+        await store.add(2, "신라면", START, 2)
+        await store.add(3, "삼다수", START, 2)
+        return await moabot4.scan_cycle(snapshot, START)
+
+    new_items, matches = asyncio.run(run())
+    assert (new_items, matches) == (3, 3)
+    assert [store.get(user, keyword).watermark for user, keyword in ((1, "신라면"), (2, "신라면"), (3, "삼다수"))] \
+        == [5, 2, 5]
+    store.close()
+
+    reloaded = SubscriptionStore(str(tmp_path / "subscriptions.db"))
+    assert reloaded.get(2, "신라면").watermark == 2
+    assert reloaded.get(1, "신라면").watermark == 5
+    assert reloaded.get(3, "삼다수").watermark == 5
+    reloaded.close()
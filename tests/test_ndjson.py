@@ -0,0 +1,95 @@
+import io
+import json
+import os
+
+import pytest
+
+from ndjson import PART_SUFFIX, NDJSONWriter, iter_records, output_paths, read_path, read_paths, rotated_path
+
+
+def records(start, stop):
+    return [{"no": no, "title": f"딜 {no}"} for no in range(start, stop)]
+
+
+def test_resume_after_cut_mid_line(tmp_path):
+    path = str(tmp_path / "history.ndjson")
+    writer = NDJSONWriter(path)
+    writer.write_all(records(1, 6))
+    writer.flush()
+    # 프로세스가 죽은 것처럼 닫지 않고 .part 파일의 마지막 줄 중간을 잘라냄
+    part_path = path + PART_SUFFIX
+    size = os.path.getsize(part_path)
+    with open(part_path, "rb+") as f:
+        f.truncate(size - 5)
+    assert not os.path.exists(path)
+
+    with NDJSONWriter(path, append=True) as writer:
+        writer.write_all(records(5, 8))
+    assert not os.path.exists(part_path)
+    assert list(read_path(path)) == records(1, 8)
+
+
+def test_exception_keeps_part_file(tmp_path):
+    path = str(tmp_path / "history.ndjson")
+    with pytest.raises(RuntimeError):
+        with NDJSONWriter(path) as writer:
+            writer.write_all(records(1, 4))
+            raise RuntimeError("중단")
+    # .part가 아닌 파일은 완성된 경우에만 생김
+    assert not os.path.exists(path)
+    assert list(read_path(path + PART_SUFFIX)) == records(1, 4)
+
+    with NDJSONWriter(path) as writer:
+        pass
+    assert os.path.exists(path) and list(read_path(path)) == []
+    assert output_paths(path) == [path]
+
+
+def test_rotation_naming(tmp_path):
+    path = str(tmp_path / "history.ndjson")
+    with NDJSONWriter(path, rotate_records=3) as writer:
+        writer.write_all(records(1, 8))
+    expected = [rotated_path(path, index) for index in (1, 2, 3)]
+    assert rotated_path(path, 1) == str(tmp_path / "history-00001.ndjson")
+    assert writer.completed_paths == expected
+    assert output_paths(path) == expected
+    assert not any(name.endswith(PART_SUFFIX) for name in os.listdir(tmp_path))
+    assert list(read_paths(output_paths(path))) == records(1, 8)
+
+    # 다시 실행하면 완성된 파일 다음 번호부터 씀
+    with NDJSONWriter(path, rotate_records=3) as writer:
+        writer.write_all(records(8, 10))
+    assert writer.completed_paths == [rotated_path(path, 4)]
+    assert list(read_paths(output_paths(path))) == records(1, 10)
+
+
+def test_truncated_final_line_is_tolerated():
+    data = b"".join(json.dumps(record).encode() + b"\n" for record in records(1, 4)) + b'{"no": 4, "ti'
+    assert list(iter_records(io.BytesIO(data), chunk_size=7)) == records(1, 4)
+    with pytest.raises(ValueError):
+        list(iter_records(io.BytesIO(b'{"no": 1, "ti\n{"no": 2}\n')))
+
+
+def test_skip_ignores_no_inside_strings_and_nested_objects():
+    lines = [
+        {"title": 'say "no": 1', "no": 9},
+        {"title": ',"no": 1}', "no": 8},
+        {'say "no': 1, "no": 6},
+        {"title": "{특가}", "no": 2},
+        {"meta": {"no": 1}, "no": 7},
+        {"meta": {"no": 9}, "no": 3},
+        {"no": 1.5, "title": "float"},
+        {"no": 4},
+        {"title": "no field"},
+    ]
+    data = b"".join(json.dumps(line, ensure_ascii=False).encode() + b"\n" for line in lines)
+    skipped = [0]
+    result = list(iter_records(io.BytesIO(data), skip_at_or_below=4, skipped=skipped))
+    assert result == [lines[0], lines[1], lines[2], lines[4], lines[6], lines[8]]
+    assert skipped == [3]
+    # JSON 배열 형식도 같은 결과
+    array = json.dumps(lines[:3] + lines[6:], ensure_ascii=False).encode()
+    skipped = [0]
+    assert list(iter_records(io.BytesIO(array), skip_at_or_below=4, skipped=skipped)) == \
+        [lines[0], lines[1], lines[2], lines[6], lines[8]]
+    assert skipped == [1]
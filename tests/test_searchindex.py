@@ -0,0 +1,124 @@
+import random
+
+from searchindex import SearchIndex, sort_key
+
+ALPHABET = "abAB 가나\t"
+
+
+def baseline(items, keyword, size=None, limit=None):
+    """기존 search_keyword와 같이 no 내림차순으로 정렬한 뒤 부분 문자열로 거릅니다."""
+    positions = list(range(len(items) if size is None else size))
+    positions.sort(key=lambda i: sort_key(items[i]), reverse=True)
+    query = keyword.lower()
+    matches = [i for i in positions if query in items[i].get("title", "").lower()]
+    return matches[:limit]
+
+
+def random_title(rng):
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 8)))
+
+
+def random_no(rng, i, ordered):
+    choice = rng.random()
+    if choice < 0.1:
+        return None
+    if choice < 0.15:
+        return "missing"
+    return i // 2 if ordered else rng.randint(0, 10)
+
+
+def random_items(rng, count, ordered, start=0):
+    items = []
+    for i in range(start, start + count):
+        item = {"title": random_title(rng)}
+        no = random_no(rng, i, ordered)
+        if no != "missing":
+            item["no"] = no
+        items.append(item)
+    return items
+
+
+def queries(rng, items):
+    yield ""
+    for _ in range(20):
+        yield random_title(rng)[:rng.randint(1, 4)] or "a"
+    for item in rng.sample(items, min(5, len(items))):
+        title = item.get("title", "")
+        if title:
+            start = rng.randrange(len(title))
+            yield title[start:start + rng.randint(1, 5)].upper()
+
+
+def check(index, items, rng):
+    for query in queries(rng, items):
+        assert index.search(query) == baseline(items, query)
+        size = rng.randint(0, len(items))
+        limit = rng.randint(0, 5)
+        assert index.search(query, size=size) == baseline(items, query, size=size)
+        assert index.search(query, limit=limit) == baseline(items, query, limit=limit)
+        assert index.search(query, size=size, limit=limit) == baseline(items, query, size=size, limit=limit)
+        if query:
+            # 후보 posting은 실제로 일치하는 문서를 하나도 빠뜨리면 안 됨
+            candidates = set(index._candidates(query.lower()))
+            assert set(baseline(items, query)) <= candidates
+
+
+def test_search_matches_baseline_for_ordered_items():
+    rng = random.Random(1)
+    for _ in range(30):
+        items = random_items(rng, rng.randint(0, 40), ordered=True)
+        check(SearchIndex.build(items), items, rng)
+
+
+def test_search_matches_baseline_for_unordered_items():
+    rng = random.Random(2)
+    for _ in range(30):
+        items = random_items(rng, rng.randint(1, 40), ordered=False)
+        index = SearchIndex.build(items)
+        check(index, items, rng)
+
+
+def test_search_matches_baseline_after_extend():
+    rng = random.Random(3)
+    for ordered in (True, False):
+        for _ in range(20):
+            items = random_items(rng, rng.randint(0, 20), ordered=ordered)
+            index = SearchIndex.build(items)
+            for _ in range(3):
+                items = items + random_items(rng, rng.randint(0, 10), ordered=ordered, start=len(items))
+                index.extend(items)
+                assert len(index) == len(items)
+                check(index, items, rng)
+
+
+def test_ties_keep_snapshot_order():
+    items = [{"no": 1, "title": "a"}, {"no": 2, "title": "a"}, {"no": 1, "title": "a"}, {"title": "a"},
+             {"no": None, "title": "a"}, {"no": 2, "title": "a"}]
+    index = SearchIndex.build(items)
+    assert index.search("a") == [1, 5, 0, 2, 3, 4]
+    assert index.search("a") == baseline(items, "a")
+    assert index.search("a", size=3, limit=2) == [1, 0]
+
+
+def test_extend_with_older_no_switches_to_sorted_results():
+    items = [{"no": 5, "title": "deal"}, {"no": 6, "title": "deal"}]
+    index = SearchIndex.build(items)
+    assert index._ordered
+    items.append({"no": 1, "title": "deal"})
+    index.extend(items)
+    assert not index._ordered
+    assert index.search("deal") == [1, 0, 2]
+
+
+def test_candidates_prune_with_middle_tokens():
+    items = [{"no": 1, "title": "a bb c"}, {"no": 2, "title": "A BB C"}, {"no": 3, "title": "xa b cx"},
+             {"no": 4, "title": "a\tb c"}]
+    index = SearchIndex.build(items)
+    # 모든 2-gram posting보다 가운데 토큰 'b'의 posting이 짧으므로 그것이 후보가 됨
+    assert set(index._candidates("a b c")) == {2, 3}
+    assert index.search("a b c") == baseline(items, "a b c") == [2]
+    assert index.search("A BB C") == baseline(items, "A BB C") == [1, 0]
+    # 없는 가운데 토큰은 후보를 비움
+    assert list(index._candidates("a z c")) == []
+    # 공백이 연속되면 빈 조각은 건너뜀
+    assert index.search("a  b") == baseline(items, "a  b") == []
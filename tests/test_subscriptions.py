@@ -0,0 +1,108 @@
+import asyncio
+import datetime
+import time
+
+from dedupe import SeenWindow
+from subscriptions import SubscriptionStore
+
+START = datetime.datetime(2024, 5, 1, 9, 30, tzinfo=datetime.timezone.utc)
+
+
+def state(store):
+    return {(s.user_id, s.keyword): (s.start_time, s.watermark, s.recent_titles.to_bytes()) for s in store.all()}
+
+
+def keyword_index(store):
+    return {keyword: sorted((s.user_id, s.keyword) for s in store.subscribers(keyword))
+            for keyword in store.keywords()}
+
+
+def expected_keyword_index(store):
+    index = {}
+    for s in store.all():
+        index.setdefault(s.normalized_keyword, []).append((s.user_id, s.keyword))
+    return {keyword: sorted(subscribers) for keyword, subscribers in index.items()}
+
+
+def test_seen_window_bytes_round_trip():
+    now = time.time()
+    window = SeenWindow()
+    window.add("old", now - 10)
+    window.add("new", now)
+    restored = SeenWindow.from_bytes(window.to_bytes())
+    assert restored.to_bytes() == window.to_bytes()
+    assert "old" in restored and "new" in restored and "other" not in restored
+    assert len(SeenWindow.from_bytes(None)) == len(SeenWindow.from_bytes(b"")) == 0
+    # 창이 지난 항목은 불러올 때 제거됨
+    window = SeenWindow()
+    window.add("expired", now - 2 * window.window_seconds)
+    window.add("new", now)
+    restored = SeenWindow.from_bytes(window.to_bytes())
+    assert len(restored) == 1 and "new" in restored and "expired" not in restored
+
+
+def test_store_round_trip(tmp_path):
+    path = str(tmp_path / "subscriptions.db")
+
+    async def run():
+        store = SubscriptionStore(path)
+        first = await store.add(1, "RTX", START, 10)
+        await store.add(1, "ssd", START, 10)
+        second = await store.add(2, "rtx", START + datetime.timedelta(hours=1), 12)
+        await store.add(3, "모니터", START, 5)
+        assert await store.remove(3, "모니터")
+        assert not await store.remove(3, "모니터")
+
+        first.recent_titles.add("RTX 4090 특가")
+        first.watermark = 20
+        second.recent_titles.update(["RTX 4080", "RTX 4070"])
+        # 실패한 구독처럼 watermark를 올리지 않은 채 기록하면 일괄 갱신보다 구독별 값이 우선함
+        await store.save_progress([first, second], watermark=30)
+        return store
+
+    store = asyncio.run(run())
+    expected = state(store)
+    expected[(1, "ssd")] = (START, 30, b"")
+    store.close()
+
+    reloaded = SubscriptionStore(path)
+    assert state(reloaded) == expected
+    assert reloaded.get(1, "RTX").watermark == 20
+    assert reloaded.get(2, "rtx").watermark == 12
+    assert "RTX 4090 특가" in reloaded.get(1, "RTX").recent_titles
+    assert "RTX 4070" in reloaded.get(2, "rtx").recent_titles
+    assert reloaded.get(3, "모니터") is None
+    assert keyword_index(reloaded) == expected_keyword_index(reloaded) == {
+        "rtx": [(1, "RTX"), (2, "rtx")], "ssd": [(1, "ssd")]}
+    reloaded.close()
+
+
+def test_remove_user_keeps_keyword_index_consistent(tmp_path):
+    path = str(tmp_path / "subscriptions.db")
+
+    async def run():
+        store = SubscriptionStore(path)
+        await store.add(1, "RTX", START, 0)
+        await store.add(1, "ssd", START, 0)
+        await store.add(2, "rtx", START, 0)
+        await store.add(2, "Galaxy", START, 0)
+        assert await store.remove_user(1)
+        assert not await store.remove_user(1)
+        return store
+
+    store = asyncio.run(run())
+    assert store.get_user(1) == {}
+    assert len(store) == 2
+    assert store.keywords() == frozenset({"rtx", "galaxy"})
+    assert keyword_index(store) == expected_keyword_index(store) == {
+        "rtx": [(2, "rtx")], "galaxy": [(2, "Galaxy")]}
+    assert store.subscribers("ssd") == []
+
+    asyncio.run(store.remove_user(2))
+    assert len(store) == 0
+    assert store.keywords() == frozenset()
+    store.close()
+
+    reloaded = SubscriptionStore(path)
+    assert len(reloaded) == 0 and reloaded.keywords() == frozenset()
+    reloaded.close()